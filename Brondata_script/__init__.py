@@ -0,0 +1,7 @@
+"""
+Dataset builders and the modules they share with the app.
+
+Imported as a package from the repository root, by the app (data_access,
+queries/) and by the scripts themselves; run a script as a module from the
+root, e.g. `python -m Brondata_script.calccbe_jr_streamlit`.
+"""
@@ -0,0 +1,365 @@
+"""
+End-to-end benchmark for the two dataset builders.
+
+Runs `calccbe_jr_streamlit.build_dataset` and
+`create_data_vergelijken.process_all_years` (+ aggregates and write) on a
+directory of Iv3 extracts, normally the synthetic ones from `synthetic_iv3.py`,
+and reports per stage: wall time, CPU time, number of calls and output rows.
+Per builder it also reports the total time, the peak RSS of the process and a
+digest of the output, so a change that alters the result shows up as well.
+
+Stages are timed by wrapping the stage functions in the builder modules
+(read_iv3, pivot, taakveldgroepen, herindeling, ...) and then calling the real
+entry points, so the benchmark always measures the code that ships. Time not
+spent in a wrapped function (concat, merges) is reported as "other". Each
+builder runs in a fresh process, so peak RSS is per builder.
+
+Results are written as JSON; `--compare` checks them against an earlier run
+(e.g. from the previous commit) and exits non-zero on a slowdown beyond
+`--max-slowdown` or a changed output digest.
+
+Run:
+  python -m Brondata_script.benchmark_build --data-dir bench_data --out bench_HEAD.json
+  python -m Brondata_script.benchmark_build --data-dir bench_data --compare bench_HEAD.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+
+from Brondata_script import synthetic_iv3
+from Brondata_script.build_profile import peak_rss_mb
+
+BUILDERS = ("calccbe_jr_streamlit", "create_data_vergelijken")
+
+# Module-level functions wrapped as stages, per builder (missing names are skipped)
+STAGES = {
+    "calccbe_jr_streamlit": [
+        ("load_classes", "classes"),
+        ("read_iv3", "read"),
+        ("stream_baten_lasten", "read"),
+        ("pivot_iv3", "pivot"),
+        ("aggregate_to_taakveldgroepen", "taakveldgroepen"),
+        ("apply_herindeling_matrix", "herindeling"),
+        ("add_standen", "standen"),
+        ("add_aggregates", "aggregates"),
+        ("verschil_cube", "verschil"),
+        ("write_dataset", "write"),
+    ],
+    "create_data_vergelijken": [
+        ("read_iv3", "read"),
+        ("stream_baten_lasten", "read"),
+        ("pivotIv3", "pivot"),
+        ("split_taakvelden", "taakvelden"),
+        ("load_gemeenteklassen", "classes"),
+        ("add_aggregate_groups", "aggregates"),
+        ("taakveld_rollups", "rollups"),
+        ("write_dataset", "write"),
+    ],
+}
+
+# Stages faster than this (in the baseline) are too noisy to flag as a regression
+MIN_COMPARE_SECONDS = 0.05
+
+
+class StageTimer:
+    """
+    Accumulates wall/CPU time, calls and output rows per stage.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.stages: dict[str, dict[str, float]] = {}
+        self.trace_memory = trace_memory
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            if self.trace_memory:
+                tracemalloc.reset_peak()
+            wall, cpu = time.perf_counter(), time.process_time()
+            result = func(*args, **kwargs)
+            entry = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0, "rows": 0})
+            entry["wall_s"] += time.perf_counter() - wall
+            entry["cpu_s"] += time.process_time() - cpu
+            entry["calls"] += 1
+            if isinstance(result, pd.DataFrame):
+                entry["rows"] += len(result)
+            if self.trace_memory:
+                peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+                entry["traced_peak_mb"] = max(entry.get("traced_peak_mb", 0.0), peak_mb)
+            return result
+
+        return timed
+
+    def instrument(self, module: Any, stages: list[tuple[str, str]]) -> None:
+        for attr, name in stages:
+            if hasattr(module, attr):
+                setattr(module, attr, self.wrap(name, getattr(module, attr)))
+
+
+def output_digest(df: pd.DataFrame) -> str:
+    """
+    Order-independent hash of a builder output (values rounded to 1e-6).
+    """
+    out = df.reset_index(drop=True).copy()
+    for col in out.columns:
+        if col == "Waarde" or pd.api.types.is_float_dtype(out[col]):
+            out[col] = out[col].astype(float).round(6)
+        else:
+            out[col] = out[col].astype(str)
+    out = out[sorted(out.columns)].sort_values(sorted(out.columns), ignore_index=True)
+    return hashlib.sha256(pd.util.hash_pandas_object(out, index=False).to_numpy().tobytes()).hexdigest()[:16]
+
+
+def _run_calccbe(data_dir: Path, years: range, value_col: str, block_size: int | None, timer: StageTimer) -> pd.DataFrame:
+    from Brondata_script import calccbe_jr_streamlit as builder
+
+    timer.instrument(builder, STAGES["calccbe_jr_streamlit"])
+    df = builder.build_dataset(
+        iv3_dir=data_dir / "iv3data",
+        years=years,
+        classes_csv=data_dir / "gemeenteklassen.csv",
+        value_col=value_col,
+        block_size=block_size,
+    )
+    verschil = builder.verschil_cube(df)
+    with tempfile.TemporaryDirectory() as tmp:
+        builder.write_dataset(df, Path(tmp) / "begroting_rekening", name="begroting_rekening")
+        builder.write_dataset(verschil, Path(tmp) / "begroting_rekening_verschil", partition_by=("Jaar",), name="begroting_rekening_verschil")
+    return df
+
+
+def _run_cdv(data_dir: Path, years: range, value_col: str, block_size: int | None, timer: StageTimer) -> pd.DataFrame:
+    from Brondata_script import create_data_vergelijken as builder
+
+    # The builder reads from module constants; point them at the benchmark data
+    builder.DATAMAP = str(data_dir / "iv3data" / "%s.csv")
+    builder.KLASSEN_BASE_PATH = str(data_dir / "per_jaar")
+    timer.instrument(builder, STAGES["create_data_vergelijken"])
+    df = builder.process_all_years(start_year=years.start, end_year=years.stop, block_size=block_size)
+    df = builder.add_aggregate_groups(df)
+    rollups = builder.taakveld_rollups(df)
+    with tempfile.TemporaryDirectory() as tmp:
+        builder.write_dataset(df, Path(tmp) / "begroting_rekening_per_taakveld", name="begroting_rekening_per_taakveld")
+        builder.write_dataset(rollups, Path(tmp) / "begroting_rekening_per_taakveld_rollups",
+                              name="begroting_rekening_per_taakveld_rollups")
+    return df
+
+
+def run_builder(builder: str, data_dir: Path, years: range, value_col: str, block_size: int | None, trace_memory: bool) -> dict:
+    """
+    Run one builder once (meant to be called in a fresh process) and return its measurements.
+    """
+    timer = StageTimer(trace_memory=trace_memory)
+    if trace_memory:
+        tracemalloc.start()
+    run = _run_calccbe if builder == "calccbe_jr_streamlit" else _run_cdv
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    df = run(data_dir, years, value_col, block_size, timer)
+    total_wall, total_cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    timer.stages["other"] = {
+        "wall_s": max(0.0, total_wall - sum(s["wall_s"] for s in timer.stages.values())),
+        "cpu_s": max(0.0, total_cpu - sum(s["cpu_s"] for s in timer.stages.values())),
+        "calls": 0,
+        "rows": 0,
+    }
+    return {
+        "stages": timer.stages,
+        "total_wall_s": total_wall,
+        "total_cpu_s": total_cpu,
+        "peak_rss_mb": peak_rss_mb(),
+        "rows": len(df),
+        "digest": output_digest(df),
+    }
+
+
+def run_isolated(builder: str, **kwargs: Any) -> dict:
+    """
+    Run `run_builder` in a new (spawned) process so peak RSS and import costs are per builder.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(run_builder, (builder,), kwargs)
+
+
+def best_of(runs: list[dict]) -> dict:
+    """
+    Combine repeated runs: minimum time per stage and total, maximum peak memory.
+    """
+    best = min(runs, key=lambda r: r["total_wall_s"])
+    out = json.loads(json.dumps(best))
+    for name, stage in out["stages"].items():
+        stage["wall_s"] = min(r["stages"].get(name, stage)["wall_s"] for r in runs)
+        stage["cpu_s"] = min(r["stages"].get(name, stage)["cpu_s"] for r in runs)
+    rss = [r["peak_rss_mb"] for r in runs if r["peak_rss_mb"] is not None]
+    out["peak_rss_mb"] = max(rss) if rss else None
+    out["runs"] = [r["total_wall_s"] for r in runs]
+    if len({r["digest"] for r in runs}) > 1:
+        out["digest"] = "nondeterministic"
+    return out
+
+
+def git_revision() -> dict:
+    repo = Path(__file__).resolve().parent
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=repo, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo, capture_output=True, text=True).stdout.strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def print_report(results: dict) -> None:
+    for builder, res in results["builders"].items():
+        rss = f"{res['peak_rss_mb']:.0f} MB" if res["peak_rss_mb"] is not None else "n/a"
+        print(f"\n{builder}: {res['total_wall_s']:.2f} s wall, {res['total_cpu_s']:.2f} s CPU, peak RSS {rss}, {res['rows']:,} rows, digest {res['digest']}")
+        for name, st in sorted(res["stages"].items(), key=lambda kv: -kv[1]["wall_s"]):
+            line = f"  {name:<16} {st['wall_s']:8.3f} s  {st['cpu_s']:8.3f} s CPU  {st['calls']:4d} call(s)  {st['rows']:>12,} rows"
+            if "traced_peak_mb" in st:
+                line += f"  {st['traced_peak_mb']:8.1f} MB traced peak"
+            print(line)
+
+
+def compare(results: dict, baseline: dict, max_slowdown: float) -> list[str]:
+    """
+    Print new/old time ratios; return the list of regressions (slowdowns and changed outputs).
+    """
+    problems = []
+    base_rev = baseline.get("git", {}).get("commit")
+    print(f"\nCompared with {base_rev or 'baseline'} (ratio new/old, limit {max_slowdown:.2f}x):")
+    if baseline.get("params") != results["params"]:
+        print(f"  Note: parameters differ: {baseline.get('params')} vs {results['params']}")
+
+    for builder, res in results["builders"].items():
+        old = baseline.get("builders", {}).get(builder)
+        if old is None:
+            continue
+        rows = [("total", old["total_wall_s"], res["total_wall_s"])]
+        rows += [
+            (name, old["stages"][name]["wall_s"], st["wall_s"])
+            for name, st in res["stages"].items()
+            if name in old["stages"]
+        ]
+        for name, t_old, t_new in rows:
+            ratio = t_new / t_old if t_old > 0 else float("inf")
+            flag = ""
+            if t_old >= MIN_COMPARE_SECONDS and ratio > max_slowdown:
+                flag = "  <-- slower"
+                problems.append(f"{builder}/{name}: {ratio:.2f}x slower")
+            print(f"  {builder}/{name:<16} {t_old:8.3f} s -> {t_new:8.3f} s  {ratio:6.2f}x{flag}")
+
+        if old.get("peak_rss_mb") and res.get("peak_rss_mb"):
+            ratio = res["peak_rss_mb"] / old["peak_rss_mb"]
+            print(f"  {builder}/peak RSS        {old['peak_rss_mb']:8.0f} MB -> {res['peak_rss_mb']:6.0f} MB  {ratio:6.2f}x")
+            if ratio > max_slowdown:
+                problems.append(f"{builder}: peak RSS {ratio:.2f}x higher")
+
+        if old["digest"] != res["digest"]:
+            problems.append(f"{builder}: output changed (digest {old['digest']} -> {res['digest']})")
+    return problems
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark both dataset builders on (synthetic) Iv3 data.")
+    p.add_argument(
+        "--data-dir",
+        type=Path,
+        default=Path("bench_data"),
+        help="Directory with iv3data/, gemeenteklassen.csv and per_jaar/ (generated if missing).",
+    )
+    p.add_argument("--gemeenten", type=int, default=340, help="Gemeenten to generate if --data-dir is missing.")
+    p.add_argument("--year-start", type=int, default=2017)
+    p.add_argument("--year-end", type=int, default=2026)
+    p.add_argument("--value-col", type=str, default="k_2ePlaatsing_2")
+    p.add_argument("--stream-mb", type=float, default=None, help="Benchmark the streaming ingest with blocks of this many MB.")
+    p.add_argument("--builder", choices=BUILDERS, action="append", help="Builder(s) to run (default: both).")
+    p.add_argument("--repeat", type=int, default=1, help="Runs per builder; the fastest is reported.")
+    p.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Also record the traced (Python-allocated) peak per stage with tracemalloc; slows the run down.",
+    )
+    p.add_argument("--out", type=Path, default=None, help="Write results as JSON.")
+    p.add_argument("--compare", type=Path, default=None, help="Results JSON of an earlier run to compare against.")
+    p.add_argument("--max-slowdown", type=float, default=1.25, help="Ratio above which --compare reports a regression.")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    years = range(args.year_start, args.year_end + 1)
+
+    if not (args.data_dir / "iv3data").exists():
+        print(f"Generating synthetic Iv3 data in {args.data_dir} ...")
+        synthetic_iv3.generate(args.data_dir, gemeenten=args.gemeenten, years=years)
+
+    block_size = int(args.stream_mb * 1e6) if args.stream_mb else None
+    params = {
+        "data_dir": str(args.data_dir),
+        "years": [years.start, years.stop - 1],
+        "value_col": args.value_col,
+        "block_size": block_size,
+        "trace_memory": args.trace_memory,
+        "input_mb": round(sum(f.stat().st_size for f in (args.data_dir / "iv3data").glob("*.csv")) / 1e6, 1),
+    }
+    results = {
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "params": params,
+        "builders": {},
+    }
+
+    for builder in args.builder or BUILDERS:
+        print(f"Running {builder} ({args.repeat}x) ...")
+        runs = [
+            run_isolated(
+                builder,
+                data_dir=args.data_dir,
+                years=years,
+                value_col=args.value_col,
+                block_size=block_size,
+                trace_memory=args.trace_memory,
+            )
+            for _ in range(args.repeat)
+        ]
+        results["builders"][builder] = best_of(runs)
+
+    print_report(results)
+
+    if args.out is not None:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nWrote results to {args.out}")
+
+    if args.compare is not None:
+        problems = compare(results, json.loads(args.compare.read_text(encoding="utf-8")), args.max_slowdown)
+        if problems:
+            print("\nRegressions:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
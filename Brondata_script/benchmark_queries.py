@@ -0,0 +1,144 @@
+"""
+Query latency benchmark, without Streamlit.
+
+Runs the queries behind both pages (see queries/) directly, for a series of
+gemeenten: first a cold pass with empty result caches, then the same pass
+again, which should be served from the caches. Reports the median and 95th
+percentile time per query and the cache statistics, so query costs can be
+profiled without a browser session or AppTest.
+
+Run from the repository root, with a directory holding the datasets
+(begroting_rekening/, begroting_rekening_verschil/,
+begroting_rekening_per_taakveld/ and, if built, begroting_rekening_per_taakveld_rollups/,
+which is benchmarked as a third page):
+
+  python -m Brondata_script.benchmark_queries --data-dir bench_app --gemeenten 20 --out queries.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def _timed(timings: dict[str, list[float]], name: str, result):
+    """Time `result()` under `name`; fails on an error, as the selections come from the data."""
+    start = time.perf_counter()
+    outcome = result()
+    timings[name].append(time.perf_counter() - start)
+    if not outcome.ok:
+        raise RuntimeError(f"{name}: {outcome.error}")
+    return outcome.value
+
+
+def bench_main(queries, gemeenten: list[str]) -> dict[str, list[float]]:
+    timings: dict[str, list[float]] = defaultdict(list)
+    jaar_min, jaar_max = queries.year_range
+    for gemeente in gemeenten:
+        for stand in queries.index.values('Stand', Gemeenten=gemeente):
+            _timed(timings, "calculate_saldo", lambda: queries.calculate_saldo(gemeente, stand))
+            for baten_lasten in ["Baten", "Lasten"]:
+                _timed(timings, "calculate_begroting_rekening",
+                       lambda: queries.calculate_begroting_rekening(gemeente, stand, baten_lasten, jaar_max))
+            for categorie in ["Saldo", "Baten", "Lasten"]:
+                _timed(timings, "create_tables",
+                       lambda: queries.create_tables(categorie, gemeente, stand, max(jaar_min, jaar_max - 4), jaar_max))
+        _timed(timings, "create_tables (Nederland)",
+               lambda: queries.create_tables("Saldo", gemeente, "Per inwoner",
+                                             max(jaar_min, jaar_max - 2), jaar_max, "Nederland"))
+    return timings
+
+
+def bench_taakveld(queries, gemeenten: list[str]) -> dict[str, list[float]]:
+    timings: dict[str, list[float]] = defaultdict(list)
+    for gemeente in gemeenten:
+        jaar = max(_timed(timings, "jaren", lambda: queries.jaren(gemeente)))
+        selection = (gemeente, "Nederland")
+        document = _timed(timings, "documenten", lambda: queries.documenten(selection, jaar))[0]
+        for categorie in ["Baten", "Lasten", "Saldo"]:
+            for per_inwoner in [True, False]:
+                _timed(timings, "hoofdtaakvelden",
+                       lambda: queries.hoofdtaakvelden(jaar, selection, document, categorie, per_inwoner))
+                _timed(timings, "subtaakvelden (alle)",
+                       lambda: queries.subtaakvelden(jaar, selection, document, categorie, None, per_inwoner))
+
+    # A comparison that grows by one gemeente at a time, as in the sidebar
+    jaar = max(_timed(timings, "jaren", lambda: queries.jaren(gemeenten[0])))
+    document = _timed(timings, "documenten", lambda: queries.documenten(gemeenten[0], jaar))[0]
+    for n in range(1, len(gemeenten) + 1):
+        selection = tuple(gemeenten[:n])
+        _timed(timings, "hoofdtaakvelden (groeiende selectie)",
+               lambda: queries.hoofdtaakvelden(jaar, selection, document, "Lasten", True))
+        _timed(timings, "subtaakvelden (groeiende selectie)",
+               lambda: queries.subtaakvelden(jaar, selection, document, "Lasten", None, True))
+    return timings
+
+
+def summarize(timings: dict[str, list[float]]) -> dict[str, dict[str, float]]:
+    out = {}
+    for name, values in timings.items():
+        ordered = sorted(values)
+        out[name] = {
+            "runs": len(values),
+            "median_ms": 1000 * statistics.median(ordered),
+            "p95_ms": 1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        }
+    return out
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Measure query latency and cache hit rates of both pages.")
+    p.add_argument("--data-dir", type=Path, required=True, help="Directory with the datasets.")
+    p.add_argument("--gemeenten", type=int, default=20, help="Number of gemeenten to query.")
+    p.add_argument("--out", type=Path, default=None, help="Write the summary as JSON.")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    sys.path.insert(0, str(REPO))
+    from queries import BegrotingRekeningQueries, TaakveldQueries
+    from queries.begroting_rekening import DATA_FILE, VERSCHIL_FILE
+    from queries.taakvelden import DATA_FILE as TAAKVELD_FILE, ROLLUP_FILE
+
+    main_queries = BegrotingRekeningQueries.open(args.data_dir / DATA_FILE, args.data_dir / VERSCHIL_FILE)
+    taakveld_queries = TaakveldQueries.open(args.data_dir / TAAKVELD_FILE)
+    gemeenten = [g for g in taakveld_queries.gemeente_options if g in main_queries.index][:args.gemeenten]
+    pages = [("main", main_queries, bench_main), ("taakveld", taakveld_queries, bench_taakveld)]
+    if (args.data_dir / ROLLUP_FILE).exists():
+        pages.append(("rollups", TaakveldQueries.open(args.data_dir / TAAKVELD_FILE, args.data_dir / ROLLUP_FILE),
+                      bench_taakveld))
+
+    results = {}
+    for page, queries, bench in pages:
+        results[page] = {"cold": summarize(bench(queries, gemeenten)),
+                         "warm": summarize(bench(queries, gemeenten)),
+                         "cache": queries.cache_info()._asdict()}
+        if hasattr(queries, "partial_cache_info"):
+            results[page]["partial_cache"] = queries.partial_cache_info()._asdict()
+
+    for page, result in results.items():
+        for run in ["cold", "warm"]:
+            for name, stats in result[run].items():
+                print(f"{page:<9} {run:<5} {name:<38} {stats['runs']:4d} run(s)  "
+                      f"median {stats['median_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms")
+        for name in ["cache", "partial_cache"]:
+            if name in result:
+                cache = result[name]
+                print(f"{page:<9} {name} {cache['hits']} hits, {cache['misses']} misses, "
+                      f"{cache['currsize']}/{cache['maxsize']} entries")
+
+    if args.out is not None:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
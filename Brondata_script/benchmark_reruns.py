@@ -0,0 +1,174 @@
+"""
+Rerun latency benchmark for the two Streamlit pages.
+
+Drives the pages headlessly with Streamlit's AppTest: one cold run, then a
+series of reruns that change one widget at a time (gemeente, jaarbereik,
+vergelijking, categorie), and reports the median and 95th percentile rerun
+time per scenario. Cache hits and cache-key costs show up directly in these
+numbers, since every rerun calls the cached data functions again.
+
+Gemeenten the pages cannot show (only one year of data, so there is no
+jaarbereik) are left out of the scenarios up front. Any other run that raises
+is recorded under "failures" in the report and makes the benchmark exit
+non-zero, so a crash cannot pass for a speed-up.
+
+Run from the repository root, with a directory holding the datasets
+(begroting_rekening/, begroting_rekening_verschil/,
+begroting_rekening_per_taakveld/) and gemeenteklassen.csv:
+
+  python -m Brondata_script.benchmark_reruns --data-dir bench_app --reruns 20 --out reruns.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import warnings
+from pathlib import Path
+
+from Brondata_script.dataset_store import load_dataset
+
+REPO = Path(__file__).resolve().parent.parent
+MAIN_PAGE = REPO / "📈_Begroting_en_jaarrekening_vergelijken.py"
+TAAKVELD_PAGE = REPO / "pages" / "1_📊_Gemeenten_per_taakveld_vergelijken.py"
+
+
+def _timed_run(at, timings: dict[str, list[float]], scenario: str, failures: list[dict]) -> None:
+    t = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - t
+    if at.exception:
+        error = at.exception[0].value.splitlines()[0]
+        print(f"  {scenario}: run raised: {error}")
+        failures.append({"scenario": scenario, "error": error})
+        return
+    timings[scenario].append(elapsed)
+
+
+def multi_year_gemeenten(dataset: str) -> set[str]:
+    """Gemeenten with more than one year in `dataset` (the others have no jaarbereik to show)."""
+    df = load_dataset(dataset, columns=["Gemeenten", "Jaar"])
+    years = df.groupby("Gemeenten", observed=True)["Jaar"].nunique()
+    return set(years.index[years > 1])
+
+
+def _widget(widgets, label: str):
+    return next(w for w in widgets if w.label == label)
+
+
+def bench_main_page(reruns: int, timeout: float, failures: list[dict]) -> dict[str, list[float]]:
+    from streamlit.testing.v1 import AppTest
+
+    timings: dict[str, list[float]] = {"cold": [], "gemeente": [], "jaarbereik": [], "vergelijken": []}
+    at = AppTest.from_file(str(MAIN_PAGE), default_timeout=timeout)
+
+    def run(scenario: str) -> None:
+        _timed_run(at, timings, scenario, failures)
+
+    run("cold")
+
+    valid = multi_year_gemeenten("begroting_rekening")
+    gemeenten = [g for g in _widget(at.sidebar.selectbox, "Selecteer een gemeente").options if g in valid]
+    for i in range(reruns):
+        _widget(at.sidebar.selectbox, "Selecteer een gemeente").set_value(gemeenten[i % len(gemeenten)])
+        run("gemeente")
+
+    slider = _widget(at.slider, "Selecteer het jaarbereik")
+    lo, hi = slider.min, slider.max
+    for i in range(reruns):
+        start = lo + i % max(1, hi - lo)
+        _widget(at.slider, "Selecteer het jaarbereik").set_range(start, hi)
+        run("jaarbereik")
+
+    at.sidebar.toggle[0].set_value(True)
+    run("vergelijken")
+    _widget(at.sidebar.selectbox, "Selecteer vergelijking").set_value("Nederland")
+    run("vergelijken")
+    for i in range(reruns):
+        _widget(at.sidebar.selectbox, "Selecteer een gemeente").set_value(gemeenten[i % len(gemeenten)])
+        run("vergelijken")
+    return timings
+
+
+def bench_taakveld_page(reruns: int, timeout: float, failures: list[dict]) -> dict[str, list[float]]:
+    from streamlit.testing.v1 import AppTest
+
+    timings: dict[str, list[float]] = {"cold": [], "gemeente": [], "categorie": []}
+    at = AppTest.from_file(str(TAAKVELD_PAGE), default_timeout=timeout)
+
+    def run(scenario: str) -> None:
+        _timed_run(at, timings, scenario, failures)
+
+    run("cold")
+
+    valid = multi_year_gemeenten("begroting_rekening_per_taakveld")
+    gemeenten = [g for g in _widget(at.sidebar.selectbox, "Selecteer een gemeente").options if g in valid]
+    for i in range(reruns):
+        _widget(at.sidebar.selectbox, "Selecteer een gemeente").set_value(gemeenten[i % len(gemeenten)])
+        run("gemeente")
+
+    categorieen = ["Baten", "Lasten", "Saldo"]
+    for i in range(reruns):
+        _widget(at.selectbox, "Baten, lasten of saldo?").set_value(categorieen[i % 3])
+        run("categorie")
+    return timings
+
+
+def summarize(timings: dict[str, list[float]]) -> dict[str, dict[str, float]]:
+    out = {}
+    for scenario, values in timings.items():
+        ordered = sorted(values)
+        out[scenario] = {
+            "runs": len(values),
+            "median_ms": 1000 * statistics.median(ordered) if ordered else None,
+            "p95_ms": 1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] if ordered else None,
+        }
+    return out
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Measure Streamlit rerun latency of both pages.")
+    p.add_argument("--data-dir", type=Path, required=True, help="Directory with the datasets and gemeenteklassen.csv.")
+    p.add_argument("--reruns", type=int, default=20, help="Reruns per scenario.")
+    p.add_argument("--timeout", type=float, default=120, help="Seconds allowed per run.")
+    p.add_argument("--out", type=Path, default=None, help="Write the summary as JSON.")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    out_path = args.out.resolve() if args.out is not None else None
+    sys.path.insert(0, str(REPO))
+    # The pages read their data relative to the working directory
+    os.chdir(args.data_dir)
+    warnings.filterwarnings("ignore")
+
+    failures: dict[str, list[dict]] = {"main": [], "taakveld": []}
+    results = {
+        "main": summarize(bench_main_page(args.reruns, args.timeout, failures["main"])),
+        "taakveld": summarize(bench_taakveld_page(args.reruns, args.timeout, failures["taakveld"])),
+    }
+    for page, scenarios in results.items():
+        for scenario, stats in scenarios.items():
+            if stats["runs"]:
+                print(f"{page:<9} {scenario:<12} {stats['runs']:4d} run(s)  median {stats['median_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms")
+            else:
+                print(f"{page:<9} {scenario:<12}    0 run(s)")
+    results["failures"] = failures
+
+    if out_path is not None:
+        out_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Wrote {out_path}")
+
+    failed = sum(len(runs) for runs in failures.values())
+    if failed:
+        print(f"{failed} run(s) raised, see the failures above")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Fingerprint-based cache for per-(jaar, document) build intermediates.
+
+Both builder scripts spend most of their time re-reading and re-pivoting Iv3
+CSV extracts that have not changed since the previous run. This module stores
+each (jaar, document) intermediate as a pickle, keyed on:
+
+- the content hash (sha256) of the Iv3 CSV,
+- the value column,
+- the version of the rules the intermediate depends on, if any (the
+  herindelingen and taakveldgroepen of calccbe_jr_streamlit), computed as a
+  hash of the rules themselves,
+- the builder's PARTITION_VERSION: the version of the code that builds a
+  partition (pivot, taakveldgroepen, herindeling, ...), which the builder
+  raises whenever that code changes what a partition contains or the order
+  of its rows,
+- any other build parameters the caller passes.
+
+When a new CBS delivery replaces one file, only that partition is rebuilt.
+
+Hashing a file is cheap compared to parsing it, but is still skipped when the
+file's size and modification time match the previous run (kept in a small
+JSON index in the cache directory).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+
+# Bump when the layout of cached intermediates changes
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(".iv3_cache")
+
+_DIGEST_INDEX = "file_digests.json"
+
+
+def rules_version(rules: Any) -> str:
+    """
+    Short, stable version string for a rules object (dict/tuple/list of plain values).
+    """
+    payload = json.dumps(rules, sort_keys=True, ensure_ascii=False, default=list)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """
+    sha256 of the file content.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PartitionCache:
+    """
+    Persist build intermediates keyed on input fingerprints.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._index_path = self.cache_dir / _DIGEST_INDEX
+        try:
+            self._digests: dict[str, dict] = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            self._digests = {}
+
+    def digest(self, path: Path) -> str:
+        """
+        Content hash of `path`, reusing the previous hash if size and mtime are unchanged.
+        """
+        st = os.stat(path)
+        entry_key = str(Path(path).resolve())
+        entry = self._digests.get(entry_key)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+
+        sha = file_digest(path)
+        self._digests[entry_key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+        self._write_index()
+        return sha
+
+    def key(self, iv3_csv: Path, **params: Any) -> str:
+        """
+        Cache key for one partition: input content hash + build parameters.
+        """
+        payload = {
+            "format": CACHE_FORMAT_VERSION,
+            "input": self.digest(iv3_csv),
+            "params": params,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> pd.DataFrame | None:
+        path = self._entry_path(key)
+        if not path.exists():
+            self.misses += 1
+            return None
+        try:
+            df = pd.read_pickle(path)
+        except Exception:
+            # Corrupt/incompatible entry: treat as a miss, it will be overwritten
+            self.misses += 1
+            return None
+        self.hits += 1
+        return df
+
+    def store(self, key: str, df: pd.DataFrame) -> None:
+        path = self._entry_path(key)
+        tmp = path.with_suffix(".tmp")
+        df.to_pickle(tmp)
+        os.replace(tmp, path)
+
+    def get_or_build(self, iv3_csv: Path, build: Callable[[], pd.DataFrame], **params: Any) -> pd.DataFrame:
+        """
+        Return the cached partition for `iv3_csv` + `params`, or build and store it.
+
+        Missing input files and empty (None) results are not cached: `build` is
+        called so it can raise its own error or return None again.
+        """
+        if not Path(iv3_csv).exists():
+            return build()
+
+        key = self.key(iv3_csv, **params)
+        cached = self.load(key)
+        if cached is not None:
+            return cached
+
+        df = build()
+        if df is not None:
+            self.store(key, df)
+        return df
+
+    def summary(self) -> str:
+        return f"cache: {self.hits} hit(s), {self.misses} rebuilt ({self.cache_dir})"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pickle"
+
+    def _write_index(self) -> None:
+        tmp = self._index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._digests, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self._index_path)
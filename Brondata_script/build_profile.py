@@ -0,0 +1,153 @@
+"""
+Stage-level timing and memory report for the builder CLIs (`--profile`).
+
+Each builder wraps its stages (read, pivot, filter, taakveldgroepen,
+herindeling, standen, aggregates, write, ...) in `profile_stage`, which
+records wall time, CPU time, the peak RSS of the process so far and, where
+the stage sets it, the number of rows it produced. Stages that belong to one
+(jaar, document) partition carry the partition label.
+
+Without a profile (`profile=None`) `profile_stage` only costs a couple of
+function calls per stage.
+
+Peak RSS uses `resource` (Linux/macOS) or, on Windows, `psutil` if it is
+installed; otherwise it is reported as unknown. Partitions built in worker
+processes report the peak RSS of their worker.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def peak_rss_mb() -> float | None:
+    """
+    Peak resident set size of the current process so far, in MB (None if unknown).
+    """
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kB on Linux, bytes on macOS
+        return rss / 1e6 if sys.platform == "darwin" else rss / 1e3
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1e6
+    return None
+
+
+class BuildProfile:
+    """
+    Collects one record per (stage, partition) run.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.records: list[dict[str, Any]] = []
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+
+    @contextmanager
+    def stage(self, stage: str, partition: str | None = None) -> Iterator[dict[str, Any]]:
+        """
+        Time the body of the `with` block; set `rec["rows"]` in the block to record a row count.
+        """
+        rec: dict[str, Any] = {"stage": stage, "partition": partition, "rows": None}
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield rec
+        finally:
+            rec["wall_s"] = time.perf_counter() - wall
+            rec["cpu_s"] = time.process_time() - cpu
+            rec["peak_rss_mb"] = peak_rss_mb()
+            self.records.append(rec)
+
+    def extend(self, records: list[dict[str, Any]]) -> None:
+        """
+        Add records collected elsewhere (e.g. in a worker process).
+        """
+        self.records.extend(records)
+
+    def stages(self) -> dict[str, dict[str, Any]]:
+        """
+        Totals per stage, in first-seen order.
+        """
+        totals: dict[str, dict[str, Any]] = {}
+        for rec in self.records:
+            tot = totals.setdefault(
+                rec["stage"], {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0, "rows": 0, "peak_rss_mb": None}
+            )
+            tot["wall_s"] += rec["wall_s"]
+            tot["cpu_s"] += rec["cpu_s"]
+            tot["calls"] += 1
+            tot["rows"] += rec["rows"] or 0
+            if rec["peak_rss_mb"] is not None:
+                tot["peak_rss_mb"] = max(tot["peak_rss_mb"] or 0.0, rec["peak_rss_mb"])
+        return totals
+
+    def report(self) -> dict[str, Any]:
+        rss = [rec["peak_rss_mb"] for rec in self.records if rec["peak_rss_mb"] is not None]
+        own_rss = peak_rss_mb()
+        return {
+            "builder": self.name,
+            "total_wall_s": time.perf_counter() - self._wall0,
+            "total_cpu_s": time.process_time() - self._cpu0,
+            "peak_rss_mb": max(rss + ([own_rss] if own_rss is not None else []), default=None),
+            "stages": self.stages(),
+            "partitions": self.records,
+        }
+
+    def summary(self) -> str:
+        rep = self.report()
+        rss = f"{rep['peak_rss_mb']:.0f} MB" if rep["peak_rss_mb"] is not None else "unknown"
+        lines = [
+            f"{self.name}: {rep['total_wall_s']:.2f} s wall, {rep['total_cpu_s']:.2f} s CPU, peak RSS {rss}",
+            f"  {'stage':<16} {'wall s':>9} {'CPU s':>9} {'calls':>6} {'rows':>12} {'peak MB':>8}",
+        ]
+        for stage, tot in rep["stages"].items():
+            peak = f"{tot['peak_rss_mb']:.0f}" if tot["peak_rss_mb"] is not None else "-"
+            lines.append(
+                f"  {stage:<16} {tot['wall_s']:9.3f} {tot['cpu_s']:9.3f} {tot['calls']:6d} {tot['rows']:12,} {peak:>8}"
+            )
+
+        slowest = sorted((r for r in self.records if r["partition"]), key=lambda r: -r["wall_s"])[:5]
+        if slowest:
+            lines.append("  slowest partition stages:")
+            lines += [f"    {r['partition']:<20} {r['stage']:<16} {r['wall_s']:9.3f} s" for r in slowest]
+        return "\n".join(lines)
+
+    def write(self, path: Path) -> Path:
+        """
+        Write the JSON report to `path` and the summary next to it (`.txt`); returns the summary path.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), indent=2), encoding="utf-8")
+        summary_path = path.with_suffix(".txt")
+        summary_path.write_text(self.summary() + "\n", encoding="utf-8")
+        return summary_path
+
+
+@contextmanager
+def profile_stage(profile: BuildProfile | None, stage: str, partition: str | None = None) -> Iterator[dict[str, Any]]:
+    """
+    `profile.stage(...)` if profiling, otherwise a no-op that still accepts `rec["rows"] = ...`.
+    """
+    if profile is None:
+        yield {}
+        return
+    with profile.stage(stage, partition) as rec:
+        yield rec
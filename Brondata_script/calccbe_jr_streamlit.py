@@ -4,36 +4,59 @@ Build the dataset used by `📈_Begroting_en_jaarrekening_vergelijken.py`.
 This script reads Iv3 CSV extracts (per year + document code), aggregates them to
 "taakveldgroepen", applies municipality mergers ("herindelingen"), optionally
 adds population-based "Per inwoner" values (if a population column is present),
-and finally writes `begroting_rekening.pickle` (and optionally CSV).
+and finally writes the `begroting_rekening` Parquet dataset (see
+`dataset_store.py`), and optionally a CSV. It also writes the precomputed
+Jaarrekening-minus-Begroting cube (`begroting_rekening_verschil`, see
+`verschil.py`) that the app's table view slices.
 
 Key outputs (long format):
 - Gemeenten, Jaar, Stand, Taakveld, Document, Categorie, Waarde
 
 Run:
-  python Brondata_script/calccbe_jr_streamlit.py --iv3-dir path/to/iv3data --out begroting_rekening.pickle
+  python -m Brondata_script.calccbe_jr_streamlit --iv3-dir path/to/iv3data --out begroting_rekening
+
+Use `--jobs N` to build the (jaar, document) partitions on N worker processes.
+Partitions are cached in `--cache-dir` (see `build_cache.py`) and only rebuilt
+when their Iv3 file, value column, rules or PARTITION_VERSION change;
+`--no-cache` disables this.
 """
 
 from __future__ import annotations
 
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterable
 
+import numpy as np
 import pandas as pd
 
+from Brondata_script.build_cache import DEFAULT_CACHE_DIR, PartitionCache, rules_version
+from Brondata_script.build_profile import BuildProfile, profile_stage
+from Brondata_script.dataset_store import write_dataset
+from Brondata_script.iv3_pivot import baten_lasten
+from Brondata_script.iv3_reader import read_iv3, stream_baten_lasten
+from Brondata_script.rollup import grouping_sets
+from Brondata_script.verschil import verschil_cube
+
 # Defaults (kept hard-coded to match the original script behavior/paths)
 DEFAULT_IV3_DIR = Path(r"C:\Dashboard\werk\iv3data")
 DEFAULT_CLASSES_CSV = Path(r"C:\Dashboard\werk\gemdata\gemeenteklassen2.csv")
 DEFAULT_YEAR_START = 2017
 DEFAULT_YEAR_END = 2024
-DEFAULT_OUT_PICKLE = Path("begroting_rekening.pickle")
-DEFAULT_OUT_CSV = Path("begroting_rekening.csv")
+DEFAULT_OUT_DATASET = Path("begroting_rekening")
+DEFAULT_OUT_VERSCHIL = Path("begroting_rekening_verschil")
 
 # Iv3 column names
 COL_TAAKVELD = "TaakveldBalanspost"
 COL_CATEGORIE = "Categorie"
 COL_GEMEENTE = "Gemeenten"
 
+# Raise when build_year_document's output changes for the same input (values,
+# columns or row order), so cached partitions are rebuilt (see build_cache.py)
+PARTITION_VERSION = 2
+
 
 # Aggregation groups (used by the Streamlit app)
 TAAKVELDGROEPEN: dict[str, tuple[str, ...]] = {
@@ -57,23 +80,16 @@ TAAKVELDGROEPEN: dict[str, tuple[str, ...]] = {
     "Wonen en bouwen": ("8.1", "8.3"),
 }
 
+# Taakvelden left out of TAAKVELDGROEPEN on purpose (not reported as unmatched):
+# mutaties reserves and the resultaat van de rekening
+TAAKVELDEN_ZONDER_GROEP: tuple[str, ...] = ("0.10", "0.11")
+
 
 def pivot_iv3(df: pd.DataFrame, value_col: str) -> pd.DataFrame:
     """
-    Pivot Iv3 raw records to a Gemeenten x Taakveld table, and calculate
-    Baten/Lasten/Saldo.
+    Baten/Lasten/Saldo per Gemeenten x Taakveld from Iv3 raw records (see iv3_pivot).
     """
-    pv = df.pivot(index=[COL_GEMEENTE, COL_TAAKVELD], columns=COL_CATEGORIE, values=[value_col])
-    pv.columns = [col[-1] for col in pv.columns]  # flatten multi-index
-
-    batencolumns = [col for col in pv.columns if str(col).startswith("B")]
-    lastencolumns = [col for col in pv.columns if str(col).startswith("L")]
-
-    pv["Baten"] = pv[batencolumns].sum(axis=1) if batencolumns else 0
-    pv["Lasten"] = pv[lastencolumns].sum(axis=1) if lastencolumns else 0
-    pv["Saldo"] = pv["Baten"] - pv["Lasten"]
-
-    return pv.reset_index()
+    return baten_lasten(df, value_col)
 
 
 def herindeling_rules() -> dict[str, tuple[int, dict[str, float]]]:
@@ -131,6 +147,8 @@ def herindeling_rules() -> dict[str, tuple[int, dict[str, float]]]:
 def apply_herindeling_for_year(values: pd.Series, jaar: int) -> pd.Series:
     """
     Apply herindelingen on a per-year Series indexed by Gemeenten.
+
+    The reference for `apply_herindeling_matrix` (see tests/test_herindeling.py).
     """
     rules = herindeling_rules()
     s = values.copy()
@@ -147,20 +165,159 @@ def apply_herindeling_for_year(values: pd.Series, jaar: int) -> pd.Series:
     return s
 
 
+@lru_cache(maxsize=64)
+def herindeling_steps(jaar: int, gemeenten: tuple[str, ...]) -> tuple[tuple[str, ...], tuple[tuple[int, int, int | float], ...]]:
+    """
+    Compile the herindelingen for `jaar` into row operations on a Gemeenten block.
+
+    Returns the gemeente of each row (the input `gemeenten`, then the new
+    gemeenten in rule order) and the steps (new row, old row, factor) in
+    the order `apply_herindeling_for_year` takes them. A step with new row
+    == old row is a self-reference: the row is dropped.
+    """
+    names = list(gemeenten)
+    rows = {g: i for i, g in enumerate(names)}
+    steps = []
+    for nieuwe_gem, (threshold_year, oude_gemeenten) in herindeling_rules().items():
+        if jaar > threshold_year:
+            continue
+        for oude_gem, factor in oude_gemeenten.items():
+            if oude_gem not in rows:
+                continue
+            if nieuwe_gem not in rows:
+                rows[nieuwe_gem] = len(names)
+                names.append(nieuwe_gem)
+            steps.append((rows[nieuwe_gem], rows[oude_gem], factor))
+    return tuple(names), tuple(steps)
+
+
+def apply_herindeling_matrix(df: pd.DataFrame, jaar: int) -> pd.DataFrame:
+    """
+    Apply herindelingen to long rows (Gemeenten, Taakveld, Categorie, Waarde)
+    on the Gemeenten x (Taakveld, Categorie) matrix, all columns at once.
+
+    Each step of `herindeling_steps` is one operation on two rows of the
+    matrix, with the same arithmetic as `apply_herindeling_for_year` on
+    each column, so values are identical. Rows come out as the per-group
+    loop over `apply_herindeling_for_year` gave them: groups sorted on
+    (Taakveld, Categorie), within a group the remaining gemeenten in input
+    order, then the new ones in the order they were added.
+    """
+    groups = df.groupby(["Taakveld", "Categorie"], dropna=False)
+    column = groups.ngroup().to_numpy()
+    rank = groups.cumcount().to_numpy()
+    labels = groups.size().index
+    gemeente, gemeenten = pd.factorize(df[COL_GEMEENTE])
+    names, steps = herindeling_steps(jaar, tuple(gemeenten))
+
+    shape = (len(names), len(labels))
+    values = np.full(shape, np.nan)
+    values[gemeente, column] = df["Waarde"].to_numpy(dtype=float)
+    present = np.zeros(shape, dtype=bool)
+    present[gemeente, column] = True
+    # Position of a gemeente within its group; added gemeenten go last, in order
+    order = np.zeros(shape, dtype=np.int64)
+    order[gemeente, column] = rank
+    added = len(df)
+
+    for new, old, factor in steps:
+        moved = present[old]
+        if new != old:
+            # As `s.loc[new] + factor * s.loc[old]`, or `factor * s.loc[old]` if new is absent
+            existing = moved & present[new]
+            created = moved & ~present[new]
+            values[new] = np.where(existing, values[new] + factor * values[old],
+                                   np.where(created, factor * values[old], values[new]))
+            order[new, created] = added
+            added += 1
+            present[new] |= moved
+        present[old] = False
+
+    row, col = np.nonzero(present)
+    keep = np.lexsort((order[row, col], col))
+    row, col = row[keep], col[keep]
+    return pd.DataFrame({
+        COL_GEMEENTE: np.asarray(names, dtype=object)[row],
+        "Taakveld": labels.get_level_values("Taakveld").to_numpy(dtype=object)[col],
+        "Categorie": labels.get_level_values("Categorie").to_numpy(dtype=object)[col],
+        "Waarde": values[row, col],
+    })
+
+
+@lru_cache(maxsize=1)
+def _taakveldgroep_trie() -> dict:
+    """
+    Character trie over all TAAKVELDGROEPEN prefixes. The "" key of a node
+    holds the groups whose prefix ends there.
+    """
+    trie: dict = {}
+    for group_name, prefixes in TAAKVELDGROEPEN.items():
+        for prefix in prefixes:
+            node = trie
+            for ch in prefix:
+                node = node.setdefault(ch, {})
+            node.setdefault("", []).append(group_name)
+    return trie
+
+
+@lru_cache(maxsize=None)
+def taakveldgroepen_for(taakveld: str) -> tuple[str, ...]:
+    """
+    All taakveldgroepen whose prefix matches `taakveld` (normally zero or one).
+    """
+    node = _taakveldgroep_trie()
+    found: list[str] = []
+    for ch in taakveld:
+        node = node.get(ch)
+        if node is None:
+            break
+        found.extend(node.get("", ()))
+    return tuple(dict.fromkeys(found))
+
+
+def classify_taakvelden(taakvelden: Iterable[str]) -> tuple[dict[str, tuple[str, ...]], list[str]]:
+    """
+    Report taakveld codes that match more than one taakveldgroep, and codes that match none.
+    TAAKVELDEN_ZONDER_GROEP (e.g. "0.10 Mutaties reserves", kept out of "0.1 " by its
+    trailing space) are not reported.
+    """
+    overlapping: dict[str, tuple[str, ...]] = {}
+    unmatched: list[str] = []
+    for tv in dict.fromkeys(str(t) for t in taakvelden):
+        groups = taakveldgroepen_for(tv)
+        if len(groups) > 1:
+            overlapping[tv] = groups
+        elif not groups and not tv.startswith(TAAKVELDEN_ZONDER_GROEP):
+            unmatched.append(tv)
+    return overlapping, unmatched
+
+
 def aggregate_to_taakveldgroepen(pv: pd.DataFrame) -> pd.DataFrame:
     """
     From pivoted Iv3 data, aggregate to TAAKVELDGROEPEN and return long rows.
+
+    Each unique taakveld code is classified once; a code matching several
+    groups counts towards each of them, as before.
     """
-    rows: list[pd.DataFrame] = []
-    for group_name, prefixes in TAAKVELDGROEPEN.items():
-        sub = pv[pv[COL_TAAKVELD].astype(str).str.startswith(prefixes)]
-        if sub.empty:
-            continue
-        agg = sub.groupby(COL_GEMEENTE, as_index=False)[["Baten", "Lasten", "Saldo"]].sum()
-        long = agg.melt(id_vars=[COL_GEMEENTE], value_vars=["Baten", "Lasten", "Saldo"], var_name="Categorie", value_name="Waarde")
-        long.insert(1, "Taakveld", group_name)
-        rows.append(long)
-    return pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=[COL_GEMEENTE, "Taakveld", "Categorie", "Waarde"])
+    codes = pv[COL_TAAKVELD].astype(str)
+    mapping = {tv: taakveldgroepen_for(tv) for tv in codes.unique()}
+
+    tagged = pv[[COL_GEMEENTE, "Baten", "Lasten", "Saldo"]].assign(Taakveld=codes.map(mapping))
+    if any(len(groups) > 1 for groups in mapping.values()):
+        tagged = tagged.explode("Taakveld")
+    else:
+        tagged["Taakveld"] = tagged["Taakveld"].str[0]
+    tagged = tagged.dropna(subset=["Taakveld"])
+    if tagged.empty:
+        return pd.DataFrame(columns=[COL_GEMEENTE, "Taakveld", "Categorie", "Waarde"])
+
+    tagged["Taakveld"] = pd.Categorical(tagged["Taakveld"], categories=list(TAAKVELDGROEPEN))
+    agg = tagged.groupby([COL_GEMEENTE, "Taakveld"], observed=True, as_index=False)[["Baten", "Lasten", "Saldo"]].sum()
+    long = agg.melt(id_vars=[COL_GEMEENTE, "Taakveld"], value_vars=["Baten", "Lasten", "Saldo"], var_name="Categorie", value_name="Waarde")
+    # Same row order as a per-group loop: group, then Categorie, then gemeente
+    long = long.sort_values("Taakveld", kind="stable", ignore_index=True)
+    long["Taakveld"] = long["Taakveld"].astype(str)
+    return long[[COL_GEMEENTE, "Taakveld", "Categorie", "Waarde"]]
 
 
 def build_year_document(
@@ -169,34 +326,52 @@ def build_year_document(
     jaar: int,
     document_label: str,
     value_col: str,
+    block_size: int | None = None,
+    profile: BuildProfile | None = None,
 ) -> pd.DataFrame:
     """
     Build long-format rows for one year + one document (Begroting/Jaarrekening).
+
+    With `block_size` (bytes), the Iv3 CSV is streamed in blocks instead of read and pivoted in memory.
+    With a `profile`, each stage is recorded under partition "{jaar}/{document_label}".
     """
     if not iv3_csv.exists():
         raise FileNotFoundError(f"Iv3 file not found: {iv3_csv}")
+    partition = f"{jaar}/{document_label}"
 
-    raw = pd.read_csv(iv3_csv)
-    pv = pivot_iv3(raw, value_col=value_col)
-    pv = pv[~pv[COL_TAAKVELD].astype(str).str.startswith(("A", "P"))]
-
-    df = aggregate_to_taakveldgroepen(pv)
-    df.insert(1, "Jaar", str(jaar))
-    df.insert(2, "Document", document_label)
-
-    # apply herindeling per (Taakveld, Categorie)
-    out_parts: list[pd.DataFrame] = []
-    for (taakveld, categorie), part in df.groupby(["Taakveld", "Categorie"], dropna=False):
-        s = part.set_index(COL_GEMEENTE)["Waarde"]
-        s2 = apply_herindeling_for_year(s, jaar)
-        p2 = s2.rename("Waarde").reset_index()
-        p2.insert(1, "Taakveld", taakveld)
-        p2.insert(2, "Categorie", categorie)
-        p2.insert(3, "Jaar", str(jaar))
-        p2.insert(4, "Document", document_label)
-        out_parts.append(p2)
-
-    out = pd.concat(out_parts, ignore_index=True) if out_parts else df
+    if block_size:
+        # Streaming reads and pivots in one pass
+        with profile_stage(profile, "read", partition) as rec:
+            pv = stream_baten_lasten(iv3_csv, value_col, block_size=block_size)
+            rec["rows"] = pv.attrs["iv3_read"]["rows"]
+    else:
+        with profile_stage(profile, "read", partition) as rec:
+            raw = read_iv3(iv3_csv, value_col)
+            rec["rows"] = len(raw)
+        with profile_stage(profile, "pivot", partition) as rec:
+            pv = pivot_iv3(raw, value_col=value_col)
+            rec["rows"] = len(pv)
+
+    with profile_stage(profile, "filter", partition) as rec:
+        pv = pv[~pv[COL_TAAKVELD].astype(str).str.startswith(("A", "P"))]
+        rec["rows"] = len(pv)
+
+    with profile_stage(profile, "taakveldgroepen", partition) as rec:
+        overlapping, unmatched = classify_taakvelden(pv[COL_TAAKVELD].unique())
+        for tv, groups in overlapping.items():
+            print(f"Warning: {iv3_csv.name}: taakveld {tv!r} matches several taakveldgroepen: {', '.join(groups)}")
+        for tv in unmatched:
+            print(f"Warning: {iv3_csv.name}: taakveld {tv!r} matches no taakveldgroep and is left out")
+
+        df = aggregate_to_taakveldgroepen(pv)
+        rec["rows"] = len(df)
+
+    # apply herindeling to all (Taakveld, Categorie) at once
+    with profile_stage(profile, "herindeling", partition) as rec:
+        out = apply_herindeling_matrix(df, jaar) if not df.empty else df
+        rec["rows"] = len(out)
+    out.insert(1, "Jaar", str(jaar))
+    out.insert(4, "Document", document_label)
     return out[[COL_GEMEENTE, "Jaar", "Taakveld", "Categorie", "Document", "Waarde"]]
 
 
@@ -242,73 +417,47 @@ def add_aggregates(df: pd.DataFrame, *, population_col: str | None = None) -> pd
     - Grootteklasse (sum)
 
     If `Stand == Per inwoner`, aggregation is based on sums of totals + sums of population.
+    All levels are computed in one pass with `rollup.grouping_sets`.
     """
     if "Provincie" not in df.columns or "Grootteklasse" not in df.columns:
         return df
 
     base_cols = ["Jaar", "Stand", "Document", "Categorie", "Taakveld"]
     total_base_cols = ["Jaar", "Document", "Categorie", "Taakveld"]
+    sets = [None, "Provincie", "Grootteklasse"]
 
     # Important: "Per inwoner" must be computed as (1000 * sum(Totaal) / sum(Inwoners)),
     # not as sum(per-inwoner) across gemeenten.
-    df_total = df[df["Stand"] == "Totaal"].copy()
-
-    def _sum_group(group_name: str, key_col: str) -> pd.DataFrame:
-        if df["Stand"].nunique() == 1 and df["Stand"].iloc[0] == "Totaal":
-            grp = df.groupby([key_col] + base_cols, as_index=False)["Waarde"].sum()
-            grp = grp.rename(columns={key_col: COL_GEMEENTE})
-            return grp
-
-        if population_col and population_col in df.columns:
-            grp = df_total.groupby([key_col] + total_base_cols, as_index=False).agg(
-                Waarde=("Waarde", "sum"),
-                pop=(population_col, "sum"),
-            )
-            grp_t = grp.copy()
+    df_total = df[df["Stand"] == "Totaal"]
+
+    if population_col and population_col in df.columns:
+        parts = []
+        for grp in grouping_sets(df_total, by=total_base_cols, sets=sets, sums=["Waarde", population_col]):
+            grp_t = grp.drop(columns=[population_col])
             grp_t.insert(2, "Stand", "Totaal")
-            grp_t = grp_t.drop(columns=["pop"])
 
             grp_p = grp.copy()
-            grp_p["Waarde"] = 1000 * grp_p["Waarde"] / grp_p["pop"]
+            grp_p["Waarde"] = 1000 * grp_p["Waarde"] / grp_p[population_col]
+            grp_p = grp_p.drop(columns=[population_col])
             grp_p.insert(2, "Stand", "Per inwoner")
-            grp_p = grp_p.drop(columns=["pop"])
 
-            out = pd.concat([grp_t, grp_p], ignore_index=True)
-            out = out.rename(columns={key_col: COL_GEMEENTE})
-            return out
+            parts.append(pd.concat([grp_t, grp_p], ignore_index=True))
+        return pd.concat([df, *parts], ignore_index=True)
 
-        # Fallback: just sum the already per-inwoner values (not ideal, but avoids crash)
-        grp = df.groupby([key_col] + base_cols, as_index=False)["Waarde"].mean()
-        grp = grp.rename(columns={key_col: COL_GEMEENTE})
-        return grp
+    # No population available: can only compute totals safely.
+    parts = grouping_sets(df_total, by=total_base_cols, sets=sets, sums=["Waarde"])
+    for grp in parts:
+        grp.insert(2, "Stand", "Totaal")
 
-    # Nederland
-    if population_col and population_col in df.columns:
-        nl_base = df_total.groupby(total_base_cols, as_index=False).agg(
-            Waarde=("Waarde", "sum"),
-            pop=(population_col, "sum"),
-        )
-        nl_t = nl_base.copy()
-        nl_t.insert(1, "Stand", "Totaal")
-        nl_t = nl_t.drop(columns=["pop"])
+    if not (df["Stand"] == "Totaal").all():
+        # Fallback: average the already per-inwoner values for Provincie/Grootteklasse
+        # (not ideal, but avoids crash)
+        parts[1:] = [
+            df.groupby([key] + base_cols, as_index=False)["Waarde"].mean().rename(columns={key: COL_GEMEENTE})
+            for key in sets[1:]
+        ]
 
-        nl_p = nl_base.copy()
-        nl_p["Waarde"] = 1000 * nl_p["Waarde"] / nl_p["pop"]
-        nl_p.insert(1, "Stand", "Per inwoner")
-        nl_p = nl_p.drop(columns=["pop"])
-
-        nl = pd.concat([nl_t, nl_p], ignore_index=True)
-        nl.insert(0, COL_GEMEENTE, "Nederland")
-    else:
-        # No population available: can only compute totals safely.
-        nl = df_total.groupby(total_base_cols, as_index=False)["Waarde"].sum()
-        nl.insert(0, COL_GEMEENTE, "Nederland")
-        nl.insert(2, "Stand", "Totaal")
-
-    prov = _sum_group("Provincie", "Provincie")
-    gro = _sum_group("Grootteklasse", "Grootteklasse")
-
-    return pd.concat([df, nl, prov, gro], ignore_index=True)
+    return pd.concat([df, *parts], ignore_index=True)
 
 
 def load_classes(classes_csv: Path) -> tuple[pd.DataFrame, str | None]:
@@ -326,32 +475,143 @@ def load_classes(classes_csv: Path) -> tuple[pd.DataFrame, str | None]:
     return kldf, pop_col
 
 
-def build_dataset(
+def build_year_documents(
     *,
     iv3_dir: Path,
     years: Iterable[int],
-    classes_csv: Path,
     value_col: str,
-) -> pd.DataFrame:
+    jobs: int = 1,
+    cache: PartitionCache | None = None,
+    block_size: int | None = None,
+    profile: BuildProfile | None = None,
+) -> list[pd.DataFrame]:
+    """
+    Build all (jaar, document) partitions, serially or on a process pool.
+
+    Partitions are independent, so with `jobs > 1` they are built in worker
+    processes. Results are always returned in (jaar, document) order, so the
+    concatenated output matches the serial build row for row.
+
+    With a `cache`, partitions whose inputs are unchanged are loaded from it and
+    only the remaining ones are built (and stored).
+
+    With a `profile`, partitions built in worker processes are profiled there
+    and their records merged into `profile`.
+    """
     docdict = {
         "Begroting": "000",
         "Jaarrekening": "005",
     }
 
-    classes_df, pop_col = load_classes(classes_csv)
+    tasks = [
+        dict(
+            iv3_csv=iv3_dir / f"{jaar}{doc_code}.csv",
+            jaar=jaar,
+            document_label=doc_label,
+            value_col=value_col,
+            block_size=block_size,
+        )
+        for jaar in years
+        for doc_label, doc_code in docdict.items()
+    ]
+
+    results: list[pd.DataFrame | None] = [None] * len(tasks)
+    keys: list[str | None] = [None] * len(tasks)
+    if cache is not None:
+        for i, task in enumerate(tasks):
+            if not task["iv3_csv"].exists():
+                continue  # let build_year_document raise
+            with profile_stage(profile, "cache", f"{task['jaar']}/{task['document_label']}") as rec:
+                keys[i] = cache.key(task["iv3_csv"], **partition_params(task))
+                results[i] = cache.load(keys[i])
+                rec["rows"] = len(results[i]) if results[i] is not None else None
+
+    todo = [i for i, part in enumerate(results) if part is None]
+
+    if jobs <= 1 or len(todo) <= 1:
+        for i in todo:
+            results[i] = build_year_document(**tasks[i], profile=profile)
+    else:
+        build = _build_year_document_profiled if profile is not None else build_year_document
+        with ProcessPoolExecutor(max_workers=min(jobs, len(todo))) as pool:
+            futures = {i: pool.submit(build, **tasks[i]) for i in todo}
+            # Collect in submission order (not completion order) to keep the output deterministic
+            for i in todo:
+                results[i] = futures[i].result()
+                if profile is not None:
+                    results[i], records = results[i]
+                    profile.extend(records)
+
+    if cache is not None:
+        for i in todo:
+            if keys[i] is not None:
+                cache.store(keys[i], results[i])
+
+    return results
+
+
+def _build_year_document_profiled(**task) -> tuple[pd.DataFrame, list[dict]]:
+    """
+    `build_year_document` in a worker process, returning its profile records with the result.
+    """
+    profile = BuildProfile("worker")
+    return build_year_document(**task, profile=profile), profile.records
 
-    parts: list[pd.DataFrame] = []
-    for jaar in years:
-        for doc_label, doc_code in docdict.items():
-            iv3_path = iv3_dir / f"{jaar}{doc_code}.csv"
-            part = build_year_document(iv3_csv=iv3_path, jaar=jaar, document_label=doc_label, value_col=value_col)
-            parts.append(part)
 
-    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
-    df = df.merge(classes_df, on=COL_GEMEENTE, how="left")
+def partition_params(task: dict) -> dict:
+    """
+    Everything besides the Iv3 file content that a (jaar, document) partition depends on.
+
+    block_size is left out: streaming and in-memory builds give the same partition
+    (bit-identical for the whole € 1.000 amounts of Iv3, see tests/test_streaming.py).
+    """
+    return {
+        "builder": "calccbe_jr_streamlit",
+        "version": PARTITION_VERSION,
+        "jaar": task["jaar"],
+        "document": task["document_label"],
+        "value_col": task["value_col"],
+        "herindeling": rules_version(herindeling_rules()),
+        "taakveldgroepen": rules_version(TAAKVELDGROEPEN),
+    }
 
-    df = add_standen(df, population_df=classes_df if pop_col else None, population_col=pop_col)
-    df = add_aggregates(df, population_col=pop_col)
+
+def build_dataset(
+    *,
+    iv3_dir: Path,
+    years: Iterable[int],
+    classes_csv: Path,
+    value_col: str,
+    jobs: int = 1,
+    cache: PartitionCache | None = None,
+    block_size: int | None = None,
+    profile: BuildProfile | None = None,
+) -> pd.DataFrame:
+    with profile_stage(profile, "classes") as rec:
+        classes_df, pop_col = load_classes(classes_csv)
+        rec["rows"] = len(classes_df)
+
+    parts = build_year_documents(
+        iv3_dir=iv3_dir,
+        years=years,
+        value_col=value_col,
+        jobs=jobs,
+        cache=cache,
+        block_size=block_size,
+        profile=profile,
+    )
+
+    with profile_stage(profile, "merge classes") as rec:
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+        df = df.merge(classes_df, on=COL_GEMEENTE, how="left")
+        rec["rows"] = len(df)
+
+    with profile_stage(profile, "standen") as rec:
+        df = add_standen(df, population_df=classes_df if pop_col else None, population_col=pop_col)
+        rec["rows"] = len(df)
+    with profile_stage(profile, "aggregates") as rec:
+        df = add_aggregates(df, population_col=pop_col)
+        rec["rows"] = len(df)
 
     # Keep only columns used by Streamlit app (extra class columns harmless, but keep tidy)
     keep_cols = [COL_GEMEENTE, "Jaar", "Stand", "Taakveld", "Document", "Categorie", "Waarde"]
@@ -377,26 +637,84 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--value-col", type=str, default="k_2ePlaatsing_2", help="Iv3 value column to use.")
     p.add_argument("--year-start", type=int, default=DEFAULT_YEAR_START)
     p.add_argument("--year-end", type=int, default=DEFAULT_YEAR_END)
-    p.add_argument("--out", type=Path, default=DEFAULT_OUT_PICKLE)
-    # Old script always wrote CSV too; keep that as default.
-    p.add_argument("--out-csv", type=Path, default=DEFAULT_OUT_CSV)
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for building (jaar, document) partitions (1 = serial).",
+    )
+    p.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for cached (jaar, document) intermediates.",
+    )
+    p.add_argument("--no-cache", action="store_true", help="Rebuild every partition and do not update the cache.")
+    p.add_argument(
+        "--stream-mb",
+        type=float,
+        default=None,
+        help="Stream each Iv3 CSV in blocks of this many MB instead of loading it whole (bounded memory).",
+    )
+    p.add_argument("--out", type=Path, default=DEFAULT_OUT_DATASET, help="Output dataset directory.")
+    p.add_argument("--out-csv", type=Path, default=None, help="Optionally also write the full dataset as CSV.")
+    p.add_argument(
+        "--out-verschil",
+        type=Path,
+        default=DEFAULT_OUT_VERSCHIL,
+        help="Output dataset directory for the Jaarrekening-minus-Begroting cube.",
+    )
+    p.add_argument(
+        "--profile",
+        type=Path,
+        nargs="?",
+        const=Path("build_profile_begroting_rekening.json"),
+        default=None,
+        help="Record time, CPU, peak RSS and rows per stage and partition; write a JSON report here (+ .txt summary).",
+    )
     return p.parse_args()
 
 
 def main() -> None:
     args = parse_args()
     years = range(args.year_start, args.year_end + 1)
-    df = build_dataset(iv3_dir=args.iv3_dir, years=years, classes_csv=args.classes_csv, value_col=args.value_col)
+    cache = None if args.no_cache else PartitionCache(args.cache_dir)
+    profile = BuildProfile("calccbe_jr_streamlit") if args.profile else None
+    df = build_dataset(
+        iv3_dir=args.iv3_dir,
+        years=years,
+        classes_csv=args.classes_csv,
+        value_col=args.value_col,
+        jobs=args.jobs,
+        cache=cache,
+        block_size=int(args.stream_mb * 1e6) if args.stream_mb else None,
+        profile=profile,
+    )
 
-    args.out.parent.mkdir(parents=True, exist_ok=True)
-    df.to_pickle(args.out)
+    with profile_stage(profile, "verschil") as rec:
+        verschil = verschil_cube(df)
+        rec["rows"] = len(verschil)
 
-    if args.out_csv is not None:
-        df.to_csv(args.out_csv, index=False)
+    with profile_stage(profile, "write") as rec:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        write_dataset(df, args.out, name="begroting_rekening")
+        args.out_verschil.parent.mkdir(parents=True, exist_ok=True)
+        write_dataset(verschil, args.out_verschil, partition_by=("Jaar",), name="begroting_rekening_verschil")
+
+        if args.out_csv is not None:
+            df.to_csv(args.out_csv, index=False)
+        rec["rows"] = len(df)
 
+    if cache is not None:
+        print(cache.summary())
     print(f"Wrote {len(df):,} rows to {args.out}")
+    print(f"Wrote {len(verschil):,} rows to {args.out_verschil}")
     if args.out_csv is not None:
         print(f"Wrote CSV to {args.out_csv}")
+    if profile is not None:
+        summary_path = profile.write(args.profile)
+        print(profile.summary())
+        print(f"Wrote profile to {args.profile} and {summary_path}")
 
 
 if __name__ == "__main__":
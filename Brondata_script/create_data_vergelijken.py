@@ -1,5 +1,16 @@
+import argparse
+from pathlib import Path
+
 import pandas as pd
 
+from Brondata_script.build_cache import DEFAULT_CACHE_DIR, PartitionCache
+from Brondata_script.build_profile import BuildProfile, profile_stage
+from Brondata_script.dataset_store import write_dataset
+from Brondata_script.iv3_pivot import baten_lasten
+from Brondata_script.iv3_reader import read_iv3, stream_baten_lasten
+from Brondata_script.rollup import grouping_sets
+from Brondata_script.taakveld_rollups import taakveld_rollups
+
 # Constants
 DATAMAP = "C:/Dashboard/werk/iv3data/%s.csv"
 KLASSEN_BASE_PATH = "C:/Dashboard/werk/gemdata/per_jaar"
@@ -11,6 +22,11 @@ COLUMN_NAMES = {
     'gemeenten': 'Gemeenten'
 }
 
+# Raise when build_document's output changes for the same input (values,
+# columns or row order), e.g. a change to filter_taakvelden or the
+# per-taakveld split, so cached partitions are rebuilt (see build_cache.py)
+PARTITION_VERSION = 1
+
 DOCDICT = {
     "Begroting": "000",
     "Jaarrekening": "005",
@@ -72,27 +88,11 @@ HERINDELERS = {
 
 
 def pivotIv3(df, k_col=None):
-    """Pivot the dataframe and calculate Baten, Lasten, and Saldo."""
+    """Calculate Baten, Lasten, and Saldo per gemeente and taakveld (see iv3_pivot)."""
     if k_col is None:
         k_col = COLUMN_NAMES['waarde_col']
     
-    t = COLUMN_NAMES['taakveld']
-    c = COLUMN_NAMES['categorie']
-    g = COLUMN_NAMES['gemeenten']
-    
-    pv = df.pivot(index=[g, t], columns=c, values=[k_col])
-    
-    pv.columns = [col[-1] for col in pv.columns]
-    batencolumns = [col for col in pv.columns if col.startswith("B")]
-    lastencolumns = [col for col in pv.columns if col.startswith("L")]
-    
-    pv['Baten'] = pv[batencolumns].sum(axis=1)
-    pv['Lasten'] = pv[lastencolumns].sum(axis=1)
-    pv['Saldo'] = pv.apply(lambda row: row.Baten - row.Lasten, axis=1)
-    
-    df2 = pv.reset_index()
-    
-    return df2
+    return baten_lasten(df, k_col)
 
 
 def calc_mult(m0, mi):
@@ -139,23 +139,61 @@ def filter_taakvelden(taakvelden):
     return [i for i in taakvelden if not i.startswith(("A", "P"))]
 
 
-def create_taakveld_dataframe(pv, taakveld, categorie, jaar, document_naam):
-    """Create a dataframe for a specific taakveld and categorie."""
+def taakveld_prefix_mapping(taakvelden):
+    """Map each taakveld to every taakveld whose name starts with it (including itself).
+
+    A taakveld's rows have always been selected with str.startswith, so this
+    keeps that meaning while the selection itself becomes a single merge.
+    """
+    pairs = [(tv, sub) for tv in taakvelden for sub in taakvelden if sub.startswith(tv)]
+    return pd.DataFrame(pairs, columns=['Taakveld', COLUMN_NAMES['taakveld']])
+
+
+def create_taakveld_frames(pv, taakvelden, jaar, document_naam):
+    """Sum Baten, Lasten and Saldo per taakveld and gemeente in one pass.
+
+    Rows are ordered by taakveld (in the given order), then categorie, then
+    gemeente, with Gemeenten as the index.
+    """
     t = COLUMN_NAMES['taakveld']
     g = COLUMN_NAMES['gemeenten']
+    categorieen = ['Baten', 'Lasten', 'Saldo']
+    
+    tagged = pv[[g, t, *categorieen]].merge(taakveld_prefix_mapping(taakvelden), on=t)
+    tagged['Taakveld'] = pd.Categorical(tagged['Taakveld'], categories=taakvelden)
+    sums = tagged.groupby(['Taakveld', g], observed=True)[categorieen].sum().reset_index()
     
-    tvalues = pv.loc[pv[t].str.startswith(taakveld)].groupby(g)[categorie].sum().rename('Waarde')
-    tvalueframe = tvalues.to_frame()
-    tvalueframe.insert(0, 'Categorie', categorie)
-    tvalueframe.insert(0, 'Taakveld', taakveld)
-    tvalueframe.insert(0, 'Document', document_naam)
-    tvalueframe.insert(0, 'Jaar', jaar)
+    long = sums.melt(id_vars=['Taakveld', g], value_vars=categorieen, var_name='Categorie', value_name='Waarde')
+    long = long.sort_values('Taakveld', kind='stable')
+    long['Taakveld'] = long['Taakveld'].astype(str)
+    long.insert(0, 'Document', document_naam)
+    long.insert(0, 'Jaar', jaar)
     
-    return tvalueframe
+    return long.set_index(g)[['Jaar', 'Document', 'Taakveld', 'Categorie', 'Waarde']]
 
 
-def process_document(jaar, document_naam, doc_code):
-    """Process a single document (Begroting or Jaarrekening) for a given year."""
+def document_params(jaar, document_naam, k_col):
+    """Everything besides the Iv3 file content that a (jaar, document) partition depends on.
+
+    block_size is left out: streaming and in-memory builds give the same partition
+    (bit-identical for the whole € 1.000 amounts of Iv3, see tests/test_streaming.py).
+    """
+    return {
+        'builder': 'create_data_vergelijken',
+        'version': PARTITION_VERSION,
+        'jaar': jaar,
+        'document': document_naam,
+        'value_col': k_col,
+    }
+
+
+def process_document(jaar, document_naam, doc_code, cache=None, block_size=None, profile=None):
+    """Process a single document (Begroting or Jaarrekening) for a given year.
+
+    With a PartitionCache, an unchanged Iv3 file is loaded from the cache instead of rebuilt.
+    With a block_size (bytes), the Iv3 file is streamed instead of loaded whole.
+    With a BuildProfile, each stage is recorded under partition "{jaar}/{document_naam}".
+    """
     # Skip if year is beyond available data
     if jaar > 2026 or (jaar >= 2025 and document_naam == "Jaarrekening"):
         return None
@@ -163,27 +201,53 @@ def process_document(jaar, document_naam, doc_code):
     # Get appropriate value column
     k_col = get_waarde_column(jaar)
     
-    # Load and pivot data
     document = str(jaar) + doc_code
-    df = pd.read_csv(DATAMAP % document)
-    pv = pivotIv3(df, k_col=k_col)
+    if cache is not None:
+        return cache.get_or_build(
+            Path(DATAMAP % document),
+            lambda: build_document(jaar, document_naam, document, k_col, block_size, profile),
+            **document_params(jaar, document_naam, k_col),
+        )
+    return build_document(jaar, document_naam, document, k_col, block_size, profile)
+
+
+def build_document(jaar, document_naam, document, k_col, block_size=None, profile=None):
+    """Read, pivot and split one Iv3 file into per-taakveld rows."""
+    partition = f"{jaar}/{document_naam}"
+    
+    # Load and pivot data
+    if block_size:
+        # Streaming reads and pivots in one pass
+        with profile_stage(profile, 'read', partition) as rec:
+            pv = stream_baten_lasten(DATAMAP % document, k_col, block_size=block_size)
+            rec['rows'] = pv.attrs['iv3_read']['rows']
+    else:
+        with profile_stage(profile, 'read', partition) as rec:
+            df = read_iv3(DATAMAP % document, k_col)
+            rec['rows'] = len(df)
+        with profile_stage(profile, 'pivot', partition) as rec:
+            pv = pivotIv3(df, k_col=k_col)
+            rec['rows'] = len(pv)
+    
+    return split_taakvelden(pv, jaar, document_naam, profile=profile)
+
+
+def split_taakvelden(pv, jaar, document_naam, profile=None):
+    """Turn a pivoted Iv3 file into Baten/Lasten/Saldo rows per taakveld."""
+    partition = f"{jaar}/{document_naam}"
     
     # Get and filter taakvelden
-    taakvelden = pv[COLUMN_NAMES['taakveld']].unique()
-    taakvelden = filter_taakvelden(taakvelden)
+    with profile_stage(profile, 'filter', partition) as rec:
+        taakvelden = pv[COLUMN_NAMES['taakveld']].unique()
+        taakvelden = filter_taakvelden(taakvelden)
+        rec['rows'] = len(taakvelden)
     
-    # Create dataframes for each taakveld and categorie
-    dataframes = []
-    for tv in taakvelden:
-        for categorie in ['Baten', 'Lasten', 'Saldo']:
-            tvalueframe = create_taakveld_dataframe(pv, tv, categorie, jaar, document_naam)
-            dataframes.append(tvalueframe)
+    # Baten, Lasten and Saldo per taakveld and gemeente
+    with profile_stage(profile, 'taakvelden', partition) as rec:
+        combined_df = create_taakveld_frames(pv, taakvelden, jaar, document_naam) if taakvelden else None
+        rec['rows'] = len(combined_df) if combined_df is not None else 0
     
-    # Combine all dataframes
-    if dataframes:
-        combined_df = pd.concat(dataframes)
-        return combined_df
-    return None
+    return combined_df
 
 
 def load_gemeenteklassen(jaar):
@@ -197,12 +261,12 @@ def load_gemeenteklassen(jaar):
     return kldf
 
 
-def process_year(jaar):
+def process_year(jaar, cache=None, block_size=None, profile=None):
     """Process all documents for a single year and merge with gemeenteklassen."""
     bejr = []
     
     for naam, doc in DOCDICT.items():
-        result = process_document(jaar, naam, doc)
+        result = process_document(jaar, naam, doc, cache=cache, block_size=block_size, profile=profile)
         if result is not None:
             bejr.append(result)
     
@@ -214,45 +278,26 @@ def process_year(jaar):
         outputdf = pd.concat(bejr)
     
     # Merge with gemeenteklassen
-    kldf = load_gemeenteklassen(jaar)
-    merged_df = pd.merge(outputdf, kldf, on="Gemeenten")
+    with profile_stage(profile, 'classes', str(jaar)) as rec:
+        kldf = load_gemeenteklassen(jaar)
+        merged_df = pd.merge(outputdf, kldf, on="Gemeenten")
+        rec['rows'] = len(merged_df)
     
     return merged_df
 
 
 def add_aggregate_groups(df):
-    """Add aggregate groups (Nederland, Provincie, Gemeentegrootte, Stedelijkheid)."""
-    # Group by all gemeenten (Nederland)
-    all_groups = df.groupby(['Jaar', 'Document', 'Categorie', 'Taakveld']).agg({
-        'Waarde': 'sum',
-        'Inwonertal': 'sum'
-    }).reset_index()
-    all_groups['Gemeenten'] = 'Nederland'
-    df = pd.concat([df, all_groups], ignore_index=True)
-    
-    # Group by provincie
-    provincie_groups = df.groupby(['Provincie', 'Jaar', 'Document', 'Categorie', 'Taakveld']).agg({
-        'Waarde': 'sum',
-        'Inwonertal': 'sum'
-    }).reset_index()
-    provincie_groups = provincie_groups.rename(columns={'Provincie': 'Gemeenten'})
-    df = pd.concat([df, provincie_groups], ignore_index=True)
-    
-    # Group by gemeentegrootte
-    grootteklasse_groups = df.groupby(['Gemeentegrootte', 'Jaar', 'Document', 'Categorie', 'Taakveld']).agg({
-        'Waarde': 'sum',
-        'Inwonertal': 'sum'
-    }).reset_index()
-    grootteklasse_groups = grootteklasse_groups.rename(columns={'Gemeentegrootte': 'Gemeenten'})
-    df = pd.concat([df, grootteklasse_groups], ignore_index=True)
-    
-    # Group by stedelijkheid
-    stedelijkheid_groups = df.groupby(['Stedelijkheid', 'Jaar', 'Document', 'Categorie', 'Taakveld']).agg({
-        'Waarde': 'sum',
-        'Inwonertal': 'sum'
-    }).reset_index()
-    stedelijkheid_groups = stedelijkheid_groups.rename(columns={'Stedelijkheid': 'Gemeenten'})
-    df = pd.concat([df, stedelijkheid_groups], ignore_index=True)
+    """Add aggregate groups (Nederland, Provincie, Gemeentegrootte, Stedelijkheid).
+
+    All groups are summed from the gemeente rows in one pass, see rollup.grouping_sets.
+    """
+    groups = grouping_sets(
+        df,
+        by=['Jaar', 'Document', 'Categorie', 'Taakveld'],
+        sets=[None, 'Provincie', 'Gemeentegrootte', 'Stedelijkheid'],
+        sums=['Waarde', 'Inwonertal'],
+    )
+    df = pd.concat([df, *groups], ignore_index=True)
     
     # Clean up
     df = df.drop(columns=['Provincie', 'Gemeentegrootte', 'Stedelijkheid'])
@@ -261,12 +306,12 @@ def add_aggregate_groups(df):
     return df
 
 
-def process_all_years(start_year=2017, end_year=2027):
+def process_all_years(start_year=2017, end_year=2027, cache=None, block_size=None, profile=None):
     """Process all years and combine into a single dataframe."""
     all_dataframes = []
     
     for jaar in range(start_year, end_year):
-        result = process_year(jaar)
+        result = process_year(jaar, cache=cache, block_size=block_size, profile=profile)
         if result is not None:
             all_dataframes.append(result)
     
@@ -277,34 +322,73 @@ def process_all_years(start_year=2017, end_year=2027):
     return combined_df
 
 
-def save_output(df, output_path="begroting_rekening_per_taakveld.pickle"):
-    """Save the final dataframe to a pickle file."""
-    df.to_pickle(output_path)
-    # Alternative CSV output (commented out):
-    # Only keep rows where Jaar > 2023
+def save_output(df, output_path="begroting_rekening_per_taakveld"):
+    """Save the final dataframe as a partitioned Parquet dataset (see dataset_store.py)."""
+    write_dataset(df, output_path, name="begroting_rekening_per_taakveld")
+    # CSV extract: only keep rows where Jaar > 2023
     df = df[df['Jaar'] > 2023]
-    df.to_csv(output_path.replace('.pickle', '.csv'), sep=",", decimal=".", float_format='%.4f')
+    df.to_csv(f"{output_path}.csv", sep=",", decimal=".", float_format='%.4f')
+
+
+def save_rollups(rollups, output_path="begroting_rekening_per_taakveld_rollups"):
+    """Save the hoofdtaakveld/taakveld rollups as a partitioned Parquet dataset (see taakveld_rollups.py)."""
+    write_dataset(rollups, output_path, name="begroting_rekening_per_taakveld_rollups")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Generate begroting_rekening_per_taakveld dataset for Streamlit.")
+    p.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR,
+                   help="Directory for cached (jaar, document) intermediates.")
+    p.add_argument("--no-cache", action="store_true", help="Rebuild every document and do not update the cache.")
+    p.add_argument("--stream-mb", type=float, default=None,
+                   help="Stream each Iv3 CSV in blocks of this many MB instead of loading it whole (bounded memory).")
+    p.add_argument("--profile", type=Path, nargs="?", const=Path("build_profile_per_taakveld.json"), default=None,
+                   help="Record time, CPU, peak RSS and rows per stage and partition; write a JSON report here (+ .txt summary).")
+    return p.parse_args()
 
 
 def main():
     """Main function to execute the data processing pipeline."""
+    args = parse_args()
     pd.set_option('display.max_columns', None)
     
+    cache = None if args.no_cache else PartitionCache(args.cache_dir)
+    profile = BuildProfile('create_data_vergelijken') if args.profile else None
+    
     # Process all years
     print("Processing data...")
-    df = process_all_years()
+    block_size = int(args.stream_mb * 1e6) if args.stream_mb else None
+    df = process_all_years(cache=cache, block_size=block_size, profile=profile)
+    if cache is not None:
+        print(cache.summary())
     
     # Add aggregate groups
     print("Adding aggregate groups...")
-    df = add_aggregate_groups(df)
+    with profile_stage(profile, 'aggregates') as rec:
+        df = add_aggregate_groups(df)
+        rec['rows'] = len(df)
+    
+    # Hoofdtaakveld and taakveld values for page 1, Totaal and Per inwoner
+    print("Adding rollups...")
+    with profile_stage(profile, 'rollups') as rec:
+        rollups = taakveld_rollups(df)
+        rec['rows'] = len(rollups)
     
     # Display results
     print(df)
     
     # Save output
     print("Saving output...")
-    save_output(df)
+    with profile_stage(profile, 'write') as rec:
+        save_output(df)
+        save_rollups(rollups)
+        rec['rows'] = len(df) + len(rollups)
     print("Done!")
+    
+    if profile is not None:
+        summary_path = profile.write(args.profile)
+        print(profile.summary())
+        print(f"Wrote profile to {args.profile} and {summary_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+"""
+Partitioned Parquet dataset format for the builder outputs.
+
+A dataset is a directory with one Parquet file per (Jaar, Document)
+partition plus a small `manifest.json`:
+
+  begroting_rekening/
+    manifest.json
+    Jaar=2017/Document=Begroting/part-0.parquet
+    ...
+
+String columns are stored dictionary-encoded and come back as pandas
+categoricals. The manifest lists every partition with its values and row
+count, so readers can load only the partitions they need without listing
+directories or opening other files.
+
+Used by the builder scripts (`write_dataset`) and by the Streamlit pages
+(`load_dataset`), so it only depends on pandas and pyarrow.
+
+The pages keep their working layout of a dataset (e.g. sorted on their
+lookup keys, or as an array cube) in a single uncompressed Arrow IPC file
+(`write_mapped`) with JSON metadata. `read_mapped` memory-maps it, so every
+process that reads the file shares its pages in the OS page cache instead
+of holding its own copy of the data.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+FORMAT_NAME = "begroting-dataset"
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+DEFAULT_PARTITION_BY = ("Jaar", "Document")
+MAPPED_SUFFIX = ".arrow"
+MAPPED_METADATA_KEY = b"begroting"
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fields = []
+    for field in table.schema:
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+        fields.append(field)
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+def write_dataset(
+    df: pd.DataFrame,
+    path: Path | str,
+    *,
+    partition_by: Iterable[str] = DEFAULT_PARTITION_BY,
+    name: str | None = None,
+) -> dict:
+    """
+    Write `df` as a partitioned Parquet dataset at `path` (a directory) and return its manifest.
+
+    The dataset is written next to `path` first and then moved into place, so
+    readers never see a half-written dataset.
+    """
+    path = Path(path)
+    partition_by = list(partition_by)
+    tmp = path.with_name(path.name + ".tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    df = df.reset_index(drop=True)
+    partitions = []
+    for values, part in df.groupby(partition_by, sort=False, observed=True, dropna=False):
+        values = values if isinstance(values, tuple) else (values,)
+        key = {col: str(v) for col, v in zip(partition_by, values)}
+        rel = Path(*(f"{col}={quote(v, safe='')}" for col, v in key.items())) / "part-0.parquet"
+        (tmp / rel).parent.mkdir(parents=True, exist_ok=True)
+        # Partition columns stay in the file (they compress to nothing) so their dtypes round-trip
+        pq.write_table(_to_arrow(part), tmp / rel, compression="zstd")
+        partitions.append({"values": key, "path": rel.as_posix(), "rows": len(part)})
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "name": name or path.name,
+        "created": pd.Timestamp.now(tz="UTC").isoformat(),
+        "rows": len(df),
+        "columns": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "partition_by": partition_by,
+        "partitions": partitions,
+    }
+    (tmp / MANIFEST_FILE).write_text(json.dumps(manifest, indent=1, ensure_ascii=False), encoding="utf-8")
+
+    if path.exists():
+        shutil.rmtree(path)
+    os.replace(tmp, path)
+    return manifest
+
+
+def read_manifest(path: Path | str) -> dict:
+    """
+    Read and validate the manifest of the dataset at `path`.
+    """
+    manifest = json.loads((Path(path) / MANIFEST_FILE).read_text(encoding="utf-8"))
+    if manifest.get("format") != FORMAT_NAME:
+        raise ValueError(f"{path} is not a {FORMAT_NAME} dataset")
+    if manifest.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {manifest['version']}, this reader supports up to {FORMAT_VERSION}")
+    return manifest
+
+
+def dataset_version(path: Path | str) -> str:
+    """
+    Short version string of the dataset at `path`: a hash of its manifest.
+
+    The manifest records the write time and every partition, so each rewrite
+    of the dataset gets a new version.
+    """
+    manifest = (Path(path) / MANIFEST_FILE).read_bytes()
+    return hashlib.sha256(manifest).hexdigest()[:16]
+
+
+def select_partitions(manifest: dict, **filters) -> list[dict]:
+    """
+    Partitions of `manifest` matching `filters`, e.g. Jaar=["2023", "2024"], Document="Begroting".
+    """
+    wanted = {}
+    for col, value in filters.items():
+        if value is None:
+            continue
+        if col not in manifest["partition_by"]:
+            raise KeyError(f"Dataset is not partitioned by {col!r}")
+        values = [value] if isinstance(value, (str, int)) else value
+        wanted[col] = {str(v) for v in values}
+
+    return [p for p in manifest["partitions"] if all(p["values"][col] in vals for col, vals in wanted.items())]
+
+
+def load_dataset(path: Path | str, *, columns: list[str] | None = None, **filters) -> pd.DataFrame:
+    """
+    Load (a selection of partitions of) the dataset at `path`.
+
+    String columns are returned as categoricals with categories unified across partitions.
+    """
+    path = Path(path)
+    manifest = read_manifest(path)
+    selected = select_partitions(manifest, **filters)
+
+    # partitioning=None: the Jaar=.../Document=... directory names are informational only
+    tables = [pq.read_table(path / p["path"], columns=columns, partitioning=None) for p in selected]
+    if not tables:
+        return pd.DataFrame(columns=columns or list(manifest["columns"]))
+
+    table = pa.concat_tables(tables)
+    return table.to_pandas()
+
+
+def _json_default(value):
+    """JSON value of NumPy scalars (e.g. counts in a metadata dict)."""
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def write_mapped(table: pa.Table, path: Path | str, metadata: dict) -> None:
+    """
+    Write `table` as an uncompressed Arrow IPC file at `path`, with `metadata` (JSON).
+
+    The table is written as one record batch, so `read_mapped` gives each
+    column as one contiguous buffer. The file is written next to `path`
+    first and then moved into place, so readers (also in other processes)
+    see the old or the new file, never a half-written one.
+    """
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    table = table.unify_dictionaries().combine_chunks()
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        MAPPED_METADATA_KEY: json.dumps(metadata, ensure_ascii=False, default=_json_default),
+    })
+    try:
+        with pa.OSFile(str(tmp), "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(len(table), 1))
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def read_mapped(path: Path | str) -> tuple[pa.Table, dict]:
+    """
+    Memory-map the Arrow IPC file at `path` (see write_mapped) and return its table and metadata.
+
+    The columns are not copied: their buffers point into the mapped file.
+    """
+    table = ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    metadata = json.loads((table.schema.metadata or {})[MAPPED_METADATA_KEY])
+    return table, metadata
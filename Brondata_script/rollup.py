@@ -0,0 +1,57 @@
+"""
+Grouping-sets aggregation for the Nederland/Provincie/Grootteklasse/Stedelijkheid rollups.
+
+Both builders add aggregate "gemeenten" (Nederland, each provincie, each
+grootte- or stedelijkheidsklasse) by summing the gemeente rows. Instead of a
+separate groupby over the (growing) frame per level, `grouping_sets` groups
+the base rows once on the dimensions plus all rollup keys, and derives every
+grouping set from that much smaller intermediate.
+
+Rows with a missing key are left out of that key's grouping set, as with a
+plain groupby.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import pandas as pd
+
+# Label of the grouping set without a key (all gemeenten together)
+TOTAL_LABEL = "Nederland"
+
+
+def grouping_sets(
+    df: pd.DataFrame,
+    *,
+    by: Sequence[str],
+    sets: Sequence[str | None],
+    sums: Sequence[str],
+    label_col: str = "Gemeenten",
+    total_label: str = TOTAL_LABEL,
+) -> list[pd.DataFrame]:
+    """
+    Sum `sums` over `by` for each grouping set in `sets`, in one pass over `df`.
+
+    Each entry of `sets` is a key column (e.g. "Provincie") or None for the
+    grand total. Returns one frame per set, with columns `label_col`, *by,
+    *sums; `label_col` holds the key value (or `total_label`). Rows are sorted
+    on (key, *by), as a groupby per set would.
+    """
+    by = list(by)
+    sums = list(sums)
+    keys = list(dict.fromkeys(k for k in sets if k is not None))
+
+    # The single pass over the base rows: everything else works on this intermediate
+    cube = df.groupby(by + keys, dropna=False, observed=True, sort=False)[sums].sum().reset_index()
+
+    out = []
+    for key in sets:
+        if key is None:
+            part = cube.groupby(by, observed=True)[sums].sum().reset_index()
+            part.insert(0, label_col, total_label)
+        else:
+            part = cube.groupby([key] + by, observed=True)[sums].sum().reset_index()
+            part = part.rename(columns={key: label_col})
+        out.append(part)
+    return out
@@ -0,0 +1,218 @@
+"""
+Generate synthetic Iv3 extracts (and matching classes files) for benchmarks.
+
+The real Iv3 files live on a Windows share; this writes files with the same
+layout so both builders can be run and timed anywhere:
+
+  out_dir/iv3data/{jaar}000.csv, {jaar}005.csv   Iv3 records (Begroting, Jaarrekening)
+  out_dir/gemeenteklassen.csv                    Provincie/Grootteklasse/Inwoners (calccbe_jr_streamlit)
+  out_dir/per_jaar/{jaar}.csv                    per-year classes, ';' + decimal ',' (create_data_vergelijken)
+
+Gemeenten include the constituents of the herindelingen (Littenseradiel,
+Winsum, Haaren, ...) for the years before their merger, so the herindeling
+code paths are exercised.
+
+Run:
+  python -m Brondata_script.synthetic_iv3 --out-dir bench_data --gemeenten 340 --year-start 2017 --year-end 2026
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DOCUMENTS = {"000": "Begroting", "005": "Jaarrekening"}
+
+# Taakvelden as used in Iv3 (subset of the 2017+ set plus reserves/result and balance posts)
+TAAKVELDEN = [
+    "0.1 Bestuur", "0.2 Burgerzaken", "0.3 Beheer overige gebouwen en gronden", "0.4 Overhead",
+    "0.5 Treasury", "0.61 OZB woningen", "0.62 OZB niet-woningen", "0.63 Parkeerbelasting",
+    "0.64 Belastingen overig", "0.7 Algemene uitkering en overige uitkeringen gemeentefonds",
+    "0.8 Overige baten en lasten", "0.9 Vennootschapsbelasting (Vpb)", "0.10 Mutaties reserves",
+    "0.11 Resultaat van de rekening van baten en lasten",
+    "1.1 Crisisbeheersing en brandweer", "1.2 Openbare orde en veiligheid",
+    "2.1 Verkeer en vervoer", "2.2 Parkeren", "2.3 Recreatieve havens",
+    "2.4 Economische havens en waterwegen", "2.5 Openbaar vervoer",
+    "3.1 Economische ontwikkeling", "3.2 Fysieke bedrijfsinfrastructuur",
+    "3.3 Bedrijvenloket en bedrijfsregelingen", "3.4 Economische promotie",
+    "4.1 Openbaar basisonderwijs", "4.2 Onderwijshuisvesting", "4.3 Onderwijsbeleid en leerlingzaken",
+    "5.1 Sportbeleid en activering", "5.2 Sportaccommodaties",
+    "5.3 Cultuurpresentatie, cultuurproductie en cultuurparticipatie", "5.4 Musea",
+    "5.5 Cultureel erfgoed", "5.6 Media", "5.7 Openbaar groen en (openlucht) recreatie",
+    "6.1 Samenkracht en burgerparticipatie", "6.2 Toegang en eerstelijnsvoorzieningen",
+    "6.3 Inkomensregelingen", "6.4 WSW en beschut werk", "6.5 Arbeidsparticipatie",
+    "6.6 Maatwerkvoorzieningen (Wmo)", "6.71a Huishoudelijke hulp (Wmo)", "6.71b Begeleiding (Wmo)",
+    "6.71c Dagbesteding (Wmo)", "6.71d Overige maatwerkarrangementen (Wmo)",
+    "6.72a Jeugdzorg begeleiding", "6.72b Jeugdzorg behandeling", "6.72c Jeugdhulp dagbesteding",
+    "6.72d Jeugdhulp zonder verblijf overig", "6.73a Pleegzorg", "6.73b Gezinsgericht",
+    "6.73c Jeugdhulp met verblijf overig", "6.74a Jeugd behandeling GGZ zonder verblijf",
+    "6.74b Jeugdhulp crisis/LTA/GGZ-verblijf", "6.74c Gesloten plaatsing",
+    "6.81a Beschermd wonen (Wmo)", "6.81b Maatschappelijke- en vrouwenopvang (Wmo)",
+    "6.82a Jeugdbescherming", "6.82b Jeugdreclassering",
+    "7.1 Volksgezondheid", "7.2 Riolering", "7.3 Afval", "7.4 Milieubeheer",
+    "7.5 Begraafplaatsen en crematoria", "8.1 Ruimte en leefomgeving",
+    "8.2 Grondexploitatie (niet-bedrijventerreinen)", "8.3 Wonen en bouwen",
+    "A1 Immateriële vaste activa", "A2 Materiële vaste activa", "A3 Financiële vaste activa",
+    "P1 Eigen vermogen", "P2 Voorzieningen", "P3 Vaste schulden",
+]
+
+CATEGORIEEN = [
+    "B1.1", "B2.1", "B2.2", "B3.1", "B3.2", "B3.3", "B4.1", "B4.2", "B4.3.1", "B5.1", "B7.1",
+    "L1.1", "L1.2", "L2.1", "L3.1", "L3.2", "L3.3", "L4.1", "L4.2", "L4.3.1", "L6.1", "L7.1",
+    "9.1", "9.2",
+]
+
+PROVINCIES = [
+    "Groningen", "Fryslân", "Drenthe", "Overijssel", "Flevoland", "Gelderland",
+    "Utrecht", "Noord-Holland", "Zuid-Holland", "Zeeland", "Noord-Brabant", "Limburg",
+]
+
+GROOTTEKLASSEN = [
+    (5_000, "minder dan 5.000 inwoners"),
+    (10_000, "5.000 tot 10.000 inwoners"),
+    (20_000, "10.000 tot 20.000 inwoners"),
+    (50_000, "20.000 tot 50.000 inwoners"),
+    (100_000, "50.000 tot 100.000 inwoners"),
+    (150_000, "100.000 tot 150.000 inwoners"),
+    (250_000, "150.000 tot 250.000 inwoners"),
+    (np.inf, "250.000 inwoners of meer"),
+]
+
+STEDELIJKHEID = ["Zeer sterk stedelijk", "Sterk stedelijk", "Matig stedelijk", "Weinig stedelijk", "Niet stedelijk"]
+
+# (gemeente, last year it delivered Iv3 data) for a selection of herindelingen
+OPGEHEVEN_GEMEENTEN = [
+    ("Schijndel", 2016), ("Littenseradiel", 2017), ("Leeuwarderadeel", 2017), ("Menterwolde", 2017),
+    ("Franekeradeel", 2017), ("Sneek", 2017), ("Haren", 2018), ("Ten Boer", 2018), ("Winsum", 2018),
+    ("Bedum", 2018), ("Grootegast", 2018), ("Aalburg", 2018), ("Nuth", 2018), ("Noordwijkerhout", 2018),
+    ("Appingedam", 2020), ("Delfzijl", 2020), ("Haaren", 2020), ("Heerhugowaard", 2021),
+    ("Langedijk", 2021), ("Boxmeer", 2021), ("Beemster", 2021), ("Weesp", 2021), ("Uden", 2021),
+    ("Brielle", 2022), ("Hellevoetsluis", 2022),
+]
+BLIJVENDE_GEMEENTEN = ["Leeuwarden", "Groningen (gemeente)", "Boxtel", "Tilburg", "Vught", "Oisterwijk", "Amsterdam"]
+
+
+def make_gemeenten(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Gemeenten with classes and a population; includes real herindeling names.
+    """
+    names = BLIJVENDE_GEMEENTEN + [g for g, _ in OPGEHEVEN_GEMEENTEN]
+    names += [f"Gemeente {i:03d}" for i in range(max(0, n - len(names)))]
+    names = names[: max(n, len(BLIJVENDE_GEMEENTEN))]
+
+    inwoners = np.round(rng.lognormal(mean=10.2, sigma=0.9, size=len(names))).astype(int) + 1_000
+    bounds = np.array([b for b, _ in GROOTTEKLASSEN])
+    return pd.DataFrame(
+        {
+            "Gemeenten": names,
+            "Provincie": rng.choice(PROVINCIES, size=len(names)),
+            "Grootteklasse": [GROOTTEKLASSEN[i][1] for i in np.searchsorted(bounds, inwoners, side="right")],
+            "Stedelijkheid": rng.choice(STEDELIJKHEID, size=len(names)),
+            "Inwoners": inwoners,
+        }
+    )
+
+
+def make_iv3(
+    gemeenten: pd.DataFrame,
+    jaar: int,
+    *,
+    taakvelden: list[str],
+    categorieen: list[str],
+    density: float,
+    rng: np.random.Generator,
+) -> pd.DataFrame:
+    """
+    Iv3 records for one year/document: one row per (gemeente, taakveld, categorie) that has a value.
+    """
+    opgeheven = dict(OPGEHEVEN_GEMEENTEN)
+    actief = gemeenten[[opgeheven.get(g, 9999) >= jaar for g in gemeenten["Gemeenten"]]]
+
+    g_idx, t_idx, c_idx = np.meshgrid(
+        np.arange(len(actief)), np.arange(len(taakvelden)), np.arange(len(categorieen)), indexing="ij"
+    )
+    keep = rng.random(g_idx.size) < density
+    g_idx, t_idx, c_idx = g_idx.ravel()[keep], t_idx.ravel()[keep], c_idx.ravel()[keep]
+
+    # Amounts in € 1.000, roughly proportional to population
+    scale = actief["Inwoners"].to_numpy()[g_idx] / 1_000
+    waarde = np.round(rng.gamma(shape=1.5, scale=1.0, size=g_idx.size) * scale, 0)
+    return pd.DataFrame(
+        {
+            "Gemeenten": actief["Gemeenten"].to_numpy()[g_idx],
+            "Jaar": jaar,
+            "TaakveldBalanspost": np.asarray(taakvelden, dtype=object)[t_idx],
+            "Categorie": np.asarray(categorieen, dtype=object)[c_idx],
+            "k_1ePlaatsing_1": np.round(waarde * rng.uniform(0.9, 1.1, size=g_idx.size), 0),
+            "k_2ePlaatsing_2": waarde,
+        }
+    )
+
+
+def generate(
+    out_dir: Path,
+    *,
+    gemeenten: int = 340,
+    taakvelden: int = len(TAAKVELDEN),
+    categorieen: int = len(CATEGORIEEN),
+    years: range = range(2017, 2027),
+    density: float = 0.35,
+    seed: int = 0,
+) -> None:
+    """
+    Write synthetic Iv3 files and classes files to `out_dir`.
+    """
+    rng = np.random.default_rng(seed)
+    tv_list = TAAKVELDEN[:taakvelden] + [f"9.{i} Synthetisch taakveld" for i in range(max(0, taakvelden - len(TAAKVELDEN)))]
+    cat_list = CATEGORIEEN[:categorieen] + [f"L9.{i}" for i in range(max(0, categorieen - len(CATEGORIEEN)))]
+
+    gem = make_gemeenten(gemeenten, rng)
+
+    iv3_dir = out_dir / "iv3data"
+    per_jaar_dir = out_dir / "per_jaar"
+    iv3_dir.mkdir(parents=True, exist_ok=True)
+    per_jaar_dir.mkdir(parents=True, exist_ok=True)
+
+    gem.to_csv(out_dir / "gemeenteklassen.csv", index=False)
+
+    for jaar in years:
+        for doc_code in DOCUMENTS:
+            iv3 = make_iv3(gem, jaar, taakvelden=tv_list, categorieen=cat_list, density=density, rng=rng)
+            iv3.to_csv(iv3_dir / f"{jaar}{doc_code}.csv", index=False)
+
+        klassen = gem.rename(columns={"Grootteklasse": "Gemeentegrootte", "Inwoners": "Inwonertal"})
+        klassen.to_csv(per_jaar_dir / f"{jaar}.csv", sep=";", decimal=",", index=False)
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Generate synthetic Iv3 data for benchmarks.")
+    p.add_argument("--out-dir", type=Path, default=Path("bench_data"))
+    p.add_argument("--gemeenten", type=int, default=340)
+    p.add_argument("--taakvelden", type=int, default=len(TAAKVELDEN))
+    p.add_argument("--categorieen", type=int, default=len(CATEGORIEEN))
+    p.add_argument("--year-start", type=int, default=2017)
+    p.add_argument("--year-end", type=int, default=2026)
+    p.add_argument("--density", type=float, default=0.35, help="Fraction of (gemeente, taakveld, categorie) with a value.")
+    p.add_argument("--seed", type=int, default=0)
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    generate(
+        args.out_dir,
+        gemeenten=args.gemeenten,
+        taakvelden=args.taakvelden,
+        categorieen=args.categorieen,
+        years=range(args.year_start, args.year_end + 1),
+        density=args.density,
+        seed=args.seed,
+    )
+    print(f"Wrote synthetic Iv3 data to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
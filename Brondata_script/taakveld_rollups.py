@@ -0,0 +1,191 @@
+"""
+Hoofdtaakveld and taakveld rollups for the begroting_rekening_per_taakveld dataset.
+
+Page 1 (`pages/1_📊_Gemeenten_per_taakveld_vergelijken.py`) shows per
+gemeente the value of each hoofdtaakveld (a group of taakvelden by prefix,
+HOOFDTAAKVELDEN) and of the taakvelden in a group of SUBTAAKVELDEN.
+`taakveld_rollups` computes these once at build time for every gemeente and
+aggregate, Jaar, Document and Categorie, so the page only slices them:
+
+- Niveau "Hoofdtaakveld": one row per hoofdtaakveld, also when there are
+  no rows for it (then 0). Taakveld and Hoofdtaakveld hold its name.
+- Niveau "Taakveld": one row per taakveld with rows. Hoofdtaakveld holds
+  the SUBTAAKVELDEN group it is in (None if none).
+- Totaal: the sum of Waarde (€ 1.000), negated for Saldo, which is
+  defined as netto lasten (lasten - baten).
+- Per inwoner: Totaal in € per inwoner of the first row, rounded to
+  whole euros; 0 without inwoners.
+
+The page computes the same values from the taakveld rows when there are no
+rollups, with the same functions (`cell_waarden`), so both give the same
+numbers. Used by the builder and by queries/taakvelden.py, so it only
+depends on numpy and pandas.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+KEYS = ["Gemeenten", "Jaar", "Document", "Categorie"]
+HOOFDTAAKVELD = "Hoofdtaakveld"  # Niveau of the hoofdtaakveld rows
+TAAKVELD = "Taakveld"  # Niveau of the taakveld rows
+EURO_TO_THOUSAND_FACTOR = 1000  # Convert from €1000 to € per inhabitant
+
+HOOFDTAAKVELDEN = {
+    "Gemeentefonds": ("0.7"),
+    "Eigen inkomsten": ("0.3", "0.5", "0.6", "0.8", "0.9"),
+    "Bestuur" : ("0.1 ", "0.2", "0.4"),
+    "Veiligheid": ("1"),
+    "Verkeer en vervoer": ("2"),
+    "Economie": ("3"),
+    "Onderwijs": ("4"),
+    "Sport, cultuur": ("5"),
+    "Sociaal domein": ("6"),
+    "Volksgezondheid": ("7"),
+    "Wonen en bouwen": ("8"),
+}
+
+SUBTAAKVELDEN = {
+    "Gemeentefonds": ("0.7"),
+    "Eigen inkomsten": ("0.3", "0.5", "0.6", "0.8", "0.9"),
+    "Bestuur" : ("0.1 ", "0.2", "0.4"),
+    "Veiligheid": ("1"),
+    "Verkeer en vervoer": ("2"),
+    "Economie": ("3"),
+    "Onderwijs": ("4"),
+    "Sport, cultuur en recreatie (SCR)": ("5"),
+    "Sociaal domein - Algemene voorzieningen": ("6.1", "6.2"),
+    "Sociaal domein - Inkomen en participatie": ("6.3", "6.4", "6.5"),
+    "Sociaal domein - Wmo": ("6.6", "6.71", "6.791", "6.81", "6.91"),
+    "Sociaal domein - Jeugd": ("6.72", "6.73", "6.74", "6.75", "6.76", "6.792", "6.82", "6.92"),
+    "Volksgezondheid": ("7"),
+    "Wonen en bouwen": ("8"),
+}
+
+
+def prefix_matches(taakvelden, prefixes) -> np.ndarray:
+    """Which of `taakvelden` start with `prefixes` (str or tuple of str), as str.startswith."""
+    return np.array([str(tv).startswith(prefixes) for tv in taakvelden], dtype=bool)
+
+
+@lru_cache(maxsize=64)
+def group_matrix(taakvelden: tuple, groups: tuple) -> np.ndarray:
+    """Boolean (taakveld x group) matrix: taakveld i belongs to group j, by prefix (see HOOFDTAAKVELDEN)."""
+    matrix = np.zeros((len(taakvelden), len(groups)), dtype=bool)
+    for j, prefixes in enumerate(groups):
+        matrix[:, j] = prefix_matches(taakvelden, prefixes)
+    return matrix
+
+
+def cell_waarden(data, rows, cells, n_cells, per_inwoner=False):
+    """The value of the rows of every cell, for all cells at once.
+
+    A cell's value is the sum of its Waarde, negated for Saldo, and divided
+    by the Inwonertal of its first row if per_inwoner (tests/test_taakvelden.py
+    checks this against a computation per cell). The rows of a cell are
+    summed one by one, so for fractional Waarde the last bits can differ
+    from Series.sum, which sums pairwise.
+
+    Args:
+        data: DataFrame with gemeente data
+        rows: Positions in data of the rows in the cells, ascending within each cell
+        cells: Cell of each of these rows (0 to n_cells - 1)
+        n_cells: Number of cells; cells without rows get 0
+        per_inwoner: If True, calculate values per inhabitant, else use totals
+
+    Returns:
+        Array of values; int64 if all are an int 0 (empty cells, no inwoners), else float64
+    """
+    order = np.argsort(cells, kind='stable')
+    rows, cells = rows[order], cells[order]
+    present, starts = np.unique(cells, return_index=True)
+
+    values = data['Waarde'].to_numpy()[rows]
+    if values.dtype.kind == 'f':
+        values = np.where(np.isnan(values), 0.0, values)  # Series.sum skips NaN
+    sums = np.add.reduceat(values, starts)
+
+    # Categorie and Inwonertal of the first row of each cell
+    first = rows[starts]
+
+    # Saldo is defined as netto lasten (lasten - baten), so negate
+    saldo = data['Categorie'].to_numpy()[first] == "Saldo"
+    sums = np.where(saldo, -1 * sums, sums)
+
+    # Cells with an int 0: empty, or no inwoners
+    int_zero = np.ones(n_cells, dtype=bool)
+    if per_inwoner:
+        inwonertal = data['Inwonertal'].to_numpy()[first]
+        positive = inwonertal > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sums = np.where(positive, np.round(EURO_TO_THOUSAND_FACTOR * sums / inwonertal, 0), 0)
+        int_zero[present] = ~positive
+    else:
+        int_zero[present] = False
+
+    if int_zero.all():
+        return np.zeros(n_cells, dtype=np.int64)
+    waarden = np.zeros(n_cells, dtype=sums.dtype)
+    waarden[present] = sums
+    return waarden
+
+
+def taakveld_rollups(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Hoofdtaakveld and taakveld values per Gemeenten, Jaar, Document and Categorie.
+
+    `df` is the long begroting_rekening_per_taakveld frame (KEYS, Taakveld,
+    Waarde, Inwonertal); rows of a key are summed in their order in `df`,
+    which the written dataset keeps. Returns KEYS, Niveau, Taakveld,
+    Hoofdtaakveld, Totaal and Per inwoner, grouped by key in order of first
+    appearance; within a key the hoofdtaakvelden come first, in
+    HOOFDTAAKVELDEN order, then the taakvelden in order of appearance.
+
+    Raises:
+        ValueError: If a taakveld is in more than one SUBTAAKVELDEN group
+    """
+    df = df.reset_index(drop=True)
+    key_codes = df.groupby(KEYS, sort=False, observed=True, dropna=False).ngroup().to_numpy()
+    keys = df[KEYS].iloc[np.unique(key_codes, return_index=True)[1]].reset_index(drop=True)
+    taakveld_codes, taakvelden = pd.factorize(df['Taakveld'])
+    taakvelden = np.asarray(taakvelden, dtype=object)
+    valid = taakveld_codes >= 0
+
+    # Hoofdtaakvelden: every group for every key
+    groups = np.array(list(HOOFDTAAKVELDEN), dtype=object)
+    matrix = group_matrix(tuple(taakvelden), tuple(HOOFDTAAKVELDEN.values()))
+    rows, group = np.nonzero(matrix[taakveld_codes] & valid[:, None])
+    cells = key_codes[rows] * len(groups) + group
+    n_cells = len(keys) * len(groups)
+    hoofd = keys.iloc[np.repeat(np.arange(len(keys)), len(groups))].reset_index(drop=True)
+    hoofd['Niveau'] = HOOFDTAAKVELD
+    hoofd['Taakveld'] = np.tile(groups, len(keys))
+    hoofd['Hoofdtaakveld'] = hoofd['Taakveld']
+    hoofd['Totaal'] = cell_waarden(df, rows, cells, n_cells).astype(float)
+    hoofd['Per inwoner'] = cell_waarden(df, rows, cells, n_cells, per_inwoner=True).astype(float)
+    hoofd['key'] = np.repeat(np.arange(len(keys)), len(groups))
+
+    # Taakvelden: each (key, taakveld) with rows, in order of appearance within the key
+    sub_matrix = group_matrix(tuple(taakvelden), tuple(SUBTAAKVELDEN.values()))
+    overlapping = taakvelden[sub_matrix.sum(axis=1) > 1]
+    if len(overlapping):
+        raise ValueError(f"Taakvelden in more than one SUBTAAKVELDEN group: {list(overlapping)}")
+    rows = np.flatnonzero(valid)
+    cells, pairs = pd.factorize(key_codes[rows] * len(taakvelden) + taakveld_codes[rows])
+    pair_keys, pair_taakvelden = np.divmod(pairs, len(taakvelden))
+    sub = keys.iloc[pair_keys].reset_index(drop=True)
+    sub['Niveau'] = TAAKVELD
+    sub['Taakveld'] = taakvelden[pair_taakvelden]
+    subgroups = np.array(list(SUBTAAKVELDEN) + [None], dtype=object)
+    in_group = sub_matrix.any(axis=1)
+    sub['Hoofdtaakveld'] = subgroups[np.where(in_group, sub_matrix.argmax(axis=1), len(SUBTAAKVELDEN))][pair_taakvelden]
+    sub['Totaal'] = cell_waarden(df, rows, cells, len(pairs)).astype(float)
+    sub['Per inwoner'] = cell_waarden(df, rows, cells, len(pairs), per_inwoner=True).astype(float)
+    sub['key'] = pair_keys
+
+    out = pd.concat([hoofd, sub], ignore_index=True)
+    out = out.iloc[np.argsort(out['key'].to_numpy(), kind='stable')].drop(columns='key')
+    return out.reset_index(drop=True)
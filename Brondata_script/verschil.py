@@ -0,0 +1,64 @@
+"""
+Jaarrekening-minus-Begroting ("Verschil") cube for the begroting_rekening dataset.
+
+The table view of `📈_Begroting_en_jaarrekening_vergelijken.py` shows, per
+taakveld and jaar, Jaarrekening minus Begroting for a gemeente (and
+optionally a comparison). `verschil_cube` computes this once at build time
+for every gemeente and aggregate, Stand and Categorie, so the page only
+slices it:
+
+- Jaarrekening and Begroting are outer-joined per (Gemeenten, Stand,
+  Categorie, Jaar, Taakveld); a missing side counts as 0.
+- `Verschil` is the difference, truncated to int.
+- `Rekening` / `Begroting` tell whether that side was present, so a reader
+  can tell when a selection has no Jaarrekening or no Begroting at all
+  (the page then shows no table).
+- `Tonen` applies the rule that drops "empty" (jaar, taakveld) cells.
+
+All joined rows are kept (also those with `Tonen` False): the jaren of a
+selection and its document check depend on them.
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+
+KEYS = ["Gemeenten", "Stand", "Categorie", "Jaar", "Taakveld"]
+JAARREKENING = "Jaarrekening"
+BEGROTING = "Begroting"
+
+
+def verschil_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Verschil (Jaarrekening - Begroting) per Gemeenten, Stand, Categorie, Jaar and Taakveld.
+
+    `df` is the long begroting_rekening frame (Gemeenten, Jaar, Stand,
+    Taakveld, Document, Categorie, Waarde). Returns KEYS plus Verschil,
+    Rekening, Begroting and Tonen, sorted on KEYS.
+    """
+    keyed = df[KEYS + ["Document", "Waarde"]].astype({key: str for key in KEYS})
+    document = keyed.pop("Document").astype(str)
+
+    jr = keyed[document == JAARREKENING].assign(Rekening=True)
+    bg = keyed[document == BEGROTING].assign(Begroting=True)
+    merged = jr.merge(bg, on=KEYS, how="outer", suffixes=("_jr", "_bg"), sort=True)
+
+    rekening = merged["Rekening"].notna().to_numpy()
+    begroting = merged["Begroting"].notna().to_numpy()
+    waarde_jr = merged["Waarde_jr"].fillna(0)
+    waarde_bg = merged["Waarde_bg"].fillna(0)
+    verschil = (waarde_jr - waarde_bg).astype(int)
+
+    # Leave out jaren with empty values
+    tonen = (
+        ((verschil != waarde_bg) & (waarde_bg != 0))
+        | ((verschil != -waarde_jr) & (waarde_jr != 0))
+        | ((waarde_jr == 0) & (waarde_bg == 0))
+    )
+
+    out = merged[KEYS].copy()
+    out["Verschil"] = verschil.to_numpy()
+    out["Rekening"] = rekening
+    out["Begroting"] = begroting
+    out["Tonen"] = tonen.to_numpy()
+    return out
@@ -0,0 +1,235 @@
+"""
+Batch reports: what the main page shows, for every gemeente, as files.
+
+For each gemeente in gemeenteklassen.csv this writes a directory with
+
+- saldo.csv, saldo_<stand>.png: the saldo series per stand;
+- taakvelden.csv: Baten and Lasten per taakveld, all years;
+  taakvelden_<categorie>_<jaar>.png: the bars for the last year;
+- verschil.xlsx: the Verschil tables (one sheet per categorie and
+  comparison) against the gemeente's Provincie, Grootteklasse and
+  Nederland, per inwoner, for the last three years as the page defaults to.
+
+It uses the page's queries (see queries/), on a process pool that loads the
+datasets once per worker. A gemeente's files are written to
+`<name>.tmp/` and renamed to `<name>/` when complete, so an interrupted run
+continues where it stopped when started again; `--force` redoes all.
+
+Run from the repository root:
+
+  python batch_reports.py --out rapporten --jobs 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+import vl_convert as vlc
+
+import queries
+from excel_export import export_tables
+from queries.begroting_rekening import DATA_FILE, VERSCHIL_FILE
+
+CLASSES_FILE = "gemeenteklassen.csv"
+CATEGORIEEN = ["Saldo", "Baten", "Lasten"]
+VERGELIJKINGEN = ["Provincie", "Grootteklasse", "Nederland"]
+VERGELIJKING_STAND = "Per inwoner"  # Comparisons are per inwoner only, as on the page
+VERGELIJKING_JAREN = 3  # Default jaarbereik of the page when comparing
+PNG_SCALE = 2
+
+# Datasets of a worker process, loaded once by _init_worker
+_dataset: queries.BegrotingRekening | None = None
+_verschil: queries.VerschilCube | None = None
+
+
+def _init_worker(data_path: str, verschil_path: str) -> None:
+    global _dataset, _verschil
+    # Altair warns about its own narwhals wrapper on every chart converted to JSON
+    warnings.filterwarnings("ignore", message="You passed a `narwhals", category=UserWarning)
+    _dataset = queries.BegrotingRekening.open(data_path)
+    _verschil = queries.VerschilCube.open(verschil_path)
+
+
+def report_dir_name(gemeente: str) -> str:
+    """File-system safe directory name for a gemeente."""
+    return re.sub(r"[^\w.() -]", "_", gemeente).strip() or "_"
+
+
+def read_classes(path: Path | str = CLASSES_FILE) -> pd.DataFrame:
+    """Gemeenten with their Provincie and Grootteklasse."""
+    return pd.read_csv(path, usecols=["Gemeenten", "Provincie", "Grootteklasse"]).dropna(subset=["Gemeenten"])
+
+
+def _save_png(chart, path: Path) -> None:
+    path.write_bytes(vlc.vegalite_to_png(chart.to_json(), scale=PNG_SCALE))
+
+
+def _try(query, *args, **kwargs):
+    """Result of a query, or None for a selection the data does not cover."""
+    try:
+        return query(*args, **kwargs)
+    except queries.SelectionError:
+        return None
+
+
+def write_report(gemeente: str, provincie: str | None, grootteklasse: str | None, out: Path) -> list[str] | None:
+    """
+    Write the report files of one gemeente to `out` (an existing directory).
+
+    Runs in a worker process (see _init_worker).
+
+    Returns:
+        list: Notes on parts left out (no data, incomplete tables), or
+        None if the gemeente is not in the data (e.g. merged since)
+    """
+    dataset, verschil = _dataset, _verschil
+    notes: list[str] = []
+    stands = dataset.index.values('Stand', Gemeenten=gemeente)
+    if not stands:
+        return None
+
+    # Saldo per jaar
+    saldo_parts = []
+    for stand in stands:
+        saldo = queries.calculate_saldo(dataset, gemeente, stand)
+        if saldo.empty:
+            continue
+        saldo_parts.append(saldo.assign(Stand=stand))
+        _save_png(queries.show_saldo(saldo, stand), out / f"saldo_{stand}.png")
+    if saldo_parts:
+        pd.concat(saldo_parts).to_csv(out / "saldo.csv", index=False)
+    else:
+        notes.append("no saldo")
+
+    # Begroting en jaarrekening per taakveld
+    taakvelden = []
+    for stand in stands:
+        data = queries.filter_data(dataset, gemeente, stand)
+        data = data.loc[data['Categorie'].isin(["Baten", "Lasten"])]
+        if data.empty:
+            continue
+        taakvelden.append(data)
+        jaar = sorted(data['Jaar'].unique())[-1]
+        for baten_lasten in ["Baten", "Lasten"]:
+            br_data = queries.calculate_begroting_rekening(dataset, gemeente, stand, baten_lasten, jaar)
+            if not br_data.empty:
+                _save_png(queries.show_begroting_rekening(br_data, stand),
+                          out / f"taakvelden_{stand}_{baten_lasten}_{jaar}.png")
+    if taakvelden:
+        pd.concat(taakvelden).to_csv(out / "taakvelden.csv", index=False)
+    else:
+        notes.append("no taakvelden")
+
+    # Verschil tables, own and against each comparison
+    jaar_min, jaar_max = dataset.year_range
+    jaar_min = max(jaar_min, jaar_max - VERGELIJKING_JAREN + 1)
+    entiteiten = {"Provincie": provincie, "Grootteklasse": grootteklasse, "Nederland": "Nederland"}
+    sheets = {}
+    for categorie in CATEGORIEEN:
+        for naam in [None] + VERGELIJKINGEN:
+            vergelijking = entiteiten[naam] if naam else None
+            if naam and not isinstance(vergelijking, str):
+                notes.append(f"no {naam.lower()}")
+                continue
+            result = _try(queries.create_tables, dataset, verschil, categorie, gemeente,
+                          VERGELIJKING_STAND, jaar_min, jaar_max, vergelijking,
+                          warn=lambda message: notes.append(message))
+            if result and result[0]:
+                sheets[f"{categorie} {naam or gemeente}"] = result[0]
+            else:
+                notes.append(f"no tables {categorie} {vergelijking or gemeente}")
+    if sheets:
+        export_tables(sheets, out / "verschil.xlsx")
+
+    return sorted(set(notes))
+
+
+def _run(gemeente: str, provincie, grootteklasse, out_dir: str) -> tuple[str, float, list[str] | None]:
+    start = time.perf_counter()
+    final = Path(out_dir) / report_dir_name(gemeente)
+    tmp = final.with_name(final.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    notes = write_report(gemeente, provincie, grootteklasse, tmp)
+    if notes is None:
+        tmp.rmdir()
+    else:
+        shutil.rmtree(final, ignore_errors=True)
+        tmp.rename(final)
+    return gemeente, time.perf_counter() - start, notes
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", type=Path, required=True, help="Output directory")
+    ap.add_argument("--data-dir", type=Path, default=Path("."),
+                    help="Directory with the datasets and gemeenteklassen.csv (default: current directory)")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    ap.add_argument("--gemeente", action="append", help="Only this gemeente (repeatable)")
+    ap.add_argument("--force", action="store_true", help="Redo gemeenten that already have a report")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    classes = read_classes(args.data_dir / CLASSES_FILE)
+    if args.gemeente:
+        classes = classes.loc[classes['Gemeenten'].isin(args.gemeente)]
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    todo = [row for row in classes.itertuples(index=False)
+            if args.force or not (args.out / report_dir_name(row.Gemeenten)).is_dir()]
+    done = len(classes) - len(todo)
+    if done:
+        print(f"{done} of {len(classes)} gemeenten already done, skipped")
+    if not todo:
+        return 0
+
+    failed, missing = [], []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=args.jobs,
+        initializer=_init_worker,
+        initargs=(str(args.data_dir / DATA_FILE), str(args.data_dir / VERSCHIL_FILE)),
+    ) as pool:
+        futures = {
+            pool.submit(_run, row.Gemeenten,
+                        row.Provincie if isinstance(row.Provincie, str) else None,
+                        row.Grootteklasse if isinstance(row.Grootteklasse, str) else None,
+                        str(args.out)): row.Gemeenten
+            for row in todo
+        }
+        for n, future in enumerate(as_completed(futures), 1):
+            gemeente = futures[future]
+            try:
+                _, seconds, notes = future.result()
+            except Exception as e:
+                failed.append(gemeente)
+                print(f"[{n}/{len(todo)}] {gemeente}: FAILED {type(e).__name__}: {e}", flush=True)
+                continue
+            if notes is None:
+                missing.append(gemeente)
+                print(f"[{n}/{len(todo)}] {gemeente}: not in the data, skipped", flush=True)
+                continue
+            extra = f" ({'; '.join(notes)})" if notes else ""
+            print(f"[{n}/{len(todo)}] {gemeente} ({seconds:.1f}s){extra}", flush=True)
+
+    written = len(todo) - len(failed) - len(missing)
+    print(f"{written} reports written in {time.perf_counter() - start:.0f}s, "
+          f"{len(missing)} not in the data, {len(failed)} failed")
+    if failed:
+        print("Failed: " + ", ".join(failed))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
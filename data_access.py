@@ -0,0 +1,304 @@
+"""
+Indexed, exact-match access to the dashboard datasets.
+
+Both Streamlit pages select rows by gemeente, stand/document and jaar.
+Building boolean masks over the whole dataset for every selection costs
+O(rows) per rerun and grows with every year added; page 1 also matched
+gemeenten by prefix, so "Groningen" pulled in "Groningen (gemeente)".
+
+`DatasetIndex` groups the rows once on a fixed sequence of key columns and
+keeps, per key combination, the positions of its rows in a nested dict
+(key1 -> key2 -> ... -> positions). A lookup is one dict access per key, so
+its cost depends only on the size of the result, not of the dataset.
+Results are taken from the original frame in the original row order, so a
+lookup returns exactly what the equivalent exact-match mask would.
+
+`DatasetHandle` identifies a dataset by path and version (a hash of its
+manifest). Cached page functions take a handle plus scalar selection
+arguments instead of DataFrames, so Streamlit hashes two short strings per
+call instead of a whole frame, and a rebuilt dataset gets new cache keys.
+
+`DatasetHandle.load_mapped` keeps a page's working layout of a dataset in a
+memory-mapped Arrow file next to it, shared by all server processes on the
+host. `MappedIndex` is the DatasetIndex of such a file: sorted on its keys,
+the rows of a key combination are one range, and only the selected rows
+are converted to pandas.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from Brondata_script.dataset_store import MAPPED_SUFFIX, dataset_version, load_dataset, read_mapped, write_mapped
+
+MAPPED_LAYOUT_VERSION = 1  # Raise when a layout changes, so existing mapped files are rebuilt
+
+
+@dataclass(frozen=True)
+class DatasetHandle:
+    """
+    A dataset as a cache key: its path and version. Empty version = no dataset at `path`.
+    """
+
+    path: str
+    version: str
+
+    @classmethod
+    def open(cls, path: Path | str) -> "DatasetHandle":
+        """
+        Handle for the dataset currently at `path` (reads only its manifest).
+        """
+        try:
+            version = dataset_version(path)
+        except FileNotFoundError:
+            version = ""
+        return cls(str(path), version)
+
+    def load(self, **kwargs: Any) -> pd.DataFrame:
+        """
+        Load the dataset (see dataset_store.load_dataset).
+        """
+        return load_dataset(self.path, **kwargs)
+
+    def load_mapped(self, name: str,
+                    build: Callable[[pd.DataFrame], tuple[pa.Table, dict]]) -> tuple[pa.Table, dict]:
+        """
+        The dataset in the layout `build` makes of it, memory-mapped, with its metadata.
+
+        The layout is kept at `<path>.<name>.arrow` (see dataset_store.write_mapped)
+        and made from the loaded dataset by the first process that opens
+        this version of it; other processes map the same file, so they share
+        its pages instead of each holding a copy. If the file cannot be
+        written, the layout is returned as built, in memory.
+        """
+        path = Path(f"{self.path}.{name}{MAPPED_SUFFIX}")
+        try:
+            table, metadata = read_mapped(path)
+            if (metadata.get("source_version"), metadata.get("layout_version")) == (self.version, MAPPED_LAYOUT_VERSION):
+                return table, metadata
+        except (OSError, ValueError, KeyError):
+            pass  # Not built yet, or not readable: build it below
+
+        table, metadata = build(self.load())
+        metadata = {**metadata, "source_version": self.version, "layout_version": MAPPED_LAYOUT_VERSION}
+        try:
+            write_mapped(table, path, metadata)
+        except OSError:
+            return table, metadata
+        return read_mapped(path)
+
+    def load_index(self, name: str, keys: Sequence[str],
+                   prepare: Callable[[pd.DataFrame], pd.DataFrame] | None = None,
+                   describe: Callable[[pd.DataFrame], dict] | None = None) -> "MappedIndex":
+        """
+        MappedIndex on `keys` of the dataset, memory-mapped as `name` (see `load_mapped`).
+
+        `prepare` changes the loaded dataset before it is sorted and stored
+        (e.g. checks or renames columns); `describe` returns metadata about
+        the prepared dataset, kept with the file as the index's `metadata`.
+        """
+        def build(data):
+            if prepare is not None:
+                data = prepare(data)
+            metadata = describe(data) if describe is not None else {}
+            return MappedIndex.layout(data, keys), metadata
+
+        table, metadata = self.load_mapped(name, build)
+        return MappedIndex(table, keys, metadata)
+
+
+def _as_values(value: Any) -> list:
+    """Selection value(s) as a list: a list/tuple/set/range selects several values, anything else one."""
+    if isinstance(value, (list, tuple, set, range, np.ndarray, pd.Index)):
+        return list(dict.fromkeys(value))
+    return [value]
+
+
+class DatasetIndex:
+    """
+    Row positions of `data` per combination of `keys`, for exact-match selections.
+    """
+
+    def __init__(self, data: pd.DataFrame, keys: Sequence[str]):
+        self.data = data
+        self.keys = tuple(keys)
+        self._tree: dict = {}
+
+        groups = data.groupby(list(self.keys), observed=True, sort=True).indices
+        for combo, positions in groups.items():
+            combo = combo if isinstance(combo, tuple) else (combo,)
+            node = self._tree
+            for value in combo[:-1]:
+                node = node.setdefault(value, {})
+            node[combo[-1]] = positions
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def _walk(self, selection: dict[str, Any], depth: int) -> Iterable[Any]:
+        """
+        Yield the nodes at `depth` (0 = root) that match `selection` on the first `depth` keys.
+        """
+        unknown = set(selection) - set(self.keys)
+        if unknown:
+            raise KeyError(f"Not an index key: {', '.join(sorted(unknown))} (keys: {', '.join(self.keys)})")
+
+        nodes = [self._tree]
+        for key in self.keys[:depth]:
+            if key in selection:
+                wanted = _as_values(selection[key])
+                nodes = [node[v] for node in nodes for v in wanted if v in node]
+            else:
+                nodes = [child for node in nodes for child in node.values()]
+        return nodes
+
+    def positions(self, **selection: Any) -> np.ndarray:
+        """
+        Positions (in `data`) of the rows matching `selection`, in ascending order.
+
+        Each keyword is a key column; its value is one value or a list/tuple of
+        values. Keys that are not given match everything.
+        """
+        found = self._walk(selection, len(self.keys))
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        if len(found) == 1:
+            return found[0]
+        return np.sort(np.concatenate(found))
+
+    def rows(self, **selection: Any) -> pd.DataFrame:
+        """
+        The rows of `data` matching `selection` (see `positions`), in their original order.
+        """
+        return self.data.iloc[self.positions(**selection)]
+
+    def values(self, key: str, **selection: Any) -> list:
+        """
+        Distinct values of `key` (sorted) among the rows matching `selection`.
+
+        `selection` may only use keys that come before `key` in `keys`.
+        """
+        depth = self.keys.index(key)
+        later = set(selection) & set(self.keys[depth:])
+        if later:
+            raise ValueError(f"Cannot select on {', '.join(sorted(later))} when listing {key!r}")
+        found = {value for node in self._walk(selection, depth) for value in node}
+        return sorted(found)
+
+    def __contains__(self, value: Any) -> bool:
+        """
+        Whether `value` occurs in the first key column.
+        """
+        return value in self._tree
+
+
+def _column_view(column: pa.ChunkedArray) -> tuple[np.ndarray | pa.Array, pd.CategoricalDtype | None] | None:
+    """
+    A column of one chunk as a view: its values as a NumPy array, or for a
+    dictionary column its codes plus the categorical dtype of its
+    dictionary (the codes as an Arrow array if they have nulls). None for
+    other columns (e.g. strings, or values with nulls).
+    """
+    if column.num_chunks != 1:
+        return None
+    array = column.chunk(0)
+    try:
+        if pa.types.is_dictionary(array.type):
+            dtype = pd.CategoricalDtype(array.dictionary.to_pandas(), ordered=array.type.ordered)
+            if array.null_count:
+                return array.indices, dtype
+            return array.indices.to_numpy(zero_copy_only=True), dtype
+        return array.to_numpy(zero_copy_only=True), None
+    except pa.ArrowInvalid:
+        return None
+
+
+class MappedIndex(DatasetIndex):
+    """
+    Row ranges of an Arrow table sorted on `keys` (see `layout`), for exact-match selections.
+
+    Answers the same lookups as DatasetIndex. As the rows of a key
+    combination are contiguous, the index keeps one (start, stop) range per
+    combination instead of the positions of its rows, and `rows` converts
+    only the selected rows of the (memory-mapped) table to pandas.
+    `metadata` is what was stored with the table (see DatasetHandle.load_index).
+    """
+
+    def __init__(self, table: pa.Table, keys: Sequence[str], metadata: dict | None = None):
+        self.table = table
+        self.keys = tuple(keys)
+        self.metadata = metadata or {}
+        self._tree = {}
+        # Per column: a NumPy view of its values, or of its codes plus their
+        # categorical dtype; None for a column that cannot be viewed (e.g. with nulls)
+        self._columns = {name: _column_view(table.column(name)) for name in table.column_names}
+        if not len(table):
+            return
+
+        labels, codes = [], []
+        for key in self.keys:
+            view = self._columns[key]
+            if view is not None and view[1] is not None and isinstance(view[0], np.ndarray):
+                labels.append(view[1].categories.tolist())
+                codes.append(view[0])
+            else:
+                codes_, uniques = pd.factorize(table.column(key).to_numpy())
+                labels.append(uniques.tolist())
+                codes.append(codes_)
+
+        changes = np.zeros(len(table) - 1, dtype=bool)
+        for c in codes:
+            changes |= c[1:] != c[:-1]
+        starts = np.concatenate([[0], np.flatnonzero(changes) + 1])
+        stops = np.append(starts[1:], len(table))
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            combo = [labels[i][c[start]] for i, c in enumerate(codes)]
+            node = self._tree
+            for value in combo[:-1]:
+                node = node.setdefault(value, {})
+            if combo[-1] in node:
+                raise ValueError(f"Table is not sorted on {', '.join(self.keys)}")
+            node[combo[-1]] = (start, stop)
+
+    @staticmethod
+    def layout(data: pd.DataFrame, keys: Sequence[str]) -> pa.Table:
+        """`data` as an Arrow table sorted on `keys` (rows of a combination in their original order)."""
+        data = data.sort_values(list(keys), kind="stable")
+        return pa.Table.from_pandas(data, preserve_index=False)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def positions(self, **selection: Any) -> np.ndarray:
+        """
+        Positions (in `table`) of the rows matching `selection`, in ascending order.
+        """
+        ranges = sorted(self._walk(selection, len(self.keys)))
+        if not ranges:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate([np.arange(start, stop) for start, stop in ranges])
+
+    def rows(self, **selection: Any) -> pd.DataFrame:
+        """
+        The rows of `table` matching `selection` (see `positions`) as a DataFrame, in table order.
+        """
+        positions = self.positions(**selection)
+        columns = {}
+        for name, view in self._columns.items():
+            if view is None:
+                columns[name] = self.table.column(name).take(positions).to_pandas()
+            elif view[1] is None:
+                columns[name] = view[0][positions]
+            elif isinstance(view[0], pa.Array):
+                # Codes with nulls: null is code -1 in pandas
+                codes = view[0].take(positions).fill_null(-1).to_numpy()
+                columns[name] = pd.Categorical.from_codes(codes, dtype=view[1])
+            else:
+                columns[name] = pd.Categorical.from_codes(view[0][positions], dtype=view[1])
+        return pd.DataFrame(columns, copy=False)
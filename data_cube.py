@@ -0,0 +1,220 @@
+"""
+Dense array ("cube") form of a long dataset.
+
+The begroting_rekening dataset is a long frame with one value per
+combination of a few key columns (Gemeenten, Stand, Jaar, Document,
+Categorie, Taakveld), and almost every combination occurs. `DataCube`
+keeps the values in one NumPy array (`array`) with an axis per key
+column, plus the labels along each axis (`coords`):
+
+- a selection is array indexing (`take`), so its cost depends only on the
+  size of the result, and a gemeente/stand slice is a contiguous block;
+- reductions are array sums over axes (`sum`);
+- a combination without a row is NaN, so "no row" and 0 stay apart;
+- `to_frame` turns (a selection of) the cube back into the long frame.
+
+It also answers the lookups of `DatasetIndex` (`len`, `in`, `values`), so
+it can take the place of the index of the long frame.
+
+`to_arrow` / `from_arrow` store the cube as a one-column Arrow table plus
+metadata, e.g. in a memory-mapped file (see DatasetHandle.load_mapped);
+the cube read from it is a view on the file, not a copy.
+"""
+
+from __future__ import annotations
+
+from functools import cached_property
+from typing import Any, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from data_access import _as_values
+
+
+class DataCube:
+    """
+    Values of a long dataset in an array with one axis per key column; NaN = no row.
+    """
+
+    def __init__(self, array: np.ndarray, coords: Mapping[str, Sequence[Any]], value: str = "Waarde"):
+        self.array = array
+        self.axes = tuple(coords)
+        self.value = value
+        # Labels of an axis as a categorical dtype plus their codes in it; a
+        # sub-cube shares the dtypes of the cube it was taken from
+        self._dtypes = {axis: pd.CategoricalDtype(list(labels)) for axis, labels in coords.items()}
+        self._codes = {axis: np.arange(len(labels)) for axis, labels in coords.items()}
+        if self.array.shape != tuple(len(codes) for codes in self._codes.values()):
+            raise ValueError(f"Shape {self.array.shape} does not match the coordinates of {', '.join(self.axes)}")
+
+    def _sub(self, array: np.ndarray, codes: dict[str, np.ndarray]) -> "DataCube":
+        """A cube of `array` with, per axis, the labels at `codes` in this cube's dtypes."""
+        cube = object.__new__(DataCube)
+        cube.array = array
+        cube.axes = tuple(codes)
+        cube.value = self.value
+        cube._dtypes = {axis: self._dtypes[axis] for axis in cube.axes}
+        cube._codes = codes
+        return cube
+
+    @property
+    def coords(self) -> dict[str, list]:
+        """The labels along each axis."""
+        return {axis: self._dtypes[axis].categories[codes].tolist() for axis, codes in self._codes.items()}
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, axes: Sequence[str], value: str = "Waarde",
+                   dtype: Any = np.float64) -> "DataCube":
+        """
+        Cube of `data[value]` on the key columns `axes`.
+
+        The labels of a categorical column are its categories, in their order;
+        those of another column its sorted distinct values.
+
+        Raises:
+            ValueError: If `data` has more than one row for a combination of `axes`
+        """
+        coords = {}
+        codes = []
+        for axis in axes:
+            column = data[axis]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                labels = column.cat.categories
+                codes.append(column.cat.codes.to_numpy())
+            else:
+                codes_, labels = pd.factorize(column, sort=True)
+                codes.append(codes_)
+            coords[axis] = labels.tolist()
+
+        shape = tuple(len(labels) for labels in coords.values())
+        values = np.full(shape, np.nan, dtype=dtype)
+        if len(data):
+            if any((c < 0).any() for c in codes):
+                raise ValueError(f"Missing values in the key columns {', '.join(axes)}")
+            flat = np.ravel_multi_index(codes, shape)
+            if len(np.unique(flat)) < len(flat):
+                raise ValueError(f"More than one row per combination of {', '.join(axes)}")
+            values.reshape(-1)[flat] = data[value].to_numpy(dtype=dtype)
+        return cls(values, coords, value)
+
+    def to_arrow(self) -> tuple[pa.Table, dict]:
+        """The values as a one-column Arrow table (flattened, last axis fastest) plus the metadata of the cube."""
+        table = pa.table({self.value: np.ascontiguousarray(self.array).reshape(-1)})
+        return table, {"axes": list(self.axes), "coords": self.coords, "value": self.value}
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table, metadata: Mapping[str, Any]) -> "DataCube":
+        """
+        The cube stored by `to_arrow`. Its values are not copied if the
+        column is one chunk (read-only then).
+        """
+        coords = {axis: metadata["coords"][axis] for axis in metadata["axes"]}
+        column = table.column(metadata["value"])
+        if column.num_chunks == 1:
+            values = column.chunk(0).to_numpy(zero_copy_only=True)
+        else:
+            values = column.to_numpy()
+        shape = tuple(len(labels) for labels in coords.values())
+        return cls(values.reshape(shape), coords, metadata["value"])
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the values array in bytes."""
+        return self.array.nbytes
+
+    def __len__(self) -> int:
+        """Number of cells with a value (rows of the long frame)."""
+        return int(np.count_nonzero(~np.isnan(self.array)))
+
+    def __contains__(self, label: Any) -> bool:
+        """Whether `label` has values along the first axis."""
+        position = self._positions[self.axes[0]].get(label)
+        return position is not None and not np.isnan(self.array[position]).all()
+
+    @cached_property
+    def _positions(self) -> dict[str, dict[Any, int]]:
+        """Position of each label along each axis."""
+        return {axis: {label: i for i, label in enumerate(labels)} for axis, labels in self.coords.items()}
+
+    def _indexer(self, axis: str, selection: Any) -> np.ndarray:
+        positions = self._positions[axis]
+        return np.array([positions[label] for label in _as_values(selection) if label in positions],
+                        dtype=np.intp)
+
+    def take(self, **selection: Any) -> "DataCube":
+        """
+        The sub-cube matching `selection`.
+
+        Each keyword is an axis; its value is one label or a list/tuple of
+        labels (unknown labels match nothing). Axes that are not given keep
+        all labels. Every axis is kept, a selected one with the selected
+        labels in the order given.
+        """
+        unknown = set(selection) - set(self.axes)
+        if unknown:
+            raise KeyError(f"Not an axis: {', '.join(sorted(unknown))} (axes: {', '.join(self.axes)})")
+
+        values = self.array
+        codes = dict(self._codes)
+        for i, axis in enumerate(self.axes):
+            if axis in selection:
+                indexer = self._indexer(axis, selection[axis])
+                values = values.take(indexer, axis=i)
+                codes[axis] = codes[axis][indexer]
+        return self._sub(values, codes)
+
+    def any(self) -> bool:
+        """Whether any cell has a value."""
+        return not np.isnan(self.array).all()
+
+    def sum(self, *axes: str) -> "DataCube":
+        """
+        The cube summed over `axes` (all if none are given), which are dropped.
+
+        Cells without a value count as 0; a sum without any value is NaN.
+        """
+        axes = axes or self.axes
+        positions = tuple(self.axes.index(axis) for axis in axes)
+        present = ~np.isnan(self.array)
+        total = np.where(present, self.array, 0).sum(axis=positions)
+        total = np.where(present.any(axis=positions), total, np.nan)
+        codes = {axis: codes for axis, codes in self._codes.items() if axis not in axes}
+        return self._sub(np.asarray(total), codes)
+
+    def values_of(self, axis: str, **selection: Any) -> list:
+        """Labels along `axis`, in axis order, with values among the cells matching `selection`."""
+        cube = self.take(**selection)
+        i = cube.axes.index(axis)
+        others = tuple(j for j in range(len(cube.axes)) if j != i)
+        present = (~np.isnan(cube.array)).any(axis=others)
+        return cube._dtypes[axis].categories[cube._codes[axis][present]].tolist()
+
+    def values(self, key: str, **selection: Any) -> list:
+        """
+        Distinct labels of `key` (sorted) with values among the cells matching `selection`.
+
+        As `DatasetIndex.values`, but `selection` may use any axis.
+        """
+        return sorted(self.values_of(key, **selection))
+
+    def to_frame(self, dropna: bool = True, columns: Sequence[str] | None = None) -> pd.DataFrame:
+        """
+        The cube as a long frame: a categorical column per axis plus the value column.
+
+        The categories of a column are all labels of the axis in the cube the
+        selection was taken from, as in the original frame. Rows are in axis
+        order (the last axis varies fastest). With `dropna`, cells without a
+        value are left out, as in the original frame. `columns` orders (and
+        selects) the columns; default: the axes, then the value.
+        """
+        grid = np.indices(self.array.shape).reshape(len(self.axes), -1)
+        values = self.array.reshape(-1)
+        if dropna:
+            keep = ~np.isnan(values)
+            grid, values = grid[:, keep], values[keep]
+        data = {axis: pd.Categorical.from_codes(self._codes[axis][positions], dtype=self._dtypes[axis])
+                for axis, positions in zip(self.axes, grid)}
+        data[self.value] = values
+        return pd.DataFrame({column: data[column] for column in (columns or data)})
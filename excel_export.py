@@ -0,0 +1,182 @@
+"""
+Bulk Excel export of the dashboard tables.
+
+Both pages export tables (taakvelden x jaren or gemeenten) to xlsx. Writing
+cell by cell with a DataFrame lookup per cell, or sending a Styler through
+`pd.ExcelWriter`, costs Python work per cell and keeps the whole workbook
+in memory. `ExcelExport` writes a table one row per `write_row` call from a
+plain list of values, shares one cache of cell formats across all sheets,
+and can use xlsxwriter's constant_memory mode, which flushes every row to
+disk once the next one starts. Rows are always written top to bottom, as
+that mode requires.
+
+A workbook can hold many sheets, and a sheet several titled tables below
+each other, so one file can cover many gemeenten:
+
+    export = ExcelExport(BytesIO())
+    for gemeente, tables in tables_per_gemeente.items():
+        export.add_sheet(gemeente, tables)
+    export.close()
+
+`export_tables` does this for a dict of sheets and returns the file's bytes.
+"""
+
+from __future__ import annotations
+
+import re
+from io import BytesIO
+from typing import IO, Any, Mapping
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+NUM_FORMAT = "#,##0"
+# Same look as the header and index cells written by DataFrame.to_excel
+HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+TITLE_FORMAT = {"bold": True, "font_size": 12}
+
+MAX_SHEET_NAME = 31  # Excel limit
+INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+# Above this many cells in a workbook, export_tables uses constant_memory mode
+CONSTANT_MEMORY_CELLS = 200_000
+
+Table = pd.DataFrame | Mapping[str, pd.DataFrame]
+
+
+def _cells(table: pd.DataFrame) -> list[list[Any]]:
+    """Rows of `table` as lists of plain Python values; missing values become None (blank cells)."""
+    values = table.to_numpy(dtype=object)
+    return np.where(pd.isna(values), None, values).tolist()
+
+
+def table_cells(sheets: Mapping[str, Table]) -> int:
+    """Number of data cells in `sheets` (see export_tables)."""
+    total = 0
+    for table in sheets.values():
+        tables = table.values() if isinstance(table, Mapping) else [table]
+        total += sum(t.size for t in tables)
+    return total
+
+
+class ExcelExport:
+    """
+    An xlsx workbook that tables are added to sheet by sheet.
+    """
+
+    def __init__(
+        self,
+        target: str | IO[bytes],
+        *,
+        constant_memory: bool = False,
+        num_format: str = NUM_FORMAT,
+        index_width: float = 30,
+        column_width: float = 15,
+    ):
+        self.target = target
+        self.workbook = xlsxwriter.Workbook(target, {"constant_memory": constant_memory})
+        self.num_format = num_format
+        self.index_width = index_width
+        self.column_width = column_width
+        self._formats: dict[tuple, Any] = {}
+        self._sheet_names: set[str] = set()
+
+    def __enter__(self) -> "ExcelExport":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def format(self, **props: Any):
+        """
+        The workbook format with these properties, created once and shared by all sheets.
+        """
+        key = tuple(sorted(props.items()))
+        if key not in self._formats:
+            self._formats[key] = self.workbook.add_format(props)
+        return self._formats[key]
+
+    def sheet_name(self, name: str) -> str:
+        """
+        A valid, unused sheet name for `name`: invalid characters removed,
+        cut to 31 characters and numbered if it is already taken.
+        """
+        base = INVALID_SHEET_CHARS.sub("", str(name)).strip("'")[:MAX_SHEET_NAME] or "Blad"
+        candidate, n = base, 1
+        while candidate.lower() in self._sheet_names:
+            n += 1
+            suffix = f" ({n})"
+            candidate = base[: MAX_SHEET_NAME - len(suffix)] + suffix
+        self._sheet_names.add(candidate.lower())
+        return candidate
+
+    def add_sheet(self, name: str, table: Table) -> str:
+        """
+        Add a sheet with `table`: one DataFrame, or a dict of titled DataFrames
+        written below each other. Returns the sheet name used.
+        """
+        sheet_name = self.sheet_name(name)
+        worksheet = self.workbook.add_worksheet(sheet_name)
+
+        if isinstance(table, Mapping):
+            tables = list(table.items())
+        else:
+            tables = [(None, table)]
+        widest = max((len(t.columns) for _, t in tables), default=0)
+        worksheet.set_column(0, 0, self.index_width)
+        if widest:
+            worksheet.set_column(1, widest, self.column_width)
+
+        row = 0
+        for title, t in tables:
+            if title is not None:
+                worksheet.write_string(row, 0, str(title), self.format(**TITLE_FORMAT))
+                row += 1
+            row = self._write_table(worksheet, row, t) + 1
+        return sheet_name
+
+    def _write_table(self, worksheet, row: int, table: pd.DataFrame) -> int:
+        """
+        Write `table` (header row, then index + values per row) from `row` on; returns the next free row.
+        """
+        header = self.format(**HEADER_FORMAT)
+        number = self.format(num_format=self.num_format)
+
+        index_label = table.index.name if table.index.name is not None else ""
+        worksheet.write(row, 0, index_label, header)
+        worksheet.write_row(row, 1, [str(c) for c in table.columns], header)
+        row += 1
+
+        for label, values in zip(table.index.astype(str), _cells(table)):
+            worksheet.write_string(row, 0, label, header)
+            worksheet.write_row(row, 1, values, number)
+            row += 1
+        return row
+
+    def close(self) -> None:
+        self.workbook.close()
+
+
+def export_tables(
+    sheets: Mapping[str, Table],
+    target: str | IO[bytes] | None = None,
+    *,
+    constant_memory: bool | None = None,
+    **options: Any,
+) -> bytes | None:
+    """
+    Write `sheets` (sheet name -> table, see ExcelExport.add_sheet) as one workbook.
+
+    Writes to `target` if given, else returns the xlsx file as bytes.
+    `constant_memory` defaults to True above CONSTANT_MEMORY_CELLS cells.
+    Other options go to ExcelExport.
+    """
+    if constant_memory is None:
+        constant_memory = table_cells(sheets) > CONSTANT_MEMORY_CELLS
+    output = BytesIO() if target is None else target
+
+    with ExcelExport(output, constant_memory=constant_memory, **options) as export:
+        for name, table in sheets.items():
+            export.add_sheet(name, table)
+
+    return output.getvalue() if target is None else None
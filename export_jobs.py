@@ -0,0 +1,67 @@
+"""
+Export files built on request, on background worker threads.
+
+The pages used to build every downloadable file (xlsx workbooks, CSV
+strings) on each rerun, because `st.download_button` needs the bytes up
+front, so every widget change also paid for exports nobody downloaded.
+
+`ExportJobs` builds a file only when it is asked for: `submit` starts the
+build on a worker thread and returns a Future; the Future is kept under a
+key that identifies the selection (dataset version, gemeente, vergelijking,
+categorie, jaren, ...), so asking again for the same selection, also from
+another session or after a rerun interrupted the wait, reuses the running
+or finished build. The last `max_entries` results are kept.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+
+class ExportJobs:
+    """
+    Background builds of export files, cached by selection key.
+    """
+
+    def __init__(self, max_workers: int = 2, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self._jobs: OrderedDict[Hashable, Future] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def get(self, key: Hashable) -> Future | None:
+        """
+        The build for `key`, if one was submitted and is still cached.
+        """
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is not None:
+                self._jobs.move_to_end(key)
+            return future
+
+    def submit(self, key: Hashable, build: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """
+        Start `build(*args, **kwargs)` for `key` unless a build for it exists; returns its Future.
+
+        A failed build is not kept, so submitting the key again retries it.
+        """
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                self._jobs.move_to_end(key)
+                return future
+
+            future = self._executor.submit(build, *args, **kwargs)
+            self._jobs[key] = future
+            while len(self._jobs) > self.max_entries:
+                self._jobs.popitem(last=False)
+            return future
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
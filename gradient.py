@@ -0,0 +1,150 @@
+"""
+Root-scaled RdBu colouring of Verschil values, on whole arrays at once.
+
+The Verschil tables colour every cell with a "gradient map": values are
+scaled to [-1, 1] separately on the negative and the positive side, so
+both ends of the colour map are used even when one side is much larger,
+then raised to the power ROOT_FACTOR (keeping the sign) to bring out
+smaller values, and mirrored for Lasten (more lasten than begroot is bad).
+The scaled values are coloured with the RdBu colour map, normalized over
+the whole table, as `Styler.background_gradient(cmap="RdBu", gmap=...,
+axis=None)` does.
+
+`gradient_map` does this with NumPy array operations instead of four
+elementwise passes per cell. `gradient_colors` returns the CSS colours
+that `background_gradient` would give, for views that draw the cells
+themselves, and `grouped_gradient_colors` does so for many tables at once
+(the national heatmap: one table per gemeente and group of taakvelden).
+"""
+
+from __future__ import annotations
+
+import matplotlib
+import numpy as np
+
+ROOT_FACTOR = 0.4  # For gradient map calculation
+CMAP = "RdBu"
+
+_HEX = np.array([format(i, "02x") for i in range(256)])  # Two-digit hex per colour channel value
+
+
+def _as_float(values) -> np.ndarray:
+    """Values as a float array; the blank separator column ("") counts as 0."""
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = np.where(values == "", 0, values)
+    return values.astype(float)
+
+
+def _scale(x1: np.ndarray, x_min, x_max, categorie: str) -> np.ndarray:
+    """Gradient map of `x1` given the absolute minimum and maximum (scalars, or one per cell)."""
+    # Both branches are evaluated for every cell; ignore the unused side's division by zero
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x2 = np.where(
+            x_min > x_max,
+            # If minimum is higher than maximum, multiply by fraction max/min
+            np.where(x1 > 0, x1 * (x_min / x_max) / x_min, x1 / x_min),
+            # If maximum is higher: multiply by fraction min/max
+            np.where(x1 < 0, x1 * (x_max / x_min) / x_max, x1 / x_max),
+        )
+
+        # Take root to raise lower values. float_power gives the same last bit as
+        # Python's ** (np.power may use SIMD code that differs by an ulp, which
+        # can move a cell into the neighbouring colour)
+        root = np.float_power(np.abs(x2), ROOT_FACTOR)
+        x3 = np.where(x2 >= 0, root, -root)
+
+    if categorie == "Lasten":
+        x3 = -x3  # Reverse gradient map for lasten
+
+    # All zeros stay as they are
+    return np.where((x_min == 0) & (x_max == 0), x1, x3)
+
+
+def gradient_map(values, categorie: str) -> np.ndarray:
+    """
+    Gradient map values (roughly -1 to 1) for `values`, a 1D or 2D array.
+
+    Args:
+        values: Verschil values; "" (blank column) counts as 0
+        categorie: Category name ("Baten", "Lasten", or "Saldo")
+
+    Returns:
+        np.ndarray: Gradient map of the same shape
+    """
+    x1 = _as_float(values)
+    if x1.size == 0:
+        return x1
+
+    return _scale(x1, abs(x1.min()), abs(x1.max()), categorie)
+
+
+def _to_hex(normed: np.ndarray) -> np.ndarray:
+    """"#rrggbb" colours of the colour map for values normalized to [0, 1]."""
+    rgb = matplotlib.colormaps[CMAP](normed)[..., :3]
+    # Same rounding as matplotlib.colors.to_hex
+    codes = np.round(rgb * 255).astype(int)
+    hexes = np.char.add(np.char.add(_HEX[codes[..., 0]], _HEX[codes[..., 1]]), _HEX[codes[..., 2]])
+    return np.char.add("#", hexes).astype(object)
+
+
+def gradient_colors(gmap: np.ndarray) -> np.ndarray:
+    """
+    Hex background colours for a gradient map, normalized over all of it.
+
+    Gives the same colours as `Styler.background_gradient(cmap="RdBu",
+    gmap=gmap, axis=None)`. Missing values get the colour map's "bad" colour.
+
+    Args:
+        gmap: Gradient map values (see gradient_map)
+
+    Returns:
+        np.ndarray: Array of "#rrggbb" strings of the same shape
+    """
+    gmap = np.asarray(gmap, dtype=float)
+    if gmap.size == 0 or np.isnan(gmap).all():
+        return np.full(gmap.shape, "#000000", dtype=object)
+
+    norm = matplotlib.colors.Normalize(np.nanmin(gmap), np.nanmax(gmap))
+    return _to_hex(norm(gmap))
+
+
+def grouped_gradient_colors(values, groups, categorie: str) -> np.ndarray:
+    """
+    Hex background colours for 1D `values`, with each group scaled as a table of its own.
+
+    For every group, gives the same colours as
+    `gradient_colors(gradient_map(values[groups == group], categorie))`.
+
+    Args:
+        values: Verschil values
+        groups: Group label of each value
+        categorie: Category name ("Baten", "Lasten", or "Saldo")
+
+    Returns:
+        np.ndarray: Array of "#rrggbb" strings of the same shape
+    """
+    x1 = _as_float(values)
+    if x1.size == 0:
+        return np.full(x1.shape, "#000000", dtype=object)
+    _, group = np.unique(np.asarray(groups), return_inverse=True)
+    n = group.max() + 1
+
+    # Minimum and maximum per group (NaN if the group has a NaN, as x1.min() in gradient_map)
+    lo = np.full(n, np.inf)
+    hi = np.full(n, -np.inf)
+    with np.errstate(invalid="ignore"):
+        np.minimum.at(lo, group, x1)
+        np.maximum.at(hi, group, x1)
+    gmap = _scale(x1, np.abs(lo)[group], np.abs(hi)[group], categorie)
+
+    # Normalized per group like gradient_colors: matplotlib.colors.Normalize over the
+    # non-missing values gives 0 everywhere if they are all equal; an all-NaN group stays NaN
+    lo = np.full(n, np.inf)
+    hi = np.full(n, -np.inf)
+    np.fmin.at(lo, group, gmap)
+    np.fmax.at(hi, group, gmap)
+    lo, span = lo[group], (hi - lo)[group]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normed = np.where(span > 0, (gmap - lo) / span, np.where(np.isinf(lo), np.nan, 0.0))
+    return _to_hex(normed)
@@ -5,312 +5,191 @@ import pandas as pd
 import streamlit as st
 import matplotlib
 import vl_convert as vlc
-from io import BytesIO
 from pyxlsb import open_workbook as open_xlsb
 
-# Move dictionary definition here
-taakvelden_dict = {
-    "Gemeentefonds": ("0.7"),
-    "Eigen inkomsten": ("0.3", "0.5", "0.6", "0.8", "0.9"),
-    "Bestuur" : ("0.1 ", "0.2", "0.4"),
-    "Veiligheid": ("1"),
-    "Verkeer en vervoer": ("2"),
-    "Economie": ("3"),
-    "Onderwijs": ("4"),
-    "Sport, cultuur": ("5"),
-    "Sociaal domein": ("6"),
-    "Volksgezondheid": ("7"),
-    "Wonen en bouwen": ("8"),
-}
+from data_access import DatasetHandle
+from excel_export import export_tables
+from queries import TaakveldData, TaakveldQueries, TaakveldRollups
+from queries.taakvelden import DATA_FILE, MAX_CHART_GEMEENTEN, ROLLUP_FILE, subtaakvelden, summarize_peers, taakvelden_dict
 
-subtaakvelden = {
-    "Gemeentefonds": ("0.7"),
-    "Eigen inkomsten": ("0.3", "0.5", "0.6", "0.8", "0.9"),
-    "Bestuur" : ("0.1 ", "0.2", "0.4"),
-    "Veiligheid": ("1"),
-    "Verkeer en vervoer": ("2"),
-    "Economie": ("3"),
-    "Onderwijs": ("4"),
-    "Sport, cultuur en recreatie (SCR)": ("5"),
-    "Sociaal domein - Algemene voorzieningen": ("6.1", "6.2"),
-    "Sociaal domein - Inkomen en participatie": ("6.3", "6.4", "6.5"),
-    "Sociaal domein - Wmo": ("6.6", "6.71", "6.791", "6.81", "6.91"),
-    "Sociaal domein - Jeugd": ("6.72", "6.73", "6.74", "6.75", "6.76", "6.792", "6.82", "6.92"),
-    "Volksgezondheid": ("7"),
-    "Wonen en bouwen": ("8"),
-}
+CLASSES_FILE = "gemeenteklassen.csv"
 
-# Constants
-EURO_TO_THOUSAND_FACTOR = 1000  # Convert from €1000 to € per inhabitant
-
-def calculate_waarde(filtered_data, per_inwoner=False):
-    """Calculate the final value for a gemeente-taakveld combination.
+def get_handle():
+    """Return the handle (path + version) of the current dataset.
+    
+    Only reads the dataset manifest; cached functions take this handle
+    instead of DataFrames as their cache key.
     
-    Args:
-        filtered_data: DataFrame slice for specific gemeente and taakveld
-        per_inwoner: If True, return value per inhabitant, else total
-        
     Returns:
-        Calculated value (float)
+        DatasetHandle of the per-taakveld dataset
     """
-    if len(filtered_data) == 0:
-        return 0
-    
-    sum_value = filtered_data['Waarde'].sum()
-    categorie = filtered_data['Categorie'].iloc[0]
-    
-    # Saldo is defined as netto lasten (lasten - baten), so negate
-    if categorie == "Saldo":
-        sum_value = -1 * sum_value
-    
-    if per_inwoner:
-        inwonertal = filtered_data['Inwonertal'].iloc[0]
-        if inwonertal > 0:
-            return round(EURO_TO_THOUSAND_FACTOR * sum_value / inwonertal, 0)
-        else:
-            return 0
-    else:
-        return sum_value
+    return DatasetHandle.open(DATA_FILE)
 
-@st.cache_resource
-def get_data():
+@st.cache_resource(max_entries=1)
+def get_data(handle):
     """Load budget/reckoning data with error handling.
     
+    The data is memory-mapped from a file next to the dataset, shared by
+    all server processes on the host (see TaakveldData.mapped).
+    
+    Args:
+        handle: DatasetHandle of the dataset to load
+        
     Returns:
-        DataFrame with gemeente data, or empty DataFrame on error
+        TaakveldData, or None on error
     """
-    filepath = "begroting_rekening_per_taakveld.pickle"
+    filepath = handle.path
     
     try:
-        data = pd.read_pickle(filepath)
+        # Raises ValueError for missing required columns
+        data = TaakveldData.mapped(handle)
         
-        if data.empty:
+        if len(data.index) == 0:
             st.error("⚠️ Data file is empty. Please check the data source.")
-            return pd.DataFrame()
-        
-        # Validate required columns exist
-        required_columns = ['Gemeenten', 'Jaar', 'Document', 'Categorie', 
-                          'Taakveld', 'Waarde', 'Inwonertal']
-        missing_columns = [col for col in required_columns if col not in data.columns]
-        
-        if missing_columns:
-            st.error(f"⚠️ Missing required columns in data: {missing_columns}")
-            return pd.DataFrame()
+            return None
         
         return data
         
     except FileNotFoundError:
         st.error(f"❌ Data file '{filepath}' not found. Please ensure the file exists.")
-        return pd.DataFrame()
+        return None
     except Exception as e:
         st.error(f"❌ Error loading data: {str(e)}")
         st.exception(e)  # Show full traceback in debug mode
-        return pd.DataFrame()
+        return None
 
-def check_jaren(data, gemeenten):
-    """Check available years for given gemeenten.
+def get_rollup_handle():
+    """Return the handle (path + version) of the precomputed rollup dataset.
     
-    Args:
-        data: Source DataFrame
-        gemeenten: Single gemeente name (str) or tuple of gemeente names
-        
     Returns:
-        List of available years, or False if no data
+        DatasetHandle of ROLLUP_FILE (empty version if it was not built)
     """
-    if data.empty:
-        return False
-    
-    # Normalize to tuple
-    if isinstance(gemeenten, str):
-        gemeenten_pattern = (gemeenten,)
-    else:
-        gemeenten_pattern = gemeenten
-    
-    try:
-        filtered_data = data[data['Gemeenten'].str.startswith(gemeenten_pattern)]
-        jaren = list(filtered_data.Jaar.unique())
-        
-        return jaren if len(jaren) > 0 else False
-    except Exception as e:
-        st.warning(f"⚠️ Error checking years: {str(e)}")
-        return False
+    return DatasetHandle.open(ROLLUP_FILE)
 
-def check_document(data, gemeenten, selected_jaar):
-    """Check available documents for given gemeenten and year.
+@st.cache_resource(max_entries=1)
+def get_rollups(handle):
+    """Load the hoofdtaakveld and taakveld rollups, if they were built.
+    
+    Without them the charts are computed from the taakveld rows, which
+    gives the same values.
     
     Args:
-        data: Source DataFrame
-        gemeenten: Single gemeente name (str) or tuple of gemeente names
-        selected_jaar: Selected year (int)
+        handle: DatasetHandle of the rollup dataset
         
     Returns:
-        Tuple of available document types
+        TaakveldRollups, or None if the dataset is missing or cannot be loaded
     """
-    if data.empty:
-        return tuple()
-    
-    # Normalize to tuple
-    if isinstance(gemeenten, str):
-        gemeenten_pattern = (gemeenten,)
-    else:
-        gemeenten_pattern = gemeenten
-    
+    if not handle.version:
+        return None
     try:
-        filtered_data = data[
-            (data['Gemeenten'].str.startswith(gemeenten_pattern)) &
-            (data['Jaar'] == selected_jaar)
-        ]
-        
-        return tuple(filtered_data.Document.unique())
+        return TaakveldRollups.mapped(handle)
     except Exception as e:
-        st.warning(f"⚠️ Error checking documents: {str(e)}")
-        return tuple()
-    
-    
+        st.warning(f"⚠️ Error loading rollups, computing from the taakvelden instead: {str(e)}")
+        return None
 
-@st.cache_data
-def filter_data(data, jaar, gemeenten, document, categorie):
-    """Filter data by year, gemeenten, document, and category.
+@st.cache_resource(max_entries=1)
+def get_queries(handle, rollup_handle):
+    """Queries on the dataset, with their result cache, once per dataset version.
     
     Args:
-        data: Source DataFrame
-        jaar: Year (int)
-        gemeenten: Single gemeente name (str) or tuple of gemeente names
-        document: Document type (str)
-        categorie: Category (str)
+        handle: DatasetHandle of the dataset
+        rollup_handle: DatasetHandle of the rollup dataset
         
     Returns:
-        Filtered DataFrame
+        TaakveldQueries over the loaded data (see queries/taakvelden.py)
     """
-    if data.empty:
-        return pd.DataFrame()
-    
-    # Normalize gemeenten to tuple for consistent handling
-    if isinstance(gemeenten, str):
-        gemeenten_pattern = (gemeenten,)
-    elif isinstance(gemeenten, tuple):
-        gemeenten_pattern = gemeenten
-    else:
-        st.warning(f"⚠️ Unexpected type for gemeenten: {type(gemeenten)}")
-        return pd.DataFrame()
+    return TaakveldQueries(get_data(handle), get_rollups(rollup_handle))
+
+@st.cache_data
+def get_provincies():
+    """Load the gemeenten of each provincie from the classes file.
     
+    Returns:
+        Dict of provincie name to list of gemeente names, empty on error
+    """
     try:
-        filtered_data = data[
-            (data['Gemeenten'].str.startswith(gemeenten_pattern)) &
-            (data['Jaar'] == jaar) &
-            (data['Document'] == document) &
-            (data['Categorie'] == categorie)
-        ]
-        
-        return filtered_data
-        
-    except KeyError as e:
-        st.warning(f"⚠️ Column not found in data: {e}")
-        return pd.DataFrame()
-    except Exception as e:
-        st.warning(f"⚠️ Error filtering data: {str(e)}")
-        return pd.DataFrame()
-
-
+        with open(CLASSES_FILE, mode='r', encoding='utf-8') as infile:
+            rows = list(csv.reader(infile))
+    except FileNotFoundError:
+        st.warning(f"⚠️ Classes file '{CLASSES_FILE}' not found. Provincies cannot be selected.")
+        return {}
+    
+    provincies = {}
+    for row in rows[1:]:  # Skip the header
+        if len(row) > 1 and row[1]:
+            provincies.setdefault(row[1], []).append(row[0])
+    return provincies
 
-def prep_hoofdtaakvelden(data, per_inwoner=False):
-    """Prepare data for hoofdtaakvelden chart.
+def chart_data(table, item, selected_gemeenten, peers):
+    """Data of a chart: the table, with the peers summarized if there are many.
+    
+    Up to MAX_CHART_GEMEENTEN peers are drawn as separate bars; more are
+    reduced to their median and range per item here, so the chart gets a
+    few rows per item instead of one per gemeente.
     
     Args:
-        data: Filtered DataFrame with gemeente data
-        per_inwoner: If True, calculate values per inhabitant, else use totals
+        table: DataFrame with columns Gemeente, item, Waarde
+        item: Name of the item column (Hoofdtaakveld or Taakveld)
+        selected_gemeenten: All selected gemeenten and groepen, in order
+        peers: The compared gemeenten among them
         
     Returns:
-        DataFrame with columns: Gemeente, Hoofdtaakveld, Waarde
+        Tuple of the chart DataFrame and the order of its Gemeente values
     """
-    chart_data = []
-    gemeenten = data.Gemeenten.unique()
-    
-    for gemeente in gemeenten:
-        for key, value in taakvelden_dict.items():
-            filtered_data = data[
-                (data['Gemeenten'] == gemeente) &
-                (data['Taakveld'].str.startswith(value))
-            ]
-            
-            waarde = calculate_waarde(filtered_data, per_inwoner)
-            chart_data.append([gemeente, key, waarde])
+    if len(peers) <= MAX_CHART_GEMEENTEN:
+        return table, list(selected_gemeenten)
     
-    return pd.DataFrame(chart_data, columns=["Gemeente", "Hoofdtaakveld", "Waarde"])
+    label = f"Mediaan {len(peers)} gemeenten"
+    order = [gemeente for gemeente in selected_gemeenten if gemeente not in peers] + [label]
+    return summarize_peers(table, item, peers, label), order
 
-def prep_subtaakvelden(data, htv=None, per_inwoner=False):
-    """Prepare data for subtaakvelden chart.
+def show_result(result):
+    """Show the messages of a query result as warnings and return its value.
     
     Args:
-        data: Filtered DataFrame with gemeente data
-        htv: Optional hoofdtaakveld to filter by
-        per_inwoner: If True, calculate values per inhabitant, else use totals
+        result: QueryResult of a query
         
     Returns:
-        DataFrame with columns: Gemeente, Taakveld, Waarde
+        The query result, or its default if the selection was rejected
     """
-    chart_data = []
-    
-    if htv:
-        tv_tuple = subtaakvelden[htv]
-        taakvelden = data[
-            (data['Taakveld'].str.startswith(tv_tuple))
-        ].Taakveld.unique()
-    else:
-        taakvelden = data.Taakveld.unique()
-    
-    gemeenten = data.Gemeenten.unique()
-    
-    for taakveld in taakvelden:
-        for gemeente in gemeenten:
-            filtered_data = data[
-                (data['Gemeenten'] == gemeente) &
-                (data['Taakveld'] == taakveld)
-            ]
-            
-            waarde = calculate_waarde(filtered_data, per_inwoner)
-            chart_data.append([gemeente, taakveld, waarde])
-    
-    return pd.DataFrame(chart_data, columns=["Gemeente", "Taakveld", "Waarde"])
+    for message in result.warnings:
+        st.warning(f"⚠️ {message}")
+    if result.error:
+        st.warning(f"⚠️ {result.error}")
+    return result.value
 
 def to_excel(df, cat):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name=cat)
-        workbook = writer.book
-        worksheet = writer.sheets[cat]
-        
-        # Set column widths
-        worksheet.set_column('A:A', 20)  # Index column
-        worksheet.set_column('B:Z', 20)  # Data columns
-        
-        # Create European number format
-        num_format = workbook.add_format({'num_format': '#,##0'})
+    """Export a table to an Excel file with one sheet (see excel_export.py).
+    
+    Args:
+        df: DataFrame to export
+        cat: Sheet name
         
-        # Apply format to all data cells
-        for col in range(1, len(df.columns) + 2):  # +2 because of index column
-            worksheet.set_column(col, col, None, num_format)
-            
-    processed_data = output.getvalue()
-    return processed_data
+    Returns:
+        Excel file as bytes
+    """
+    return export_tables({cat: df}, index_width=20, column_width=20)
 
 # Wide screen
 st.set_page_config(layout="wide")
 
 # Load data once at the beginning
+handle = get_handle()
 with st.spinner("📊 Data wordt geladen..."):
-    data = get_data()
+    data = get_data(handle)
 
 # Early exit if no data
-if data.empty:
+if data is None:
     st.error("❌ Geen data beschikbaar. De applicatie kan niet worden gestart.")
     st.stop()
 
+taakveld_queries = get_queries(handle, get_rollup_handle())
+
 # Sidebar
 with st.sidebar:
     st.header("Selecteer hier de analyse")
 
-    gemeente_options = list(data.Gemeenten.unique())
+    gemeente_options = taakveld_queries.gemeente_options
     groep_options = ["Nederland"] + [x for x in gemeente_options if "inwoners" in x or "stedelijk" in x] + \
         ["Drenthe", "Groningen", "Fryslân", "Overijssel", "Gelderland", "Flevoland", 
          "Utrecht", "Noord-Holland", "Zuid-Holland", "Noord-Brabant", "Zeeland",
@@ -320,40 +199,33 @@ with st.sidebar:
                                      gemeente_options,
                                      key=0)
     
-    vergelijk_gemeente1 = st.selectbox("Selecteer een gemeente om mee te vergelijken",
-                                     gemeente_options,
-                                     index=None,
-                                     placeholder="Selecteer een optie",
-                                     key=1)
-    vergelijk_gemeente2 = st.selectbox("Selecteer een gemeente om mee te vergelijken",
-                                     gemeente_options,
-                                     index=None,
-                                     placeholder="Selecteer een optie",
-                                     key=2)
-    vergelijk_gemeente3 = st.selectbox("Selecteer een gemeente om mee te vergelijken",
-                                     gemeente_options,
-                                     index=None,
-                                     placeholder="Selecteer een optie",
-                                     key=3)
-    
-    vergelijk_groep = st.selectbox("Selecteer een provincie, grootte- of stedelijkheidsklasse of alle gemeenten om mee te vergelijken",
-                                     groep_options,
-                                     index=None,
-                                     placeholder="Selecteer een optie",
-                                     key=4)
+    vergelijk_gemeenten = st.multiselect("Selecteer gemeenten om mee te vergelijken",
+                                         [x for x in gemeente_options if x not in groep_options],
+                                         placeholder="Selecteer een of meer opties",
+                                         key=1)
+    
+    provincies = get_provincies()
+    vergelijk_provincies = st.multiselect("Of vergelijk met alle gemeenten in een provincie",
+                                          sorted(provincies),
+                                          placeholder="Selecteer een of meer opties",
+                                          key=2)
+    
+    vergelijk_groepen = st.multiselect("Selecteer provincies, grootte- of stedelijkheidsklassen of alle gemeenten om mee te vergelijken",
+                                       groep_options,
+                                       placeholder="Selecteer een of meer opties",
+                                       key=4)
 
-    selected_gemeenten = [selected_gemeente]
-    
-    if vergelijk_gemeente1 is not None:
-        selected_gemeenten.append(vergelijk_gemeente1)
-    if vergelijk_gemeente2 is not None:
-        selected_gemeenten.append(vergelijk_gemeente2)
-    if vergelijk_gemeente3 is not None:
-        selected_gemeenten.append(vergelijk_gemeente3)
-    if vergelijk_groep is not None:
-        selected_gemeenten.append(vergelijk_groep)
-    
-    selected_gemeenten = tuple(selected_gemeenten)
+    provincie_gemeenten = [x for provincie in vergelijk_provincies for x in provincies[provincie]
+                           if x in taakveld_queries.dataset.index]
+    
+    # Each gemeente once, the selected gemeente first and the groepen last
+    selected_gemeenten = tuple(dict.fromkeys(
+        [selected_gemeente, *vergelijk_gemeenten, *provincie_gemeenten, *vergelijk_groepen]))
+    peers = [x for x in selected_gemeenten[1:] if x not in vergelijk_groepen]
+    
+    if len(peers) > MAX_CHART_GEMEENTEN:
+        st.caption(f"Met meer dan {MAX_CHART_GEMEENTEN} gemeenten tonen de grafieken de mediaan en de spreiding van de "
+                   f"{len(peers)} vergeleken gemeenten; de downloads bevatten alle gemeenten.")
 
 # Body
 referral_container = st.container()
@@ -396,7 +268,7 @@ with select_data:
     
     with ch2:
         
-        jaar_options = check_jaren(data, selected_gemeenten[0])
+        jaar_options = show_result(taakveld_queries.jaren(selected_gemeenten[0]))
         selected_jaar = None
         if jaar_options:
             selected_jaar = st.slider("Welk jaar vergelijken?", min(jaar_options), max(jaar_options), max(jaar_options))
@@ -408,7 +280,7 @@ with select_data:
         selected_document = None
         if selected_jaar is not None:
             with c1:
-                document_options = check_document(data, selected_gemeenten, selected_jaar)
+                document_options = show_result(taakveld_queries.documenten(selected_gemeenten, selected_jaar))
                 if len(document_options) > 0:
                     selected_document = st.selectbox("Begroting of jaarrekening?", document_options)
                 else:
@@ -429,7 +301,7 @@ with select_data:
             scale = "€" if per_inwoner else "€ 1.000"
     
     if selected_jaar is not None and selected_document is not None:
-        gemeente_data = filter_data(data, selected_jaar, selected_gemeenten, selected_document, selected_categorie)
+        gemeente_data = show_result(taakveld_queries.filter_data(selected_jaar, selected_gemeenten, selected_document, selected_categorie))
     else:
         gemeente_data = pd.DataFrame()
     
@@ -454,14 +326,28 @@ with hoofd_tv:
             
             with c2:
                 with st.spinner("📊 Grafiek wordt gegenereerd..."):
-                    hoofdtaakvelden = prep_hoofdtaakvelden(gemeente_data, per_inwoner=per_inwoner)
+                    hoofdtaakvelden = show_result(taakveld_queries.hoofdtaakvelden(
+                        selected_jaar, selected_gemeenten, selected_document, selected_categorie, per_inwoner))
                     
-                    chart = alt.Chart(hoofdtaakvelden).mark_bar().encode(
+                    hoofd_chart_data, gemeente_order = chart_data(hoofdtaakvelden, 'Hoofdtaakveld', selected_gemeenten, peers)
+                    
+                    chart = alt.Chart(hoofd_chart_data).mark_bar().encode(
                         x=alt.X('Hoofdtaakveld:N', title='Hoofdtaakveld', sort=htv_order),
                         y=alt.Y('Waarde:Q', title=scale),
-                        color=alt.Color('Gemeente:N', sort=selected_gemeenten),
-                        xOffset=alt.XOffset('Gemeente:N', sort=selected_gemeenten)
-                    ).properties(
+                        color=alt.Color('Gemeente:N', sort=gemeente_order),
+                        xOffset=alt.XOffset('Gemeente:N', sort=gemeente_order)
+                    )
+                    
+                    if 'Min' in hoofd_chart_data:
+                        spreiding = alt.Chart(hoofd_chart_data[hoofd_chart_data['Min'].notna()]).mark_rule(color='black').encode(
+                            x=alt.X('Hoofdtaakveld:N', sort=htv_order),
+                            y='Min:Q',
+                            y2='Max:Q',
+                            xOffset=alt.XOffset('Gemeente:N', sort=gemeente_order)
+                        )
+                        chart = chart + spreiding
+                    
+                    chart = chart.properties(
                         height=450,
                         usermeta={
                             "embedOptions": {
@@ -499,14 +385,28 @@ with sub_tv:
             with c2:
                 if htv is not None:
                     with st.spinner("📊 Grafiek wordt gegenereerd..."):
-                        subtaakvelden_df = prep_subtaakvelden(gemeente_data, htv, per_inwoner=per_inwoner)
+                        subtaakvelden_df = show_result(taakveld_queries.subtaakvelden(
+                            selected_jaar, selected_gemeenten, selected_document, selected_categorie, htv, per_inwoner))
+                        
+                        sub_chart_data, gemeente_order = chart_data(subtaakvelden_df, 'Taakveld', selected_gemeenten, peers)
                         
-                        chart = alt.Chart(subtaakvelden_df).mark_bar().encode(
+                        chart = alt.Chart(sub_chart_data).mark_bar().encode(
                             y=alt.Y('Taakveld:N', title='', axis=alt.Axis(labelLimit=200)),
                             x=alt.X('Waarde:Q', title=scale, stack=None),
-                            color=alt.Color('Gemeente:N', sort=selected_gemeenten),
-                            yOffset=alt.YOffset('Gemeente:N', sort=selected_gemeenten)
-                        ).properties(
+                            color=alt.Color('Gemeente:N', sort=gemeente_order),
+                            yOffset=alt.YOffset('Gemeente:N', sort=gemeente_order)
+                        )
+                        
+                        if 'Min' in sub_chart_data:
+                            spreiding = alt.Chart(sub_chart_data[sub_chart_data['Min'].notna()]).mark_rule(color='black').encode(
+                                y=alt.Y('Taakveld:N'),
+                                x='Min:Q',
+                                x2='Max:Q',
+                                yOffset=alt.YOffset('Gemeente:N', sort=gemeente_order)
+                            )
+                            chart = chart + spreiding
+                        
+                        chart = chart.properties(
                             usermeta={
                                 "embedOptions": {
                                     "formatLocale": vlc.get_format_locale("nl-NL"),
@@ -557,14 +457,9 @@ with table_tv:
                 if ttv == ht_option and hoofdtaakvelden is not None:
                     # Pivot the table to have hoofdtaakveld as index and gemeenten as columns
                     httable = hoofdtaakvelden.pivot(index='Hoofdtaakveld', columns='Gemeente', values='Waarde')
-                    
-                    output_table = httable.style.format(
-                                                        thousands='.',
-                                                        precision=0
-                                                )
-                                
+
                     sheet_title = f'{selected_categorie}{som_header}'
-                    df_xlsx = to_excel(output_table, sheet_title)
+                    df_xlsx = to_excel(httable, sheet_title)
                     st.download_button(label=f'📥 Download {ht_option}',
                                         data=df_xlsx ,
                                         file_name= f'{ht_option}.xlsx')
@@ -573,28 +468,19 @@ with table_tv:
                     # Pivot the table to have hoofdtaakveld as index and gemeenten as columns
                     sttable = subtaakvelden_df.pivot(index='Taakveld', columns='Gemeente', values='Waarde')
 
-                    output_table = sttable.style.format(
-                                                        thousands='.',
-                                                        precision=0
-                                                )
-                                
                     sheet_title = f'{selected_categorie}{som_header}'
-                    df_xlsx = to_excel(output_table, sheet_title)
+                    df_xlsx = to_excel(sttable, sheet_title)
                     st.download_button(label=f'📥 Download {st_option}',
                                         data=df_xlsx ,
                                         file_name= f'{st_option.replace("-", "_")}.xlsx')
                     
                 if ttv == at_option:
-                    alle_taakvelden = prep_subtaakvelden(gemeente_data, None, per_inwoner=per_inwoner)
+                    alle_taakvelden = show_result(taakveld_queries.subtaakvelden(
+                        selected_jaar, selected_gemeenten, selected_document, selected_categorie, None, per_inwoner))
                     attable = alle_taakvelden.pivot(index='Taakveld', columns='Gemeente', values='Waarde')
-                    
-                    output_table = attable.style.format(
-                                                        thousands='.',
-                                                        precision=0
-                                                )
-                                
+
                     sheet_title = f'{selected_categorie}{som_header}'
-                    df_xlsx = to_excel(output_table, sheet_title)
+                    df_xlsx = to_excel(attable, sheet_title)
                     st.download_button(label=f'📥 Download {at_option}',
                                         data=df_xlsx ,
                                         file_name= f'{at_option.replace("-", "_")}.xlsx')
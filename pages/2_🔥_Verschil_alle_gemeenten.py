@@ -0,0 +1,238 @@
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from data_access import DatasetHandle, DatasetIndex
+from gradient import grouped_gradient_colors
+from queries.begroting_rekening import TAAKVELD_REPLACEMENTS, TAVELD_GROUPS, VERSCHIL_FILE
+
+# Constants
+CLASSES_FILE = "gemeenteklassen.csv"
+INDEX_KEYS = ['Stand', 'Categorie', 'Jaar']  # Exact-match lookup keys, see data_access.py
+ALLE_PROVINCIES = "Alle provincies"
+
+# Taakveldgroepen in the order of the tables on the main page
+TAAKVELD_VOLGORDE = [taakveld for taakvelden in TAVELD_GROUPS.values() for taakveld in taakvelden]
+# Table on the main page (Inkomsten, Klassiek domein, Sociaal domein) of each taakveldgroep
+TABEL_VAN = {taakveld: groep for groep, taakvelden in TAVELD_GROUPS.items() for taakveld in taakvelden}
+
+CELL_SIZE = 14  # Pixels per heatmap cell
+
+
+def get_handle():
+    """Return the handle (path + version) of the Verschil dataset.
+
+    Returns:
+        DatasetHandle of the Verschil dataset
+    """
+    return DatasetHandle.open(VERSCHIL_FILE)
+
+@st.cache_resource(max_entries=1)
+def get_index(handle):
+    """Load the Verschil dataset, memory-mapped and indexed on (Stand, Categorie, Jaar).
+
+    The mapped copy is sorted on these keys and shared by all server
+    processes on the host (see DatasetHandle.load_index).
+
+    Args:
+        handle: DatasetHandle of the dataset
+
+    Returns:
+        MappedIndex over the Verschil data (an empty DatasetIndex if it cannot be loaded)
+    """
+    def prepare(data):
+        # Replace long taakveld names, as on the main page
+        data['Taakveld'] = data['Taakveld'].astype(str).replace(TAAKVELD_REPLACEMENTS)
+        return data
+
+    try:
+        return handle.load_index("heatmap", INDEX_KEYS, prepare)
+    except FileNotFoundError:
+        st.error(f"❌ Data file '{handle.path}' not found. Run python -m Brondata_script.calccbe_jr_streamlit to create it.")
+        return DatasetIndex(pd.DataFrame(columns=INDEX_KEYS), INDEX_KEYS)
+    except Exception as e:
+        st.error(f"❌ Error loading data: {str(e)}")
+        return DatasetIndex(pd.DataFrame(columns=INDEX_KEYS), INDEX_KEYS)
+
+@st.cache_data
+def get_provincies():
+    """Load the provincie of every gemeente.
+
+    Only gemeenten in this file are shown, so the aggregates (Nederland,
+    provincies, grootteklassen) do not dominate the colour scale.
+
+    Returns:
+        Dict mapping gemeente name to provincie, or empty dict on error
+    """
+    try:
+        classes = pd.read_csv(CLASSES_FILE, usecols=['Gemeenten', 'Provincie'])
+    except FileNotFoundError:
+        st.warning(f"⚠️ Classes file '{CLASSES_FILE}' not found.")
+        return {}
+    except Exception as e:
+        st.warning(f"⚠️ Error loading classes file: {str(e)}")
+        return {}
+    return dict(zip(classes['Gemeenten'], classes['Provincie']))
+
+@st.cache_data
+def create_heatmap_data(handle, stand, categorie, jaarmin, jaarmax, provincie):
+    """Verschil of every gemeente, taakveldgroep and year, with its colour.
+
+    Uses the same rules as the Verschil tables on the main page: a gemeente
+    needs both a jaarrekening and a begroting in the selected years, and
+    empty years are left out. The colours are those of the tables too: the
+    cells of one gemeente and one table (TAVELD_GROUPS) are scaled together.
+
+    Args:
+        handle: DatasetHandle of the dataset
+        stand: "Totaal" or "Per inwoner"
+        categorie: Category ("Baten", "Lasten" or "Saldo")
+        jaarmin: Minimum year (int)
+        jaarmax: Maximum year (int)
+        provincie: Provincie to show, or ALLE_PROVINCIES
+
+    Returns:
+        DataFrame with Gemeenten, Provincie, Taakveld, Tabel, Jaar, Verschil and Kleur
+    """
+    index = get_index(handle)
+    if len(index) == 0:
+        return pd.DataFrame()
+
+    provincies = get_provincies()
+    gemeenten = [g for g, p in provincies.items() if provincie in (ALLE_PROVINCIES, p)]
+
+    jaar_range = tuple(str(i) for i in range(jaarmin, jaarmax + 1))
+    rows = index.rows(Stand=stand, Categorie=categorie, Jaar=jaar_range)
+    rows = rows.loc[rows['Gemeenten'].isin(gemeenten)]
+    if rows.empty:
+        return pd.DataFrame()
+
+    # Both a jaarrekening and a begroting are needed, per gemeente
+    documenten = rows.groupby('Gemeenten', observed=True)[['Rekening', 'Begroting']].transform('any')
+    rows = rows.loc[documenten['Rekening'] & documenten['Begroting'] & rows['Tonen']]
+    if rows.empty:
+        return pd.DataFrame()
+
+    heatmap = pd.DataFrame({
+        'Gemeenten': rows['Gemeenten'].astype(str).to_numpy(),
+        'Taakveld': rows['Taakveld'].to_numpy(),
+        'Jaar': rows['Jaar'].astype(str).to_numpy(),
+        'Verschil': rows['Verschil'].to_numpy(),
+    })
+    heatmap.insert(1, 'Provincie', heatmap['Gemeenten'].map(provincies))
+    heatmap.insert(3, 'Tabel', heatmap['Taakveld'].map(TABEL_VAN).fillna(""))
+    tabellen = heatmap.groupby(['Gemeenten', 'Tabel'], sort=False).ngroup().to_numpy()
+    heatmap['Kleur'] = grouped_gradient_colors(heatmap['Verschil'].to_numpy(), tabellen, categorie)
+    return heatmap
+
+def show_heatmap(heatmap, taakvelden):
+    """Create the heatmap chart: one column of years per taakveldgroep, one row per gemeente.
+
+    Args:
+        heatmap: DataFrame from create_heatmap_data
+        taakvelden: Taakveldgroepen to show, in display order
+
+    Returns:
+        Altair chart
+    """
+    heatmap = heatmap.loc[heatmap['Taakveld'].isin(taakvelden)]
+    gemeenten = sorted(heatmap['Gemeenten'].unique())
+    highlight = alt.selection_point(fields=['Gemeenten'], on='click', clear='dblclick')
+
+    chart = alt.Chart(heatmap).mark_rect().encode(
+        x=alt.X('Jaar:O', title=None, axis=alt.Axis(labelAngle=-90)),
+        y=alt.Y('Gemeenten:N', title=None, sort=gemeenten),
+        color=alt.Color('Kleur:N', scale=None),
+        opacity=alt.condition(highlight, alt.value(1.0), alt.value(0.25)),
+        tooltip=[
+            alt.Tooltip('Gemeenten:N', title='Gemeente'),
+            alt.Tooltip('Provincie:N'),
+            alt.Tooltip('Taakveld:N'),
+            alt.Tooltip('Jaar:O'),
+            alt.Tooltip('Verschil:Q', format=',.0f'),
+        ],
+    ).properties(
+        width=CELL_SIZE * heatmap['Jaar'].nunique(),
+        height=CELL_SIZE * len(gemeenten),
+    ).add_params(
+        highlight
+    ).facet(
+        column=alt.Column('Taakveld:N', sort=list(taakvelden), title=None,
+                          header=alt.Header(labelAngle=-90, labelAlign='right', labelOrient='top')),
+        spacing=4,
+    )
+
+    return chart
+
+
+# Wide screen
+st.set_page_config(layout="wide")
+
+handle = get_handle()
+with st.spinner("📊 Data wordt geladen..."):
+    index = get_index(handle)
+
+# Early exit if no data
+if len(index) == 0:
+    st.error("❌ Geen data beschikbaar. De applicatie kan niet worden gestart.")
+    st.stop()
+
+jaren = [int(j) for j in index.values('Jaar')]
+
+# Sidebar
+with st.sidebar:
+    st.header("Selecteer hier de analyse")
+
+    stand_options = index.values('Stand')
+    selected_stand = st.radio("Totaal of per inwoner?",
+                              stand_options,
+                              index=stand_options.index("Per inwoner") if "Per inwoner" in stand_options else 0)
+
+    selected_categorie = st.radio("Baten, lasten of saldo?",
+                                  ["Baten", "Lasten", "Saldo"],
+                                  index=2)
+
+    jaar_min, jaar_max = st.slider(label="Selecteer het jaarbereik",
+                                   min_value=min(jaren),
+                                   max_value=max(jaren),
+                                   value=(max(min(jaren), max(jaren) - 4), max(jaren)),
+                                   step=1,
+                                   help="Kies het bereik van jaren dat je wilt analyseren")
+
+    provincie_options = [ALLE_PROVINCIES] + sorted({p for p in get_provincies().values() if isinstance(p, str)})
+    selected_provincie = st.selectbox("Selecteer een provincie", provincie_options)
+
+    selected_taakvelden = st.multiselect("Selecteer taakveldgroepen",
+                                         TAAKVELD_VOLGORDE,
+                                         default=TAAKVELD_VOLGORDE)
+
+# Body
+header_container = st.container()
+heatmap_container = st.container()
+
+with header_container:
+    ch1, ch2, ch3 = st.columns([2, 4, 2])
+
+    with ch2:
+        st.title("🔥 Verschil tussen begroting en rekening, alle gemeenten")
+        st.markdown(
+            "Deze heatmap toont voor alle gemeenten het verschil tussen de jaarrekening en de begroting, per taakveldgroep en jaar. De kleuren zijn dezelfde als in de tabellen op de pagina 📈 Analyse verschil tussen begroting en rekening: per gemeente worden de taakveldgroepen van één tabel (inkomsten, klassiek domein, sociaal domein) samen geschaald. Klik op een cel om een gemeente te markeren, dubbelklik om de markering op te heffen."
+        )
+        st.markdown(
+            "Dit is een voorlopige versie, fouten voorbehouden. Vragen of opmerkingen? Stuur een mail naar <postbusiv3@minbzk.nl>."
+        )
+
+with heatmap_container:
+    with st.spinner("Berekenen heatmap..."):
+        heatmap = create_heatmap_data(handle, selected_stand, selected_categorie,
+                                      jaar_min, jaar_max, selected_provincie)
+
+    taakvelden = [tv for tv in TAAKVELD_VOLGORDE if tv in selected_taakvelden]
+    if not taakvelden:
+        st.warning("⚠️ Selecteer ten minste één taakveldgroep")
+    elif heatmap.empty:
+        st.warning(f"⚠️ Geen data beschikbaar voor {selected_categorie.lower()} in {jaar_min}-{jaar_max}")
+    else:
+        cellen = f"{len(heatmap):,}".replace(",", ".")
+        st.caption(f"{heatmap['Gemeenten'].nunique()} gemeenten, {cellen} cellen")
+        st.altair_chart(show_heatmap(heatmap, taakvelden), use_container_width=False)
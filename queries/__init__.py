@@ -0,0 +1,50 @@
+"""
+Computations of the dashboard pages, importable without a Streamlit session.
+
+`BegrotingRekeningQueries` (main page) and `TaakveldQueries` (page 1) run
+the queries on one dataset through a bounded LRU cache with hit/miss
+statistics, and return a `QueryResult` with the value and any error or
+warning messages instead of showing them.
+"""
+
+from queries.base import QueryResult, QueryWarning, SelectionError, run_query
+from queries.begroting_rekening import (
+    BegrotingRekening,
+    BegrotingRekeningQueries,
+    VerschilCube,
+    calculate_begroting_rekening,
+    calculate_difference,
+    calculate_saldo,
+    check_selection,
+    create_tables,
+    filter_data,
+    validate_data_quality,
+)
+from queries.cache import CacheInfo, LRUCache
+from queries.charts import show_begroting_rekening, show_saldo, show_saldo_legend
+from queries.taakvelden import TaakveldData, TaakveldQueries, TaakveldRollups
+
+__all__ = [
+    "BegrotingRekening",
+    "BegrotingRekeningQueries",
+    "CacheInfo",
+    "LRUCache",
+    "QueryResult",
+    "QueryWarning",
+    "SelectionError",
+    "TaakveldData",
+    "TaakveldQueries",
+    "TaakveldRollups",
+    "VerschilCube",
+    "calculate_begroting_rekening",
+    "calculate_difference",
+    "calculate_saldo",
+    "check_selection",
+    "create_tables",
+    "filter_data",
+    "run_query",
+    "show_begroting_rekening",
+    "show_saldo",
+    "show_saldo_legend",
+    "validate_data_quality",
+]
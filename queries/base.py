@@ -0,0 +1,95 @@
+"""
+Error handling and caching shared by the query modules.
+
+The query functions report problems the Python way: a `SelectionError`
+for a selection that gives no result, and messages to a `warn` callback
+for a result that is usable but incomplete. `CachedQueries` runs them
+through an `LRUCache` and returns a `QueryResult` instead, which holds
+the value (or a default) together with the error and warning messages,
+so a view decides how to show them and a script can check `result.ok`.
+"""
+
+from __future__ import annotations
+
+import warnings
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+from queries.cache import CacheInfo, LRUCache
+
+
+class SelectionError(ValueError):
+    """A selection that gives no result; the message says why."""
+
+
+class QueryWarning(UserWarning):
+    """A result that is usable but incomplete."""
+
+
+def default_warn(message: str) -> None:
+    """Issue `message` as a QueryWarning; the `warn` default of the query functions."""
+    warnings.warn(message, QueryWarning, stacklevel=3)
+
+
+@dataclass(frozen=True)
+class QueryResult:
+    """
+    Outcome of a query: its value, or a default if the selection gave no result.
+
+    Attributes:
+        value: The query result, or the default if error is set
+        error: Why the selection gave no result, or None
+        warnings: Messages on an incomplete result
+    """
+
+    value: Any
+    error: str | None = None
+    warnings: tuple[str, ...] = ()
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_query(query: Callable[..., Any], *args: Any, default: Callable[[], Any] = lambda: None,
+              warns: bool = False, **kwargs: Any) -> QueryResult:
+    """
+    Run `query(*args, **kwargs)` and return its outcome as a QueryResult.
+
+    A SelectionError gives `default()` with the error message. If `warns`,
+    the query takes a `warn` callback, whose messages are collected.
+    """
+    messages: list[str] = []
+    if warns:
+        kwargs["warn"] = messages.append
+    try:
+        value = query(*args, **kwargs)
+    except SelectionError as e:
+        return QueryResult(default(), str(e), tuple(messages))
+    return QueryResult(value, None, tuple(messages))
+
+
+class CachedQueries:
+    """
+    Base of the query classes: runs queries on one dataset through an LRU cache.
+    """
+
+    def __init__(self, cache_size: int = 256):
+        self.cache = LRUCache(cache_size)
+
+    def _query(self, query: Callable[..., Any], key: Hashable, *args: Any,
+               default: Callable[[], Any] = lambda: None, warns: bool = False, **kwargs: Any) -> QueryResult:
+        """
+        The QueryResult of `query(*args, **kwargs)`, cached under (query name, key).
+
+        `key` holds the selection: the arguments other than the datasets, which
+        are the same for every query of this object.
+        """
+        return self.cache.get_or_compute(
+            (query.__name__, key),
+            lambda: run_query(query, *args, default=default, warns=warns, **kwargs),
+        )
+
+    def cache_info(self) -> CacheInfo:
+        """Hits, misses and size of the result cache."""
+        return self.cache.info()
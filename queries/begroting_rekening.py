@@ -0,0 +1,546 @@
+"""
+Queries behind `📈_Begroting_en_jaarrekening_vergelijken.py`, without Streamlit.
+
+The page's computations (row selection, saldo series, Baten/Lasten per
+taakveld, Verschil tables) take the loaded datasets as arguments, so the
+page, the batch report generator (`batch_reports.py`) and scripts share
+them. Problems are reported the Python way instead of through the UI:
+
+- `SelectionError` for a selection that gives no result (unknown
+  gemeente, stand or comparison, no data for a categorie, ...);
+- a message for a result that is usable but incomplete (e.g. taakvelden
+  missing from a table), passed to the `warn` argument, or issued as a
+  `QueryWarning` (see `warnings`) without one.
+
+`BegrotingRekeningQueries` runs them on one pair of datasets through an
+LRU cache and returns QueryResults (see base.py); the page is a view over
+it and shows the messages as `st.warning`.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from Brondata_script.verschil import BEGROTING, JAARREKENING, KEYS as VERSCHIL_KEYS
+from data_access import DatasetIndex, DatasetHandle
+from data_cube import DataCube
+from queries.base import CachedQueries, QueryResult, SelectionError, default_warn
+
+DATA_FILE = "begroting_rekening"  # Parquet dataset directory, see Brondata_script/dataset_store.py
+VERSCHIL_FILE = "begroting_rekening_verschil"  # Precomputed Jaarrekening - Begroting, see Brondata_script/verschil.py
+CUBE_AXES = ['Gemeenten', 'Stand', 'Jaar', 'Document', 'Categorie', 'Taakveld']  # Axes of the dataset cube, see data_cube.py
+VERSCHIL_INDEX_KEYS = ['Gemeenten', 'Stand', 'Jaar', 'Categorie']  # Lookup keys of create_tables
+REQUIRED_COLUMNS = ['Gemeenten', 'Jaar', 'Stand', 'Taakveld', 'Document', 'Waarde', 'Categorie']
+
+TAAKVELD_REPLACEMENTS = {
+    'Overig bestuur en ondersteuning': 'Overig bestuur en onderst.'
+}
+
+TAVELD_GROUPS = {
+    "Inkomsten": [
+        "Gemeentefonds", "Belastingen", "Overig bestuur en onderst.",
+        "Grondexploitatie", "Economie",
+    ],
+    "Klassiek domein": [
+        "Bestuur en burgerzaken", "Overhead", "Veiligheid",
+        "Verkeer en vervoer", "Onderwijs", "SCR",
+        "Volksgezondheid en milieu", "Wonen en bouwen",
+    ],
+    "Sociaal domein": [
+        "Algemene voorzieningen", "Inkomensregelingen", "Participatie",
+        "Maatwerk Wmo", "Maatwerk Jeugd",
+    ]
+}
+
+
+class BegrotingRekening:
+    """
+    The begroting_rekening dataset as a DataCube on CUBE_AXES.
+
+    The long frame is only read here, to build the cube and the data quality
+    report; it is not kept. The queries slice and sum the cube, and turn the
+    selected cells back into long rows where they return rows. `mapped`
+    reads the cube from a memory-mapped file instead.
+    """
+
+    def __init__(self, data: pd.DataFrame, dtype=np.float64):
+        missing = [col for col in REQUIRED_COLUMNS if col not in data.columns]
+        if missing:
+            raise ValueError(f"Missing required columns in data: {', '.join(missing)}")
+        self.columns = [col for col in data.columns if col in REQUIRED_COLUMNS]
+        self.cube = DataCube.from_frame(data, CUBE_AXES, 'Waarde', dtype)
+        self.quality = validate_data_quality(data)
+        self.size = len(data)
+        self._describe()
+
+    def _describe(self):
+        """Set the year range and stands of the cube."""
+        jaren = [int(jaar) for jaar in self.cube.values_of('Jaar')]
+        self.year_range = (min(jaren), max(jaren)) if jaren else (None, None)
+        self.stands = self.cube.values('Stand')
+
+    @classmethod
+    def mapped(cls, handle: DatasetHandle, dtype=np.float64) -> "BegrotingRekening":
+        """
+        The dataset at `handle` with its cube read from a memory-mapped file
+        (see DatasetHandle.load_mapped).
+
+        The cube is a view on a file that all processes on the host share, so
+        a process only holds the coordinates and what its queries select.
+        """
+        def build(data):
+            dataset = cls(data, dtype)
+            table, metadata = dataset.cube.to_arrow()
+            return table, {**metadata, "columns": dataset.columns, "quality": dataset.quality,
+                           "rows": dataset.size}
+
+        table, metadata = handle.load_mapped(f"cube.{np.dtype(dtype).name}", build)
+        dataset = cls.__new__(cls)
+        dataset.columns = metadata["columns"]
+        dataset.cube = DataCube.from_arrow(table, metadata)
+        dataset.quality = metadata["quality"]
+        dataset.size = metadata["rows"]
+        dataset._describe()
+        return dataset
+
+    @property
+    def index(self) -> DataCube:
+        """The lookups of a DatasetIndex (`in`, `values`), answered by the cube."""
+        return self.cube
+
+    def rows(self, cube: DataCube) -> pd.DataFrame:
+        """
+        The cells of `cube` (a selection of the dataset cube) as rows of the
+        dataset, in cube order, with the long taakveld names replaced.
+        """
+        rows = cube.to_frame(columns=self.columns)
+        # Taakveld is categorical in the dataset: replace on plain labels
+        rows['Taakveld'] = rows['Taakveld'].cat.rename_categories(
+            lambda taakveld: TAAKVELD_REPLACEMENTS.get(taakveld, taakveld)
+        ).astype(object)
+        return rows
+
+    @classmethod
+    def open(cls, path: Path | str = DATA_FILE) -> "BegrotingRekening":
+        return cls.mapped(DatasetHandle.open(path))
+
+
+class VerschilCube:
+    """
+    The precomputed Verschil dataset, indexed on (Gemeenten, Stand, Jaar, Categorie).
+    """
+
+    def __init__(self, index: DatasetIndex):
+        self.index = index
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> "VerschilCube":
+        return cls(DatasetIndex(cls._replace_taakvelden(data), VERSCHIL_INDEX_KEYS))
+
+    @staticmethod
+    def _replace_taakvelden(data: pd.DataFrame) -> pd.DataFrame:
+        if not data.empty:
+            # Replace long taakveld names, as filter_data does
+            data = data.assign(Taakveld=data['Taakveld'].astype(str).replace(TAAKVELD_REPLACEMENTS))
+        return data
+
+    @classmethod
+    def open(cls, path: Path | str = VERSCHIL_FILE) -> "VerschilCube":
+        return cls.mapped(DatasetHandle.open(path))
+
+    @classmethod
+    def mapped(cls, handle: DatasetHandle) -> "VerschilCube":
+        """The Verschil dataset at `handle`, memory-mapped (see DatasetHandle.load_index)."""
+        return cls(handle.load_index("index", VERSCHIL_INDEX_KEYS, cls._replace_taakvelden))
+
+    @classmethod
+    def from_cube(cls, cube: DataCube) -> "VerschilCube":
+        """
+        The Verschil dataset computed from the dataset cube instead of loaded.
+
+        Gives the rows of Brondata_script/verschil.py (verschil_cube), with
+        the same rules, as array operations on the Jaarrekening and
+        Begroting halves of the cube.
+        """
+        if not cube.any():
+            return cls.from_frame(pd.DataFrame(columns=VERSCHIL_INDEX_KEYS))
+        axes = [axis for axis in cube.axes if axis != 'Document']
+        order = [axes.index(axis) for axis in VERSCHIL_KEYS]
+        halves = [cube.take(Document=document) for document in (JAARREKENING, BEGROTING)]
+        waarde_jr, waarde_bg = (half.array.squeeze(cube.axes.index('Document')).transpose(order)
+                                for half in halves)
+
+        rekening, begroting = ~np.isnan(waarde_jr), ~np.isnan(waarde_bg)
+        waarde_jr, waarde_bg = np.nan_to_num(waarde_jr), np.nan_to_num(waarde_bg)
+        verschil = (waarde_jr - waarde_bg).astype(int)
+
+        # Leave out jaren with empty values
+        tonen = (
+            ((verschil != waarde_bg) & (waarde_bg != 0))
+            | ((verschil != -waarde_jr) & (waarde_jr != 0))
+            | ((waarde_jr == 0) & (waarde_bg == 0))
+        )
+
+        keep = rekening | begroting
+        data = pd.DataFrame({
+            axis: pd.Categorical.from_codes(codes[keep], categories=cube.coords[axis])
+            for axis, codes in zip(VERSCHIL_KEYS, np.indices(keep.shape))
+        })
+        data['Verschil'] = verschil[keep]
+        data['Rekening'] = rekening[keep]
+        data['Begroting'] = begroting[keep]
+        data['Tonen'] = tonen[keep]
+        return cls.from_frame(data)
+
+
+def check_selection(dataset, gemeente, stand, jaarmin=None, jaarmax=None, vergelijking=None):
+    """
+    Validate a selection against the dataset and return its jaren.
+
+    Args:
+        dataset: BegrotingRekening
+        gemeente: Name of the gemeente
+        stand: "Totaal" or "Per inwoner"
+        jaarmin: Minimum year (optional, default: first year in the data)
+        jaarmax: Maximum year (optional, default: last year in the data)
+        vergelijking: Comparison entity name (optional)
+
+    Returns:
+        tuple: Selected jaren as strings
+
+    Raises:
+        SelectionError: If the gemeente, stand or vergelijking is not in the data
+    """
+    cube = dataset.cube
+
+    # Validate input data
+    if dataset.size == 0:
+        raise SelectionError("No data available for filtering.")
+
+    # Validate gemeente exists in data
+    if gemeente not in cube:
+        raise SelectionError(f"Gemeente '{gemeente}' not found in data.")
+
+    # Validate stand exists in data
+    if stand not in dataset.stands:
+        raise SelectionError(f"Stand '{stand}' not found in data.")
+
+    # Validate vergelijking exists
+    if vergelijking and vergelijking not in cube:
+        raise SelectionError(f"Comparison entity '{vergelijking}' not found in data.")
+
+    # Get year range from data if not provided
+    if jaarmin is None or jaarmax is None:
+        jaar_min, jaar_max = dataset.year_range
+        if jaar_min is None or jaar_max is None:
+            raise SelectionError("Could not determine year range.")
+        if jaarmin is None:
+            jaarmin = jaar_min
+        if jaarmax is None:
+            jaarmax = jaar_max
+
+    # Tuple of jaren (saved as category)
+    return tuple([str(i) for i in range(jaarmin, jaarmax + 1)])
+
+
+def filter_data(dataset, gemeente, stand, jaarmin=None, jaarmax=None, vergelijking=None):
+    """
+    Filter data based on gemeente, stand, year range, and optional comparison.
+
+    The rows are taken from the dataset cube, so the cost depends only on
+    the selection. They are ordered by gemeente, jaar, document, categorie
+    and taakveld.
+
+    Args:
+        dataset: BegrotingRekening
+        gemeente: Name of the gemeente to filter by
+        stand: "Totaal" or "Per inwoner"
+        jaarmin: Minimum year (optional)
+        jaarmax: Maximum year (optional)
+        vergelijking: Comparison entity name (optional)
+
+    Returns:
+        pd.DataFrame: Filtered data
+
+    Raises:
+        SelectionError: If the selection is not in the data (see check_selection)
+    """
+    jaar_range = check_selection(dataset, gemeente, stand, jaarmin, jaarmax, vergelijking)
+    gemeenten = (gemeente, vergelijking) if vergelijking else gemeente
+    return dataset.rows(dataset.cube.take(Gemeenten=gemeenten, Stand=stand, Jaar=jaar_range))
+
+
+def calculate_saldo(dataset, gemeente, stand):
+    """
+    Calculate saldo (balance) grouped by year and document type.
+
+    The Saldo cells of the selection are summed over the taakveld axis of
+    the dataset cube. Sums are in taakveld order, so they can differ from a
+    sum in row order in the last bits.
+
+    Args:
+        dataset: BegrotingRekening
+        gemeente: Name of the gemeente (or comparison entity)
+        stand: "Totaal" or "Per inwoner"
+
+    Returns:
+        pd.DataFrame: Saldo values per year and document
+    """
+    jaar_range = check_selection(dataset, gemeente, stand)
+    cube = dataset.cube.take(Gemeenten=gemeente, Stand=stand, Jaar=jaar_range)
+    if not cube.any():
+        return pd.DataFrame()
+
+    # Every (Jaar, Document) of the dataset, 0 without Saldo cells
+    saldo = dataset.cube.take(Gemeenten=gemeente, Stand=stand, Categorie='Saldo').sum(
+        'Gemeenten', 'Stand', 'Categorie', 'Taakveld').to_frame(dropna=False)
+    saldo['Waarde'] = saldo['Waarde'].fillna(0)
+
+    saldo = saldo[(saldo['Waarde'] != 0)]
+
+    return saldo
+
+
+def calculate_begroting_rekening(dataset, gemeente, stand, baten_lasten, jaar):
+    """
+    Filter data for specific category (baten/lasten) and year.
+
+    Args:
+        dataset: BegrotingRekening
+        gemeente: Name of the gemeente
+        stand: "Totaal" or "Per inwoner"
+        baten_lasten: Category name ("Baten" or "Lasten")
+        jaar: Year as string or int
+
+    Returns:
+        pd.DataFrame: Filtered data
+    """
+    jaar_range = check_selection(dataset, gemeente, stand)
+    cube = dataset.cube.take(Gemeenten=gemeente, Stand=stand, Jaar=jaar_range)
+    if not cube.any():
+        return pd.DataFrame()
+
+    br_data = dataset.rows(cube.take(Categorie=baten_lasten, Jaar=str(jaar)))
+
+    return br_data
+
+
+def create_tables(dataset, verschil, categorie, gemeente, stand, jaarmin, jaarmax, vergelijking=None,
+                  warn: Callable[[str], None] | None = None):
+    """
+    Create comparison tables grouped by taakveld categories.
+
+    The differences are sliced from the precomputed Verschil dataset; only
+    the selected rows are pivoted. Taakvelden missing from the data are left
+    out of their group, with a message to `warn`.
+
+    Args:
+        dataset: BegrotingRekening
+        verschil: VerschilCube
+        categorie: Category to analyze ("Baten", "Lasten", or "Saldo")
+        gemeente: Name of the gemeente
+        stand: "Totaal" or "Per inwoner"
+        jaarmin: Minimum year
+        jaarmax: Maximum year
+        vergelijking: Comparison entity name (optional)
+        warn: Called with a message for incomplete tables (default: a QueryWarning)
+
+    Returns:
+        tuple: (tables_dict, table_columns) where tables_dict contains grouped tables
+
+    Raises:
+        SelectionError: If the selection is not in the data or has no data for `categorie`
+    """
+    jaar_range = check_selection(dataset, gemeente, stand, jaarmin, jaarmax, vergelijking)
+    warn = warn or default_warn
+
+    index = verschil.index
+    selection = dict(Gemeenten=(gemeente, vergelijking) if vergelijking else gemeente,
+                     Stand=stand, Jaar=jaar_range)
+    categorieen = index.values('Categorie', **selection)
+    if not categorieen:
+        return {}, []
+
+    # Filter data
+    df = index.rows(Categorie=categorie, **selection)
+
+    if df.empty:
+        raise SelectionError(f"No data found for category '{categorie}'.")
+
+    # Check Gemeenten in dataframe
+    gemeenten = df['Gemeenten'].astype(str).unique().tolist()
+    jaren = df['Jaar'].astype(str).unique().tolist()
+
+    if len(gemeenten) == 1:
+        # Calculate table
+        table = calculate_difference(df)
+    elif len(gemeenten) == 2:
+        vergelijking = gemeenten[1] if gemeenten[0] == gemeente else gemeenten[0]
+        table_headers = [gemeente, vergelijking]
+        table_suffixes = [
+            "                                                            {}".format(gemeente),
+            "                                                            {}".format(vergelijking)
+        ]
+
+        tables = []
+        for g in table_headers:
+            dfg = df.loc[(df['Gemeenten'] == g)]
+            tables.append(calculate_difference(dfg))
+
+        table = pd.merge(tables[0],
+                         tables[1],
+                         on=['Taakveld'],
+                         suffixes=(table_suffixes))
+
+        table = table.fillna(0)
+        table = table.astype(int)
+
+        # add in blank column for readability
+        column_position = len(jaren)
+        table.insert(column_position, ' ', "")
+    else:
+        raise SelectionError("Unexpected number of gemeenten in data.")
+
+    # Create grouped tables using constants
+    tables = {}
+    for group_name, taakvelden in TAVELD_GROUPS.items():
+        try:
+            group_table = table.loc[taakvelden]
+            tables[group_name] = group_table
+        except KeyError:
+            # Some taakvelden might not exist in the data
+            missing = [tv for tv in taakvelden if tv not in table.index]
+            if missing:
+                warn(f"Some taakvelden not found for {group_name}: {', '.join(missing)}")
+            # Try to get available taakvelden
+            available = [tv for tv in taakvelden if tv in table.index]
+            if available:
+                tables[group_name] = table.loc[available]
+
+    return tables, table.columns
+
+
+def calculate_difference(df):
+    """
+    Table of the differences between jaarrekening and begroting values.
+
+    Args:
+        df: Rows of the Verschil dataset for one gemeente, stand and categorie
+
+    Returns:
+        pd.DataFrame: Pivoted DataFrame with differences per taakveld and year
+
+    Raises:
+        ValueError: If required columns are missing
+    """
+    if df.empty:
+        return pd.DataFrame()
+
+    required_cols = ['Jaar', 'Taakveld', 'Verschil', 'Rekening', 'Begroting', 'Tonen']
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing required columns: {missing_cols}")
+
+    # Both a jaarrekening and a begroting are needed
+    if not df['Rekening'].any() or not df['Begroting'].any():
+        return pd.DataFrame()
+
+    # Remove Jaren with empty values
+    df = df.loc[df['Tonen']]
+
+    if df.empty:
+        return pd.DataFrame()
+
+    # Pivot table and change column headers
+    pv = df.pivot(index='Taakveld', columns='Jaar', values='Verschil')
+
+    if isinstance(pv.columns, pd.MultiIndex):
+        pv.columns = pv.columns.droplevel(0)
+
+    return pv
+
+
+def validate_data_quality(data: pd.DataFrame) -> dict:
+    """
+    Check data quality and return report.
+
+    Args:
+        data: DataFrame to validate
+
+    Returns:
+        dict: Quality report with statistics
+    """
+    if data.empty:
+        return {'status': 'empty', 'message': 'Data is empty'}
+
+    report = {
+        'total_rows': len(data),
+        'missing_values': data.isnull().sum().to_dict(),
+        'duplicate_rows': data.duplicated().sum(),
+        'year_range': (data['Jaar'].astype(str).min(), data['Jaar'].astype(str).max()) if 'Jaar' in data.columns else None,
+        'gemeenten_count': data['Gemeenten'].nunique() if 'Gemeenten' in data.columns else 0
+    }
+    return report
+
+
+class BegrotingRekeningQueries(CachedQueries):
+    """
+    The queries of the main page on one dataset and Verschil dataset, cached.
+
+    Every method returns a QueryResult; its value is the result of the
+    function of the same name above, or an empty result if the selection
+    is rejected. Results are shared by all callers: do not modify them.
+    """
+
+    def __init__(self, dataset: BegrotingRekening, verschil: VerschilCube, cache_size: int = 256):
+        super().__init__(cache_size)
+        self.dataset = dataset
+        self.verschil = verschil
+
+    @classmethod
+    def open(cls, path: Path | str = DATA_FILE, verschil_path: Path | str = VERSCHIL_FILE,
+             cache_size: int = 256) -> "BegrotingRekeningQueries":
+        """
+        Queries on the datasets at `path` and `verschil_path`; without a
+        Verschil dataset, it is computed from the dataset (VerschilCube.from_cube).
+        """
+        dataset = BegrotingRekening.open(path)
+        verschil_handle = DatasetHandle.open(verschil_path)
+        if verschil_handle.version:
+            verschil = VerschilCube.mapped(verschil_handle)
+        else:
+            verschil = VerschilCube.from_cube(dataset.cube)
+        return cls(dataset, verschil, cache_size)
+
+    @property
+    def index(self) -> DataCube:
+        return self.dataset.index
+
+    @property
+    def year_range(self) -> tuple:
+        return self.dataset.year_range
+
+    def filter_data(self, gemeente, stand, jaarmin=None, jaarmax=None, vergelijking=None) -> QueryResult:
+        return self._query(filter_data, (gemeente, stand, jaarmin, jaarmax, vergelijking),
+                           self.dataset, gemeente, stand, jaarmin, jaarmax, vergelijking,
+                           default=pd.DataFrame)
+
+    def calculate_saldo(self, gemeente, stand) -> QueryResult:
+        return self._query(calculate_saldo, (gemeente, stand),
+                           self.dataset, gemeente, stand, default=pd.DataFrame)
+
+    def calculate_begroting_rekening(self, gemeente, stand, baten_lasten, jaar) -> QueryResult:
+        return self._query(calculate_begroting_rekening, (gemeente, stand, baten_lasten, jaar),
+                           self.dataset, gemeente, stand, baten_lasten, jaar, default=pd.DataFrame)
+
+    def create_tables(self, categorie, gemeente, stand, jaarmin, jaarmax, vergelijking=None) -> QueryResult:
+        return self._query(create_tables, (categorie, gemeente, stand, jaarmin, jaarmax, vergelijking),
+                           self.dataset, self.verschil, categorie, gemeente, stand, jaarmin, jaarmax,
+                           vergelijking, default=lambda: ({}, []), warns=True)
+
+    def data_quality(self) -> QueryResult:
+        return QueryResult(self.dataset.quality)
@@ -0,0 +1,87 @@
+"""
+Bounded LRU cache of query results, with hit/miss statistics.
+
+Replaces `st.cache_data` for the queries: it works without a Streamlit
+session, and `info()` tells how well it does. Results are kept as they
+are (not copied), so callers must not modify them.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+
+class LRUCache:
+    """
+    The last `maxsize` results, by key; the least recently used is dropped first.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._results: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """The cached result for `key`, or `default` (counted as a miss)."""
+        with self._lock:
+            if key in self._results:
+                self._hits += 1
+                self._results.move_to_end(key)
+                return self._results[key]
+            self._misses += 1
+            return default
+
+    def put(self, key: Hashable, result: Any) -> None:
+        """Cache `result` under `key`, dropping the least recently used results beyond maxsize."""
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        The cached result for `key`, or the result of `compute()`, which is then cached.
+
+        `compute` runs outside the lock, so two threads missing the same key
+        at once both compute it; the last result is kept.
+        """
+        with self._lock:
+            if key in self._results:
+                self._hits += 1
+                self._results.move_to_end(key)
+                return self._results[key]
+            self._misses += 1
+
+        result = compute()
+        self.put(key, result)
+        return result
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self._results))
+
+    def clear(self) -> None:
+        """Drop all results and reset the statistics."""
+        with self._lock:
+            self._results.clear()
+            self._hits = self._misses = 0
@@ -0,0 +1,122 @@
+"""
+Altair charts of the main page's query results (see begroting_rekening.py).
+
+Plain chart specs without Streamlit: the page shows them with
+`st.altair_chart`, `batch_reports.py` saves them as PNG with vl_convert.
+"""
+
+import altair as alt
+import vl_convert as vlc
+
+
+def show_saldo(saldo, stand, legend=True):
+    """
+    Create an Altair line chart showing saldo over time.
+
+    Args:
+        saldo: DataFrame with saldo data
+        stand: "Per inwoner" or "Totaal" to determine axis title
+        legend: Whether to show legend
+
+    Returns:
+        alt.Chart: Configured Altair chart
+    """
+    if saldo.empty:
+        return None
+
+    if stand == "Per inwoner":
+        axis_title = "€ 1"
+    else:
+        axis_title = "€ 1.000"
+
+    if legend:
+        chart = alt.Chart(saldo).mark_line(point=True).encode(
+            x=alt.X('Jaar:O'),
+            y=alt.Y('Waarde:Q', title=axis_title),
+            color='Document:N',
+            tooltip=['Jaar', 'Waarde:Q', 'Document']
+        ).configure_legend(title=None).properties(
+            usermeta={
+                "embedOptions": {
+                    "formatLocale": vlc.get_format_locale("nl-NL"),
+                }
+            }
+        ).interactive()
+    else:
+        chart = alt.Chart(saldo).mark_line(point=True).encode(
+            x=alt.X('Jaar:O'),
+            y=alt.Y('Waarde:Q', title=axis_title),
+            color=alt.Color('Document:N', legend=None),
+            tooltip=['Jaar', 'Waarde:Q', 'Document']
+        ).interactive()
+
+    return chart
+
+
+def show_saldo_legend(saldo):
+    """
+    Create a legend-only chart for saldo.
+
+    Args:
+        saldo: DataFrame with saldo data
+
+    Returns:
+        alt.Chart: Legend chart
+    """
+    if saldo.empty:
+        return None
+
+    chart = alt.Chart(saldo, height=25).mark_line().encode(
+        color=alt.Color('Document:N')
+    ).configure_view(
+        clip=False
+    ).configure_legend(title=None, orient="top")
+
+    return chart
+
+
+def show_begroting_rekening(br_data, stand):
+    """
+    Create a bar chart comparing begroting vs jaarrekening per taakveld.
+
+    Args:
+        br_data: DataFrame with begroting/rekening data
+        stand: "Per inwoner" or "Totaal" to determine axis title
+
+    Returns:
+        alt.Chart: Configured Altair chart
+    """
+    if br_data.empty:
+        return None
+
+    if stand == "Per inwoner":
+        axis_title = "€ 1"
+    else:
+        axis_title = "€ 1.000"
+
+    br_chart = alt.Chart(br_data).mark_bar().encode(
+        y=alt.Y('Document:N',
+                title='',
+                axis=alt.Axis(labels=False, ticks=False)
+                ),
+        x=alt.X('Waarde:Q', title=axis_title),
+        color='Document:N',
+        tooltip=['Taakveld', 'Document', 'Waarde:Q'],
+        row=alt.Row(
+            'Taakveld:N',
+            sort=alt.EncodingSortField(field="Waarde", order='descending'),
+            spacing=5,
+            header=alt.Header(
+                labelAngle=0,
+                labelAlign='left',
+                title=None,
+                labelFontSize=15,
+                labelPadding=15
+            )
+        )
+    ).configure_axis(labelFontSize=15).configure_header(
+        title=None
+    ).configure_legend(title=None).interactive()
+
+    return br_chart
+
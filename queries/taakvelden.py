@@ -0,0 +1,445 @@
+"""
+Queries behind `pages/1_📊_Gemeenten_per_taakveld_vergelijken.py`, without Streamlit.
+
+Baten, lasten and saldi of gemeenten per hoofdtaakveld and per taakveld,
+from the begroting_rekening_per_taakveld dataset. As in
+begroting_rekening.py, a rejected selection raises SelectionError, and
+`TaakveldQueries` runs the queries through an LRU cache and returns
+QueryResults (see base.py).
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from Brondata_script.taakveld_rollups import (
+    HOOFDTAAKVELD,
+    HOOFDTAAKVELDEN,
+    SUBTAAKVELDEN,
+    TAAKVELD,
+    cell_waarden,
+    group_matrix,
+)
+from data_access import DatasetHandle, DatasetIndex
+from queries.base import CachedQueries, QueryResult, SelectionError
+from queries.cache import CacheInfo, LRUCache
+
+DATA_FILE = "begroting_rekening_per_taakveld"  # Parquet dataset directory, see Brondata_script/dataset_store.py
+INDEX_KEYS = ['Gemeenten', 'Jaar', 'Document', 'Categorie']  # Exact-match lookup keys, see data_access.py
+REQUIRED_COLUMNS = ['Gemeenten', 'Jaar', 'Document', 'Categorie', 'Taakveld', 'Waarde', 'Inwonertal']
+ROLLUP_FILE = "begroting_rekening_per_taakveld_rollups"  # Build-time values, see Brondata_script/taakveld_rollups.py
+ROLLUP_INDEX_KEYS = ['Gemeenten', 'Jaar', 'Document', 'Categorie', 'Niveau']
+MAX_CHART_GEMEENTEN = 4  # Compared gemeenten drawn as separate bars; more are summarized, see summarize_peers
+
+taakvelden_dict = HOOFDTAAKVELDEN
+subtaakvelden = SUBTAAKVELDEN
+
+
+class TaakveldData:
+    """
+    The begroting_rekening_per_taakveld dataset, indexed on (Gemeenten, Jaar, Document, Categorie).
+    """
+
+    def __init__(self, index: DatasetIndex, gemeente_options: list):
+        self.index = index
+        # In order of first appearance in the dataset
+        self.gemeente_options = gemeente_options
+
+    @staticmethod
+    def _checked(data: pd.DataFrame) -> pd.DataFrame:
+        missing = [col for col in REQUIRED_COLUMNS if col not in data.columns]
+        if missing:
+            raise ValueError(f"Missing required columns in data: {missing}")
+        return data
+
+    @staticmethod
+    def _describe(data: pd.DataFrame) -> dict:
+        return {"gemeente_options": list(data.Gemeenten.unique())}
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> "TaakveldData":
+        data = cls._checked(data)
+        return cls(DatasetIndex(data, INDEX_KEYS), cls._describe(data)["gemeente_options"])
+
+    @classmethod
+    def open(cls, path: Path | str = DATA_FILE) -> "TaakveldData":
+        return cls.mapped(DatasetHandle.open(path))
+
+    @classmethod
+    def mapped(cls, handle: DatasetHandle) -> "TaakveldData":
+        """The dataset at `handle`, memory-mapped (see DatasetHandle.load_index)."""
+        index = handle.load_index("index", INDEX_KEYS, cls._checked, cls._describe)
+        return cls(index, index.metadata["gemeente_options"])
+
+
+class TaakveldRollups:
+    """
+    The precomputed hoofdtaakveld and taakveld values, indexed on (Gemeenten, Jaar, Document, Categorie, Niveau).
+    """
+
+    def __init__(self, index: DatasetIndex):
+        self.index = index
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> "TaakveldRollups":
+        return cls(DatasetIndex(data, ROLLUP_INDEX_KEYS))
+
+    @classmethod
+    def open(cls, path: Path | str = ROLLUP_FILE) -> "TaakveldRollups":
+        return cls.mapped(DatasetHandle.open(path))
+
+    @classmethod
+    def mapped(cls, handle: DatasetHandle) -> "TaakveldRollups":
+        """The rollups at `handle`, memory-mapped (see DatasetHandle.load_index)."""
+        return cls(handle.load_index("index", ROLLUP_INDEX_KEYS))
+
+
+def check_jaren(dataset, gemeenten):
+    """Check available years for given gemeenten.
+
+    Args:
+        dataset: TaakveldData
+        gemeenten: Single gemeente name (str) or tuple of gemeente names
+
+    Returns:
+        List of available years (empty if no data)
+    """
+    if len(dataset.index) == 0:
+        return []
+    return dataset.index.values('Jaar', Gemeenten=gemeenten)
+
+
+def check_document(dataset, gemeenten, selected_jaar):
+    """Check available documents for given gemeenten and year.
+
+    Args:
+        dataset: TaakveldData
+        gemeenten: Single gemeente name (str) or tuple of gemeente names
+        selected_jaar: Selected year (int)
+
+    Returns:
+        Tuple of available document types
+    """
+    if len(dataset.index) == 0:
+        return tuple()
+    return tuple(dataset.index.values('Document', Gemeenten=gemeenten, Jaar=selected_jaar))
+
+
+def filter_data(dataset, jaar, gemeenten, document, categorie):
+    """Filter data by year, gemeenten, document, and category.
+
+    Gemeenten are matched exactly (a province "Groningen" does not select
+    "Groningen (gemeente)"), through the index instead of masking all rows.
+
+    Args:
+        dataset: TaakveldData
+        jaar: Year (int)
+        gemeenten: Single gemeente name (str) or tuple of gemeente names
+        document: Document type (str)
+        categorie: Category (str)
+
+    Returns:
+        Filtered DataFrame
+
+    Raises:
+        SelectionError: If gemeenten is not a str or tuple
+    """
+    if len(dataset.index) == 0:
+        return pd.DataFrame()
+
+    # Normalize gemeenten to tuple for consistent handling
+    if isinstance(gemeenten, str):
+        gemeenten_pattern = (gemeenten,)
+    elif isinstance(gemeenten, tuple):
+        gemeenten_pattern = gemeenten
+    else:
+        raise SelectionError(f"Unexpected type for gemeenten: {type(gemeenten)}")
+
+    return dataset.index.rows(Gemeenten=gemeenten_pattern, Jaar=jaar,
+                              Document=document, Categorie=categorie)
+
+
+def prep_hoofdtaakvelden(data, per_inwoner=False):
+    """Prepare data for hoofdtaakvelden chart.
+
+    Every row is mapped to its hoofdtaakveld(en) at once through a taakveld x
+    hoofdtaakveld matrix, and all (gemeente, hoofdtaakveld) values are
+    computed together with cell_waarden (see Brondata_script/taakveld_rollups.py).
+
+    Args:
+        data: Filtered DataFrame with gemeente data
+        per_inwoner: If True, calculate values per inhabitant, else use totals
+
+    Returns:
+        DataFrame with columns: Gemeente, Hoofdtaakveld, Waarde
+    """
+    columns = ["Gemeente", "Hoofdtaakveld", "Waarde"]
+    gemeente_codes, gemeenten = pd.factorize(data['Gemeenten'])
+    taakveld_codes, taakvelden = pd.factorize(data['Taakveld'])
+    if len(gemeenten) == 0:
+        return pd.DataFrame([], columns=columns)
+
+    groups = list(taakvelden_dict)
+    matrix = group_matrix(tuple(taakvelden), tuple(taakvelden_dict.values()))
+    valid = (gemeente_codes >= 0) & (taakveld_codes >= 0)
+    rows, group = np.nonzero(matrix[taakveld_codes] & valid[:, None])
+    cells = gemeente_codes[rows] * len(groups) + group
+
+    return pd.DataFrame({
+        "Gemeente": np.repeat(np.asarray(gemeenten, dtype=object), len(groups)),
+        "Hoofdtaakveld": np.tile(np.asarray(groups, dtype=object), len(gemeenten)),
+        "Waarde": cell_waarden(data, rows, cells, len(gemeenten) * len(groups), per_inwoner),
+    }, columns=columns)
+
+
+def prep_subtaakvelden(data, htv=None, per_inwoner=False):
+    """Prepare data for subtaakvelden chart.
+
+    All (taakveld, gemeente) values are computed together with cell_waarden.
+
+    Args:
+        data: Filtered DataFrame with gemeente data
+        htv: Optional hoofdtaakveld to filter by
+        per_inwoner: If True, calculate values per inhabitant, else use totals
+
+    Returns:
+        DataFrame with columns: Gemeente, Taakveld, Waarde
+    """
+    columns = ["Gemeente", "Taakveld", "Waarde"]
+    gemeente_codes, gemeenten = pd.factorize(data['Gemeenten'])
+    taakveld_codes, taakvelden = pd.factorize(data['Taakveld'])
+
+    # Taakvelden in order of appearance, only those of htv if given
+    if htv:
+        keep = group_matrix(tuple(taakvelden), (subtaakvelden[htv],))[:, 0]
+    else:
+        keep = np.ones(len(taakvelden), dtype=bool)
+    kept = np.flatnonzero(keep)
+    if len(gemeenten) == 0 or len(kept) == 0:
+        return pd.DataFrame([], columns=columns)
+
+    position = np.full(len(taakvelden), -1)
+    position[kept] = np.arange(len(kept))
+    valid = (gemeente_codes >= 0) & (taakveld_codes >= 0)
+    taakveld_position = np.where(valid, position[taakveld_codes], -1)
+    rows = np.flatnonzero(taakveld_position >= 0)
+    cells = taakveld_position[rows] * len(gemeenten) + gemeente_codes[rows]
+
+    return pd.DataFrame({
+        "Gemeente": np.tile(np.asarray(gemeenten, dtype=object), len(kept)),
+        "Taakveld": np.repeat(np.asarray(taakvelden, dtype=object)[kept], len(gemeenten)),
+        "Waarde": cell_waarden(data, rows, cells, len(kept) * len(gemeenten), per_inwoner),
+    }, columns=columns)
+
+
+def _rollup_table(rows, item, per_inwoner):
+    """Rollup rows as a Gemeente, item, Waarde table."""
+    return pd.DataFrame({
+        "Gemeente": rows['Gemeenten'].to_numpy(dtype=object),
+        item: rows['Taakveld'].to_numpy(dtype=object),
+        "Waarde": rows['Per inwoner' if per_inwoner else 'Totaal'].to_numpy(),
+    }, columns=["Gemeente", item, "Waarde"])
+
+
+def rollup_hoofdtaakvelden(rollups, jaar, gemeenten, document, categorie, per_inwoner=False):
+    """prep_hoofdtaakvelden of the rows selected by filter_data, sliced from the build-time rollups (TaakveldRollups)."""
+    rows = rollups.index.rows(Gemeenten=selected_gemeenten(gemeenten), Jaar=jaar, Document=document,
+                              Categorie=categorie, Niveau=HOOFDTAAKVELD)
+    return _rollup_table(rows, "Hoofdtaakveld", per_inwoner)
+
+
+def rollup_subtaakvelden(rollups, jaar, gemeenten, document, categorie, htv=None, per_inwoner=False):
+    """prep_subtaakvelden per gemeente (only its taakvelden) of the rows selected by filter_data, from the rollups."""
+    rows = rollups.index.rows(Gemeenten=selected_gemeenten(gemeenten), Jaar=jaar, Document=document,
+                              Categorie=categorie, Niveau=TAAKVELD)
+    if htv:
+        rows = rows[rows['Hoofdtaakveld'] == htv]
+    return _rollup_table(rows, "Taakveld", per_inwoner)
+
+
+def selected_gemeenten(gemeenten):
+    """The gemeenten of a selection as a tuple, each once, in order.
+
+    Args:
+        gemeenten: Single gemeente name (str) or tuple of gemeente names
+
+    Returns:
+        Tuple of gemeente names
+
+    Raises:
+        SelectionError: If gemeenten is not a str or tuple
+    """
+    if isinstance(gemeenten, str):
+        return (gemeenten,)
+    if isinstance(gemeenten, tuple):
+        return tuple(dict.fromkeys(gemeenten))
+    raise SelectionError(f"Unexpected type for gemeenten: {type(gemeenten)}")
+
+
+def combine_gemeenten(parts, item):
+    """Combine the results of single gemeenten into the result for all of them.
+
+    Every gemeente gets every item of the others, with Waarde 0 where it
+    has no data for it, as prep_hoofdtaakvelden and prep_subtaakvelden do
+    for several gemeenten at once.
+
+    Args:
+        parts: Dict of gemeente name to (items, waarden) arrays, in order
+        item: Name of the item column (Hoofdtaakveld or Taakveld)
+
+    Returns:
+        DataFrame with columns Gemeente, item, Waarde, ordered by gemeente
+    """
+    columns = ["Gemeente", item, "Waarde"]
+    parts = {gemeente: part for gemeente, part in parts.items() if len(part[0]) > 0}
+    if not parts:
+        return pd.DataFrame([], columns=columns)
+
+    items = [part[0] for part in parts.values()]
+    combined = pd.DataFrame({
+        "Gemeente": np.repeat(np.array(list(parts), dtype=object), [len(part) for part in items]),
+        item: np.concatenate(items),
+        "Waarde": np.concatenate([part[1] for part in parts.values()]),
+    }, columns=columns)
+    all_items = pd.unique(combined[item])
+    if len(combined) == len(parts) * len(all_items):
+        return combined
+
+    grid = pd.MultiIndex.from_product([list(parts), all_items], names=["Gemeente", item])
+    return combined.set_index(["Gemeente", item]).reindex(grid, fill_value=0).reset_index()
+
+
+def summarize_peers(table, item, peers, label):
+    """Chart data with a group of compared gemeenten as one summary per item.
+
+    With many gemeenten a grouped bar chart gets unreadable and its data
+    large, so the peers are reduced here instead of in the browser: per
+    item their median as Waarde and their range as Min and Max.
+
+    Args:
+        table: DataFrame with columns Gemeente, item, Waarde
+        item: Name of the item column (Hoofdtaakveld or Taakveld)
+        peers: Gemeenten to summarize; the other gemeenten are kept as they are
+        label: Gemeente name of the summary rows
+
+    Returns:
+        DataFrame with columns Gemeente, item, Waarde, Min, Max (Min and Max
+        only set on the summary rows)
+    """
+    is_peer = table['Gemeente'].isin(peers)
+    summary = (table[is_peer].groupby(item, sort=False)['Waarde']
+               .agg(Waarde='median', Min='min', Max='max')
+               .reset_index())
+    summary.insert(0, "Gemeente", label)
+    return pd.concat([table[~is_peer], summary], ignore_index=True)[["Gemeente", item, "Waarde", "Min", "Max"]]
+
+
+class TaakveldQueries(CachedQueries):
+    """
+    The queries of page 1 on one dataset, cached.
+
+    Hoofdtaakvelden and subtaakvelden are sliced from the build-time
+    rollups if given, else computed from the taakveld rows. They are split
+    per gemeente, and those partial results are cached separately
+    (`partial_cache_size` of them), so a selection of many gemeenten costs
+    one lookup per gemeente that is new to the cache.
+
+    Every method returns a QueryResult; results are shared by all callers:
+    do not modify them.
+    """
+
+    def __init__(self, dataset: TaakveldData, rollups: TaakveldRollups | None = None, cache_size: int = 256,
+                 partial_cache_size: int = 4096):
+        super().__init__(cache_size)
+        self.dataset = dataset
+        self.rollups = rollups
+        self.partials = LRUCache(partial_cache_size)
+
+    @classmethod
+    def open(cls, path: Path | str = DATA_FILE, rollup_path: Path | str | None = None, cache_size: int = 256,
+             partial_cache_size: int = 4096) -> "TaakveldQueries":
+        rollups = TaakveldRollups.open(rollup_path) if rollup_path is not None else None
+        return cls(TaakveldData.open(path), rollups, cache_size, partial_cache_size)
+
+    @property
+    def gemeente_options(self) -> list:
+        return self.dataset.gemeente_options
+
+    def partial_cache_info(self) -> CacheInfo:
+        """Hits, misses and size of the cache of per-gemeente results."""
+        return self.partials.info()
+
+    def _gemeenten_table(self, item, jaar, gemeenten, document, categorie, *options):
+        """
+        Hoofdtaakvelden or subtaakvelden of several gemeenten, with only the taakvelden each has rows for.
+        """
+        if self.rollups is not None:
+            rollup = rollup_hoofdtaakvelden if item == "Hoofdtaakveld" else rollup_subtaakvelden
+            return rollup(self.rollups, jaar, gemeenten, document, categorie, *options)
+
+        data = filter_data(self.dataset, jaar, gemeenten, document, categorie)
+        if len(data) == 0:
+            return pd.DataFrame([], columns=["Gemeente", item, "Waarde"])
+        if item == "Hoofdtaakveld":
+            return prep_hoofdtaakvelden(data, *options)
+
+        table = prep_subtaakvelden(data, *options)
+        if len(table) == 0:
+            return table
+        has_rows = pd.MultiIndex.from_arrays([table['Gemeente'], table['Taakveld']]).isin(
+            pd.MultiIndex.from_arrays([data['Gemeenten'].astype(object), data['Taakveld'].astype(object)]))
+        return table[has_rows]
+
+    def _per_gemeente(self, item, jaar, gemeenten, document, categorie, *options):
+        """
+        `_gemeenten_table` of each selected gemeente as (items, waarden) arrays, each cached.
+
+        The gemeenten missing from the cache are looked up together, and the
+        result is split per gemeente.
+        """
+        keys = {gemeente: (item, jaar, gemeente, document, categorie) + options
+                for gemeente in selected_gemeenten(gemeenten)}
+        parts = {gemeente: self.partials.get(key) for gemeente, key in keys.items()}
+        missing = tuple(gemeente for gemeente, part in parts.items() if part is None)
+        if not missing:
+            return parts
+
+        table = self._gemeenten_table(item, jaar, missing, document, categorie, *options)
+        positions = table.groupby("Gemeente", sort=False).indices if len(table) > 0 else {}
+        items, waarden = table[item].to_numpy(), table['Waarde'].to_numpy()
+        for gemeente in missing:
+            rows = positions.get(gemeente, np.array([], dtype=np.intp))
+            parts[gemeente] = (items[rows], waarden[rows])
+            self.partials.put(keys[gemeente], parts[gemeente])
+        return parts
+
+    def _hoofdtaakvelden(self, jaar, gemeenten, document, categorie, per_inwoner):
+        parts = self._per_gemeente("Hoofdtaakveld", jaar, gemeenten, document, categorie, per_inwoner)
+        return combine_gemeenten(parts, "Hoofdtaakveld")
+
+    def _subtaakvelden(self, jaar, gemeenten, document, categorie, htv, per_inwoner):
+        parts = self._per_gemeente("Taakveld", jaar, gemeenten, document, categorie, htv, per_inwoner)
+        return combine_gemeenten(parts, "Taakveld")
+
+    def jaren(self, gemeenten) -> QueryResult:
+        return self._query(check_jaren, (gemeenten,), self.dataset, gemeenten, default=list)
+
+    def documenten(self, gemeenten, jaar) -> QueryResult:
+        return self._query(check_document, (gemeenten, jaar), self.dataset, gemeenten, jaar, default=tuple)
+
+    def filter_data(self, jaar, gemeenten, document, categorie) -> QueryResult:
+        return self._query(filter_data, (jaar, gemeenten, document, categorie),
+                           self.dataset, jaar, gemeenten, document, categorie, default=pd.DataFrame)
+
+    def hoofdtaakvelden(self, jaar, gemeenten, document, categorie, per_inwoner=False) -> QueryResult:
+        return self._query(self._hoofdtaakvelden, (jaar, gemeenten, document, categorie, per_inwoner),
+                           jaar, gemeenten, document, categorie, per_inwoner,
+                           default=lambda: pd.DataFrame(columns=["Gemeente", "Hoofdtaakveld", "Waarde"]))
+
+    def subtaakvelden(self, jaar, gemeenten, document, categorie, htv=None, per_inwoner=False) -> QueryResult:
+        return self._query(self._subtaakvelden, (jaar, gemeenten, document, categorie, htv, per_inwoner),
+                           jaar, gemeenten, document, categorie, htv, per_inwoner,
+                           default=lambda: pd.DataFrame(columns=["Gemeente", "Taakveld", "Waarde"]))
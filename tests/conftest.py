@@ -0,0 +1,12 @@
+"""
+The app modules and the Brondata_script package are imported from the
+repository root, so the tests put it on sys.path.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
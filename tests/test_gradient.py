@@ -0,0 +1,123 @@
+"""
+`gradient_map` against `calculate_gradient_map`, the per-cell computation it
+replaced; `gradient_colors` against `Styler.background_gradient`, which
+colours the tables; and `grouped_gradient_colors` against one table at a time.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gradient import ROOT_FACTOR, gradient_colors, gradient_map, grouped_gradient_colors
+
+JAREN = ["2019", "2020", "2021"]
+
+
+def calculate_gradient_map(x, categorie):
+    """Calculate gradient map values for table styling."""
+    if x.empty:
+        return x
+
+    x1 = x.map(lambda i: 0 if i == "" else i)
+
+    x_min = abs(x1.values.min())
+    x_max = abs(x1.values.max())
+
+    if x_min == 0 and x_max == 0:
+        return x1
+
+    if abs(x_min) > x_max:
+        # If minimum is higher than maximum, multiply by fraction max/min
+        x2 = x1.map(lambda i: i * (x_min / x_max) / x_min
+                    if i > 0 else i / x_min)
+    else:
+        # If maximum is higher: multiply by fraction min/max
+        x2 = x1.map(lambda i: i * (x_max / x_min) / x_max
+                    if i < 0 else i / x_max)
+
+    # Take root to raise lower values
+    x3 = x2.map(lambda i: i**ROOT_FACTOR if i >= 0 else -(abs(i)**ROOT_FACTOR))
+
+    if categorie == "Lasten":
+        x3 = x3.map(lambda i: -i)  # Reverse gradient map for lasten
+
+    return x3
+
+
+def verschil_table(kind: str) -> pd.DataFrame:
+    """A Verschil table (taakvelden x jaren) of the given kind."""
+    rng = np.random.default_rng(13)
+    values = rng.uniform(-800, 2500, (4, len(JAREN))).round()
+    if kind == "positive":
+        values = np.abs(values) + 1
+    elif kind == "negative":
+        values = -np.abs(values) - 1
+    elif kind == "zero":
+        values = np.zeros_like(values)
+    table = pd.DataFrame(values, index=["Veiligheid", "Onderwijs", "SCR", "Overhead"], columns=JAREN)
+    if kind == "nan":
+        table.iloc[1, 2] = np.nan
+    if kind == "separator":
+        # Two gemeenten side by side with a blank column, as in create_tables
+        right = table.add_suffix(" Baarn").mul(-0.5).round()
+        table = pd.concat([table.add_suffix(" Assen").astype(int), right.astype(int)], axis=1)
+        table.insert(len(JAREN), " ", "")
+    return table
+
+
+def styler_colors(table: pd.DataFrame, gmap: np.ndarray) -> np.ndarray:
+    """Background colours that Styler.background_gradient gives the table."""
+    styler = table.style.background_gradient(cmap="RdBu", gmap=gmap, axis=None)
+    styler._compute()
+    colors = np.empty(table.shape, dtype=object)
+    for (i, j), props in styler.ctx.items():
+        colors[i, j] = dict(props)["background-color"]
+    return colors
+
+
+KINDS = ["mixed", "positive", "negative", "zero", "nan", "separator"]
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("categorie", ["Baten", "Lasten", "Saldo"])
+def test_gradient_map(kind, categorie):
+    table = verschil_table(kind)
+    expected = calculate_gradient_map(table, categorie)
+    pd.testing.assert_frame_equal(pd.DataFrame(gradient_map(table.to_numpy(), categorie), index=table.index,
+                                               columns=table.columns),
+                                  expected, check_dtype=False, check_exact=True)
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("categorie", ["Baten", "Lasten", "Saldo"])
+def test_gradient_colors(kind, categorie):
+    table = verschil_table(kind)
+    gmap = gradient_map(table.to_numpy(), categorie)
+    np.testing.assert_array_equal(gradient_colors(gmap), styler_colors(table, gmap))
+
+
+def test_lasten_mirrored():
+    table = verschil_table("mixed")
+    baten = gradient_colors(gradient_map(table.to_numpy(), "Baten"))
+    lasten = gradient_colors(gradient_map(-table.to_numpy(), "Lasten"))
+    np.testing.assert_array_equal(baten, lasten)
+
+
+@pytest.mark.parametrize("categorie", ["Baten", "Lasten", "Saldo"])
+def test_grouped_gradient_colors(categorie):
+    # One table per group: mixed, one-sided, constant, with NaN, all NaN, a single cell
+    tables = {kind: verschil_table(kind).to_numpy().ravel()
+              for kind in ["mixed", "positive", "negative", "zero", "nan"]}
+    tables["constant"] = np.array([250.0, 250.0, np.nan])
+    tables["all nan"] = np.array([np.nan, np.nan])
+    tables["single"] = np.array([-40.0])
+
+    values = np.concatenate(list(tables.values()))
+    groups = np.repeat(list(tables), [len(v) for v in tables.values()])
+    order = np.random.default_rng(2).permutation(len(values))
+
+    colors = grouped_gradient_colors(values[order], groups[order], categorie)
+    for name in tables:
+        np.testing.assert_array_equal(colors[groups[order] == name],
+                                      gradient_colors(gradient_map(values[order][groups[order] == name], categorie)),
+                                      err_msg=name)
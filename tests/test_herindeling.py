@@ -0,0 +1,98 @@
+"""
+`apply_herindeling_matrix` against the per-Series `apply_herindeling_for_year`
+it replaced, on a small synthetic Gemeenten x (Taakveld, Categorie) block.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Brondata_script.calccbe_jr_streamlit import COL_GEMEENTE, apply_herindeling_for_year, apply_herindeling_matrix
+
+GEMEENTEN = [
+    # Littenseradiel split over Leeuwarden, Waadhoeke and Súdwest-Fryslân (2018)
+    "Littenseradiel", "Leeuwarden", "Leeuwarderadeel", "Franekeradeel", "het Bildt", "Bolsward", "Sneek",
+    # Súdwest-Fryslân is one of its own constituents (self-reference)
+    "Súdwest-Fryslân",
+    # Winsum split over Het Hogeland and Westerkwartier (2019)
+    "Winsum", "Bedum", "De Marne", "Grootegast", "Leek",
+    # Haaren split in four (2021)
+    "Haaren", "Boxtel", "Tilburg", "Vught", "Oisterwijk",
+    # Not involved in any herindeling
+    "Utrecht",
+]
+TAAKVELDEN = ["Veiligheid", "Onderwijs"]
+CATEGORIEEN = ["Baten", "Lasten", "Saldo"]
+
+# (Taakveld, Categorie) groups in which a gemeente has no row
+MISSING = {
+    "Littenseradiel": [("Onderwijs", "Lasten")],
+    "Súdwest-Fryslân": [("Veiligheid", "Baten")],
+    "Winsum": [("Onderwijs", "Saldo")],
+    "Haaren": [("Veiligheid", "Lasten"), ("Onderwijs", "Baten")],
+    "Tilburg": [("Onderwijs", "Baten")],
+}
+
+
+def synthetic_block(gemeenten=GEMEENTEN, shuffle=False) -> pd.DataFrame:
+    """Long rows (Gemeenten, Taakveld, Categorie, Waarde) with a few gaps; in random order if `shuffle`."""
+    rng = np.random.default_rng(3)
+    rows = [
+        (gemeente, taakveld, categorie, rng.uniform(-500, 500))
+        for taakveld in TAAKVELDEN
+        for categorie in CATEGORIEEN
+        for gemeente in gemeenten
+        if (taakveld, categorie) not in MISSING.get(gemeente, [])
+    ]
+    df = pd.DataFrame(rows, columns=[COL_GEMEENTE, "Taakveld", "Categorie", "Waarde"])
+    if shuffle:
+        df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+    return df
+
+
+def per_series(df: pd.DataFrame, jaar: int) -> pd.DataFrame:
+    """The herindelingen applied per (Taakveld, Categorie) group, as before the matrix version."""
+    parts = []
+    for (taakveld, categorie), part in df.groupby(["Taakveld", "Categorie"], dropna=False):
+        s = apply_herindeling_for_year(part.set_index(COL_GEMEENTE)["Waarde"], jaar)
+        p = s.rename("Waarde").reset_index()
+        p.insert(1, "Taakveld", taakveld)
+        p.insert(2, "Categorie", categorie)
+        parts.append(p)
+    return pd.concat(parts, ignore_index=True)
+
+
+def assert_same_rows(actual: pd.DataFrame, expected: pd.DataFrame) -> None:
+    """Same rows in the same order, with bit-identical values."""
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+@pytest.mark.parametrize("jaar", [2017, 2018, 2019, 2020, 2021, 2022, 2024])
+def test_matrix_matches_per_series(jaar, shuffle):
+    df = synthetic_block(shuffle=shuffle)
+    assert_same_rows(apply_herindeling_matrix(df, jaar), per_series(df, jaar))
+
+
+def test_fractional_split():
+    df = synthetic_block()
+    out = apply_herindeling_matrix(df, 2019).set_index(["Taakveld", "Categorie", COL_GEMEENTE])["Waarde"]
+    waarde = df.set_index(["Taakveld", "Categorie", COL_GEMEENTE])["Waarde"]
+
+    for group in [("Veiligheid", "Baten"), ("Onderwijs", "Lasten")]:
+        assert out[(*group, "Het Hogeland")] == pytest.approx(
+            waarde[(*group, "Bedum")] + waarde[(*group, "De Marne")] + 0.884 * waarde[(*group, "Winsum")]
+        )
+        for oud in ("Winsum", "Haaren", "Bedum"):
+            assert (*group, oud) not in out.index
+
+
+def test_self_reference():
+    # Súdwest-Fryslân comes last among its own constituents: it is added to
+    # itself and then dropped, together with what was merged into it
+    df = synthetic_block(["Bolsward", "Súdwest-Fryslân", "Utrecht"])
+    for jaar in (2018, 2019):
+        assert_same_rows(apply_herindeling_matrix(df, jaar), per_series(df, jaar))
+
+    assert set(apply_herindeling_matrix(df, 2018)[COL_GEMEENTE]) == {"Utrecht"}
+    assert set(apply_herindeling_matrix(df, 2019)[COL_GEMEENTE]) == {"Bolsward", "Súdwest-Fryslân", "Utrecht"}
@@ -0,0 +1,59 @@
+"""
+Both builders with and without `block_size`: streaming the Iv3 file gives the
+same partition as reading and pivoting it in memory, which is why block_size
+is not part of the partition cache key.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Brondata_script import create_data_vergelijken, synthetic_iv3
+from Brondata_script.calccbe_jr_streamlit import build_year_document
+
+JAAR = 2019
+VALUE_COL = "k_2ePlaatsing_2"
+# A few hundred rows per block, so most (Gemeenten, TaakveldBalanspost) are summed over several blocks
+BLOCK_SIZE = 16_000
+
+
+@pytest.fixture(params=["integral", "fractional"])
+def extract(request, tmp_path):
+    """
+    A generated Iv3 extract in random row order, and whether its amounts are
+    whole (€ 1.000, as in Iv3) so that every summation order gives the same bits.
+    """
+    synthetic_iv3.generate(tmp_path, gemeenten=30, years=range(JAAR, JAAR + 1), seed=5)
+    iv3_dir = tmp_path / "iv3data"
+    rng = np.random.default_rng(5)
+    for path in iv3_dir.glob("*.csv"):
+        df = pd.read_csv(path)
+        df = df.iloc[rng.permutation(len(df))]
+        if request.param == "fractional":
+            df[VALUE_COL] = df[VALUE_COL] * rng.uniform(0.5, 1.5, len(df))
+        df.to_csv(path, index=False)
+    return iv3_dir, request.param == "integral"
+
+
+def assert_same_partition(streamed: pd.DataFrame, in_memory: pd.DataFrame, exact: bool) -> None:
+    """Same rows in the same order; values bit-identical, or else equal up to the order of summation."""
+    pd.testing.assert_frame_equal(streamed, in_memory, check_exact=exact, rtol=1e-12)
+
+
+@pytest.mark.parametrize("doc_code, document_label", synthetic_iv3.DOCUMENTS.items())
+def test_build_year_document(extract, doc_code, document_label):
+    iv3_dir, exact = extract
+    kwargs = dict(iv3_csv=iv3_dir / f"{JAAR}{doc_code}.csv", jaar=JAAR, document_label=document_label, value_col=VALUE_COL)
+    assert_same_partition(build_year_document(**kwargs, block_size=BLOCK_SIZE), build_year_document(**kwargs), exact)
+
+
+@pytest.mark.parametrize("doc_code, document_naam", synthetic_iv3.DOCUMENTS.items())
+def test_build_document(extract, monkeypatch, doc_code, document_naam):
+    iv3_dir, exact = extract
+    monkeypatch.setattr(create_data_vergelijken, "DATAMAP", str(iv3_dir / "%s.csv"))
+    args = (JAAR, document_naam, f"{JAAR}{doc_code}", VALUE_COL)
+    assert_same_partition(
+        create_data_vergelijken.build_document(*args, block_size=BLOCK_SIZE),
+        create_data_vergelijken.build_document(*args),
+        exact,
+    )
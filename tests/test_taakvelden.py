@@ -0,0 +1,98 @@
+"""
+`prep_hoofdtaakvelden` and `prep_subtaakvelden` against `calculate_waarde`,
+the per-cell computation they replaced. Cells are summed row by row instead
+of pairwise (Series.sum), so fractional values are compared with a tight rtol.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Brondata_script.taakveld_rollups import EURO_TO_THOUSAND_FACTOR
+from queries.taakvelden import prep_hoofdtaakvelden, prep_subtaakvelden, subtaakvelden, taakvelden_dict
+
+TAAKVELDEN = [
+    "0.1 Bestuur", "0.7 Algemene uitkering", "0.8 Overige baten en lasten", "1.1 Crisisbeheersing",
+    "4.2 Onderwijshuisvesting", "6.3 Inkomensregelingen", "6.71 Maatwerkdienstverlening 18+",
+    "6.72 Maatwerkdienstverlening 18-", "8.1 Ruimtelijke ordening",
+]
+INWONERTAL = {"Assen": 68000, "Baarn": 25000, "Zonder inwoners": 0}
+# Rows in the Volksgezondheid cell of Assen (Baarn has 8): around the 8 and 128 values
+# at which Series.sum changes how it sums
+VOLKSGEZONDHEID_ROWS = [0, 8, 9, 16, 127, 128, 129, 130]
+RTOL = 1e-12
+
+
+def calculate_waarde(filtered_data, per_inwoner=False):
+    """Calculate the final value for a gemeente-taakveld combination.
+
+    Args:
+        filtered_data: DataFrame slice for specific gemeente and taakveld
+        per_inwoner: If True, return value per inhabitant, else total
+
+    Returns:
+        Calculated value (float)
+    """
+    if len(filtered_data) == 0:
+        return 0
+
+    sum_value = filtered_data['Waarde'].sum()
+    categorie = filtered_data['Categorie'].iloc[0]
+
+    # Saldo is defined as netto lasten (lasten - baten), so negate
+    if categorie == "Saldo":
+        sum_value = -1 * sum_value
+
+    if per_inwoner:
+        inwonertal = filtered_data['Inwonertal'].iloc[0]
+        if inwonertal > 0:
+            return round(EURO_TO_THOUSAND_FACTOR * sum_value / inwonertal, 0)
+        else:
+            return 0
+    else:
+        return sum_value
+
+
+def taakveld_rows(categorie: str, volksgezondheid: int = 0) -> pd.DataFrame:
+    """Rows of one Jaar, Document and Categorie; Baarn has no rows for some taakvelden."""
+    rng = np.random.default_rng(7)
+    extra = [f"7.{i} Volksgezondheid {i}" for i in range(1, volksgezondheid + 1)]
+    rows = [
+        (gemeente, taakveld, categorie, round(rng.uniform(-900, 900), 2), inwonertal)
+        for gemeente, inwonertal in INWONERTAL.items()
+        for taakveld in TAAKVELDEN + (extra if gemeente != "Baarn" else extra[:8])
+        if not (gemeente == "Baarn" and taakveld.startswith(("4.", "6.7")))
+    ]
+    return pd.DataFrame(rows, columns=["Gemeenten", "Taakveld", "Categorie", "Waarde", "Inwonertal"])
+
+
+@pytest.mark.parametrize("volksgezondheid", VOLKSGEZONDHEID_ROWS)
+@pytest.mark.parametrize("categorie", ["Lasten", "Saldo"])
+@pytest.mark.parametrize("per_inwoner", [False, True])
+def test_prep_hoofdtaakvelden(categorie, per_inwoner, volksgezondheid):
+    data = taakveld_rows(categorie, volksgezondheid)
+    expected = pd.DataFrame([
+        (gemeente, groep, calculate_waarde(
+            data[(data['Gemeenten'] == gemeente) & data['Taakveld'].str.startswith(prefixes)], per_inwoner))
+        for gemeente in data['Gemeenten'].unique()
+        for groep, prefixes in taakvelden_dict.items()
+    ], columns=["Gemeente", "Hoofdtaakveld", "Waarde"])
+
+    pd.testing.assert_frame_equal(prep_hoofdtaakvelden(data, per_inwoner), expected,
+                                  check_dtype=False, rtol=RTOL)
+
+
+@pytest.mark.parametrize("htv", [None, "Sociaal domein - Wmo", "Onderwijs"])
+@pytest.mark.parametrize("per_inwoner", [False, True])
+def test_prep_subtaakvelden(htv, per_inwoner):
+    data = taakveld_rows("Saldo")
+    taakvelden = [tv for tv in data['Taakveld'].unique() if htv is None or tv.startswith(subtaakvelden[htv])]
+    expected = pd.DataFrame([
+        (gemeente, taakveld, calculate_waarde(
+            data[(data['Gemeenten'] == gemeente) & (data['Taakveld'] == taakveld)], per_inwoner))
+        for taakveld in taakvelden
+        for gemeente in data['Gemeenten'].unique()
+    ], columns=["Gemeente", "Taakveld", "Waarde"])
+
+    pd.testing.assert_frame_equal(prep_subtaakvelden(data, htv, per_inwoner), expected,
+                                  check_dtype=False, rtol=RTOL)
@@ -0,0 +1,94 @@
+"""
+`taakveldgroepen_for`, `classify_taakvelden`, and `aggregate_to_taakveldgroepen`
+against the per-group `startswith` loop it replaced.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Brondata_script.calccbe_jr_streamlit import (
+    COL_GEMEENTE,
+    COL_TAAKVELD,
+    TAAKVELDGROEPEN,
+    aggregate_to_taakveldgroepen,
+    classify_taakvelden,
+    taakveldgroepen_for,
+)
+from Brondata_script.synthetic_iv3 import TAAKVELDEN
+
+GEMEENTEN = ["Assen", "Baarn", "Delft", "Zwolle"]
+
+
+def per_group(pv: pd.DataFrame) -> pd.DataFrame:
+    """One filter and groupby per taakveldgroep, as before the mapping version."""
+    rows = []
+    for group_name, prefixes in TAAKVELDGROEPEN.items():
+        sub = pv[pv[COL_TAAKVELD].astype(str).str.startswith(prefixes)]
+        if sub.empty:
+            continue
+        agg = sub.groupby(COL_GEMEENTE, as_index=False)[["Baten", "Lasten", "Saldo"]].sum()
+        long = agg.melt(id_vars=[COL_GEMEENTE], value_vars=["Baten", "Lasten", "Saldo"], var_name="Categorie", value_name="Waarde")
+        long.insert(1, "Taakveld", group_name)
+        rows.append(long)
+    if not rows:
+        return pd.DataFrame(columns=[COL_GEMEENTE, "Taakveld", "Categorie", "Waarde"])
+    return pd.concat(rows, ignore_index=True)
+
+
+def pivoted(taakvelden=TAAKVELDEN, shuffle=False) -> pd.DataFrame:
+    """Baten/Lasten/Saldo per Gemeenten x Taakveld; Baarn has no rows for the 6. taakvelden."""
+    rng = np.random.default_rng(11)
+    rows = []
+    for gemeente in GEMEENTEN:
+        for taakveld in taakvelden:
+            if gemeente == "Baarn" and taakveld.startswith("6."):
+                continue
+            baten, lasten = rng.uniform(0, 1000, 2)
+            rows.append((gemeente, taakveld, baten, lasten, lasten - baten))
+    pv = pd.DataFrame(rows, columns=[COL_GEMEENTE, COL_TAAKVELD, "Baten", "Lasten", "Saldo"])
+    if shuffle:
+        pv = pv.iloc[rng.permutation(len(pv))].reset_index(drop=True)
+    return pv
+
+
+@pytest.mark.parametrize("taakveld, groups", [
+    ("0.1 Bestuur", ("Bestuur en burgerzaken",)),
+    ("0.10 Mutaties reserves", ()),
+    ("0.11 Resultaat van de rekening van baten en lasten", ()),
+    ("0.2 Burgerzaken", ("Bestuur en burgerzaken",)),
+    ("0.64 Belastingen overig", ("Belastingen",)),
+    ("6.71 Maatwerkdienstverlening 18+", ("Maatwerk Wmo",)),
+    ("6.72 Maatwerkdienstverlening 18-", ("Maatwerk Jeugd",)),
+    ("8.2 Grondexploitatie (niet bedrijventerreinen)", ("Grondexploitatie",)),
+    ("A1 Immateriële vaste activa", ()),
+])
+def test_taakveldgroepen_for(taakveld, groups):
+    assert taakveldgroepen_for(taakveld) == groups
+
+
+def test_taakveldgroepen_for_matches_startswith():
+    for taakveld in TAAKVELDEN:
+        expected = tuple(g for g, prefixes in TAAKVELDGROEPEN.items() if taakveld.startswith(prefixes))
+        assert taakveldgroepen_for(taakveld) == expected
+
+
+def test_classify_taakvelden():
+    # Balance posts (A, P) are filtered out before classification
+    taakvelden = [tv for tv in TAAKVELDEN if not tv.startswith(("A", "P"))]
+    overlapping, unmatched = classify_taakvelden(taakvelden + ["9.1 Onbekend taakveld", "0.1 Bestuur"])
+    # 0.10 and 0.11 are left out on purpose and not reported
+    assert overlapping == {}
+    assert unmatched == ["9.1 Onbekend taakveld"]
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_aggregate_matches_per_group(shuffle):
+    pv = pivoted(shuffle=shuffle)
+    pd.testing.assert_frame_equal(aggregate_to_taakveldgroepen(pv), per_group(pv), check_exact=True)
+
+
+def test_aggregate_without_groups():
+    pv = pivoted(["0.10 Mutaties reserves", "9.1 Onbekend taakveld"])
+    assert aggregate_to_taakveldgroepen(pv).empty
+    assert per_group(pv).empty
@@ -1,40 +1,30 @@
 import csv
 import json
-from io import BytesIO
+from concurrent.futures import wait
 
-import altair as alt
 import pandas as pd
 import streamlit as st
 import matplotlib
-import vl_convert as vlc
+
+from data_access import DatasetHandle
+from excel_export import export_tables
+from export_jobs import ExportJobs
+from gradient import gradient_map
+from queries import (
+    BegrotingRekening,
+    BegrotingRekeningQueries,
+    VerschilCube,
+    show_begroting_rekening,
+    show_saldo,
+    show_saldo_legend,
+)
+from queries.begroting_rekening import DATA_FILE, VERSCHIL_FILE, VERSCHIL_INDEX_KEYS
 
 # ============================================================================
 # CONSTANTS
 # ============================================================================
 
-DATA_FILE = "begroting_rekening.pickle"
 CLASSES_FILE = "gemeenteklassen.csv"
-ROOT_FACTOR = 0.4  # For gradient map calculation
-
-TAAKVELD_REPLACEMENTS = {
-    'Overig bestuur en ondersteuning': 'Overig bestuur en onderst.'
-}
-
-TAVELD_GROUPS = {
-    "Inkomsten": [
-        "Gemeentefonds", "Belastingen", "Overig bestuur en onderst.",
-        "Grondexploitatie", "Economie",
-    ],
-    "Klassiek domein": [
-        "Bestuur en burgerzaken", "Overhead", "Veiligheid",
-        "Verkeer en vervoer", "Onderwijs", "SCR",
-        "Volksgezondheid en milieu", "Wonen en bouwen",
-    ],
-    "Sociaal domein": [
-        "Algemene voorzieningen", "Inkomensregelingen", "Participatie",
-        "Maatwerk Wmo", "Maatwerk Jeugd",
-    ]
-}
 
 ALLEEN_PER_INWONER = [
     "Groningen", "Friesland", "Drenthe", "Overijssel", "Gelderland",
@@ -50,58 +40,84 @@ ALLEEN_PER_INWONER = [
 # DATA LOADING FUNCTIONS
 # ============================================================================
 
-@st.cache_resource
-def get_data():
+def get_handle():
+    """
+    Return the handle (path + version) of the current dataset.
+    
+    Only reads the dataset manifest. Cached functions below take this handle
+    instead of DataFrames, so their cache keys are cheap to compute and
+    change when the dataset is rebuilt.
+    
+    Returns:
+        DatasetHandle: Handle of DATA_FILE.
     """
-    Load and return the budget/reckoning data with error handling.
+    return DatasetHandle.open(DATA_FILE)
+
+
+@st.cache_resource(max_entries=1)
+def get_data(handle):
+    """
+    Load the budget/reckoning data cube with error handling.
+    
+    The cube is memory-mapped from a file next to the dataset, shared by all
+    server processes on the host (see BegrotingRekening.mapped); the first
+    process to load a dataset version writes it.
+    
+    Args:
+        handle: DatasetHandle of the dataset to load
     
     Returns:
-        pd.DataFrame: The loaded data, or empty DataFrame if loading fails.
+        BegrotingRekening: The dataset, or None if loading fails.
     """
-    filepath = DATA_FILE
+    filepath = handle.path
     
     try:
-        data = pd.read_pickle(filepath)
+        # Raises ValueError for missing required columns
+        dataset = BegrotingRekening.mapped(handle)
         
-        if data.empty:
+        if dataset.size == 0:
             st.error("⚠️ Data file is empty. Please check the data source.")
-            return pd.DataFrame()
-        
-        # Validate required columns exist
-        required_cols = ['Gemeenten', 'Jaar', 'Stand', 'Taakveld', 'Document', 'Waarde', 'Categorie']
-        missing_cols = [col for col in required_cols if col not in data.columns]
-        if missing_cols:
-            st.error(f"⚠️ Missing required columns in data: {', '.join(missing_cols)}")
-            return pd.DataFrame()
+            return None
         
-        return data
+        return dataset
         
     except FileNotFoundError:
         st.error(f"❌ Data file '{filepath}' not found. Please ensure the file exists.")
-        return pd.DataFrame()
+        return None
     except Exception as e:
         st.error(f"❌ Error loading data: {str(e)}")
-        return pd.DataFrame()
+        return None
 
 
-@st.cache_resource
-def get_year_range():
+def get_verschil_handle():
     """
-    Extract minimum and maximum years from the data.
+    Return the handle (path + version) of the precomputed Verschil dataset.
     
     Returns:
-        tuple: (min_year, max_year) as integers.
+        DatasetHandle: Handle of VERSCHIL_FILE.
     """
-    data = get_data()
-    if data.empty:
-        return None, None
+    return DatasetHandle.open(VERSCHIL_FILE)
+
+
+@st.cache_resource(max_entries=1)
+def get_verschil(handle):
+    """
+    Load the Verschil dataset, memory-mapped and indexed on (Gemeenten, Stand, Jaar, Categorie).
     
+    Args:
+        handle: DatasetHandle of the Verschil dataset
+    
+    Returns:
+        VerschilCube: Indexed Verschil data (empty if it cannot be loaded).
+    """
     try:
-        jaren = data['Jaar'].astype(int).unique()
-        return int(jaren.min()), int(jaren.max())
+        return VerschilCube.mapped(handle)
+    except FileNotFoundError:
+        st.error(f"❌ Data file '{handle.path}' not found. Run python -m Brondata_script.calccbe_jr_streamlit to create it.")
     except Exception as e:
-        st.warning(f"Could not extract year range: {str(e)}")
-        return None, None
+        st.error(f"❌ Error loading data: {str(e)}")
+
+    return VerschilCube.from_frame(pd.DataFrame(columns=VERSCHIL_INDEX_KEYS))
 
 
 @st.cache_data
@@ -136,379 +152,43 @@ def get_classes():
         return {}, {}
 
 
-@st.cache_data
-def filter_data(data,
-                gemeente,
-                stand,
-                jaarmin=None,
-                jaarmax=None,
-                vergelijking=None):
-    """
-    Filter data based on gemeente, stand, year range, and optional comparison.
-    
-    Args:
-        data: DataFrame to filter
-        gemeente: Name of the gemeente to filter by
-        stand: "Totaal" or "Per inwoner"
-        jaarmin: Minimum year (optional)
-        jaarmax: Maximum year (optional)
-        vergelijking: Comparison entity name (optional)
-        
-    Returns:
-        pd.DataFrame: Filtered data
-    """
-    # Validate input data
-    if data.empty:
-        st.warning("⚠️ No data available for filtering.")
-        return pd.DataFrame()
-    
-    # Validate gemeente exists in data
-    if gemeente not in data['Gemeenten'].values:
-        st.warning(f"⚠️ Gemeente '{gemeente}' not found in data.")
-        return pd.DataFrame()
-    
-    # Validate stand exists in data
-    if stand not in data['Stand'].values:
-        st.warning(f"⚠️ Stand '{stand}' not found in data.")
-        return pd.DataFrame()
-    
-    # Get year range from data if not provided
-    if jaarmin is None or jaarmax is None:
-        jaar_min, jaar_max = get_year_range()
-        if jaar_min is None or jaar_max is None:
-            st.warning("⚠️ Could not determine year range.")
-            return pd.DataFrame()
-        if jaarmin is None:
-            jaarmin = jaar_min
-        if jaarmax is None:
-            jaarmax = jaar_max
-
-    # Tuple of jaren (saved as category)
-    jaar_range = tuple([str(i) for i in range(jaarmin, jaarmax + 1)])
-
-    # Select by gemeente and Totaal/Per inwoner, no Provincie or Grootteklasse
-    if not vergelijking:
-        filtered_data = data[(data['Stand'] == stand)
-                             & (data['Gemeenten'] == gemeente)
-                             & (data['Jaar'].str.startswith(jaar_range))].copy()
-
-    # Select by gemeente and stand and vergelijking (Gemeente, Provincie, Grootteklasse)
-    else:
-        # Validate vergelijking exists
-        if vergelijking not in data['Gemeenten'].values:
-            st.warning(f"⚠️ Comparison entity '{vergelijking}' not found in data.")
-            return pd.DataFrame()
-        
-        filtered_data = data[(data['Stand'] == stand)
-                             & (data['Jaar'].str.startswith(jaar_range)
-                                & ((data['Gemeenten'] == gemeente)
-                                   | (data['Gemeenten'] == vergelijking)))].copy()
-
-    # Replace long taakveld names
-    if not filtered_data.empty:
-        filtered_data.loc[:, 'Taakveld'] = filtered_data['Taakveld'].replace(
-            TAAKVELD_REPLACEMENTS
-        )
-
-    return filtered_data
-
-
-@st.cache_data
-def calculate_saldo(data):
-    """
-    Calculate saldo (balance) grouped by year and document type.
-    
-    Args:
-        data: DataFrame containing financial data
-        
-    Returns:
-        pd.DataFrame: Saldo values per year and document
-    """
-    if data.empty:
-        return pd.DataFrame()
-    
-    saldo = data.loc[(data['Categorie'] == 'Saldo')].groupby(
-        ['Jaar', 'Document'], observed=False)['Waarde'].sum().reset_index()
-
-    saldo = saldo[(saldo['Waarde'] != 0)]
-
-    return saldo
-
-
-def show_saldo(saldo, stand, legend=True):
-    """
-    Create an Altair line chart showing saldo over time.
-    
-    Args:
-        saldo: DataFrame with saldo data
-        stand: "Per inwoner" or "Totaal" to determine axis title
-        legend: Whether to show legend
-        
-    Returns:
-        alt.Chart: Configured Altair chart
-    """
-    if saldo.empty:
-        return None
-    
-    if stand == "Per inwoner":
-        axis_title = "€ 1"
-    else:
-        axis_title = "€ 1.000"
-
-    if legend:
-        chart = alt.Chart(saldo).mark_line(point=True).encode(
-            x=alt.X('Jaar:O'),
-            y=alt.Y('Waarde:Q', title=axis_title),
-            color='Document:N',
-            tooltip=['Jaar', 'Waarde:Q', 'Document']
-        ).configure_legend(title=None).properties(
-            usermeta={
-                "embedOptions": {
-                    "formatLocale": vlc.get_format_locale("nl-NL"),
-                }
-            }
-        ).interactive()
-    else:
-        chart = alt.Chart(saldo).mark_line(point=True).encode(
-            x=alt.X('Jaar:O'),
-            y=alt.Y('Waarde:Q', title=axis_title),
-            color=alt.Color('Document:N', legend=None),
-            tooltip=['Jaar', 'Waarde:Q', 'Document']
-        ).interactive()
-
-    return chart
-
-
-def show_saldo_legend(saldo):
-    """
-    Create a legend-only chart for saldo.
-    
-    Args:
-        saldo: DataFrame with saldo data
-        
-    Returns:
-        alt.Chart: Legend chart
-    """
-    if saldo.empty:
-        return None
-    
-    chart = alt.Chart(saldo, height=25).mark_line().encode(
-        color=alt.Color('Document:N')
-    ).configure_view(
-        clip=False
-    ).configure_legend(title=None, orient="top")
-
-    return chart
-
+# ============================================================================
+# QUERIES (see queries/begroting_rekening.py)
+# ============================================================================
 
-@st.cache_data
-def calculate_begroting_rekening(data, baten_lasten, jaar):
+@st.cache_resource(max_entries=1)
+def get_queries(handle, verschil_handle):
     """
-    Filter data for specific category (baten/lasten) and year.
+    Queries on the dataset and the Verschil dataset, with their result cache.
     
-    Args:
-        data: DataFrame to filter
-        baten_lasten: Category name ("Baten" or "Lasten")
-        jaar: Year as string or int
-        
-    Returns:
-        pd.DataFrame: Filtered data
-    """
-    if data.empty:
-        return pd.DataFrame()
-    
-    br_data = data[(data['Categorie'] == baten_lasten)
-                   & (data['Jaar'] == str(jaar))]
-
-    return br_data
-
-
-def show_begroting_rekening(br_data, stand):
-    """
-    Create a bar chart comparing begroting vs jaarrekening per taakveld.
+    One per dataset version: rebuilding a dataset gives a new handle version,
+    and so new queries with an empty cache (see queries/begroting_rekening.py).
     
     Args:
-        br_data: DataFrame with begroting/rekening data
-        stand: "Per inwoner" or "Totaal" to determine axis title
-        
-    Returns:
-        alt.Chart: Configured Altair chart
-    """
-    if br_data.empty:
-        return None
-    
-    if stand == "Per inwoner":
-        axis_title = "€ 1"
-    else:
-        axis_title = "€ 1.000"
+        handle: DatasetHandle of the dataset
+        verschil_handle: DatasetHandle of the Verschil dataset
     
-    br_chart = alt.Chart(br_data).mark_bar().encode(
-        y=alt.Y('Document:N',
-                title='',
-                axis=alt.Axis(labels=False, ticks=False)
-                ),
-        x=alt.X('Waarde:Q', title=axis_title),
-        color='Document:N',
-        tooltip=['Taakveld', 'Document', 'Waarde:Q'],
-        row=alt.Row(
-            'Taakveld:N',
-            sort=alt.EncodingSortField(field="Waarde", order='descending'),
-            spacing=5,
-            header=alt.Header(
-                labelAngle=0,
-                labelAlign='left',
-                title=None,
-                labelFontSize=15,
-                labelPadding=15
-            )
-        )
-    ).configure_axis(labelFontSize=15).configure_header(
-        title=None
-    ).configure_legend(title=None).interactive()
-
-    return br_chart
-
-
-@st.cache_data
-def create_tables(data, categorie, gemeente):
-    """
-    Create comparison tables grouped by taakveld categories.
-    
-    Args:
-        data: DataFrame with financial data
-        categorie: Category to analyze ("Baten", "Lasten", or "Saldo")
-        gemeente: Name of the gemeente
-        
     Returns:
-        tuple: (tables_dict, table_columns) where tables_dict contains grouped tables
+        BegrotingRekeningQueries: Cached queries over both datasets.
     """
-    if data.empty:
-        return {}, []
-
-    # Filter data
-    df = data.loc[data['Categorie'] == categorie].copy()
-
-    if df.empty:
-        st.warning(f"⚠️ No data found for category '{categorie}'.")
-        return {}, []
-
-    # Check Gemeenten in dataframe
-    gemeenten = df['Gemeenten'].astype(str).unique().tolist()
-    jaren = df['Jaar'].astype(str).unique().tolist()
-
-    if len(gemeenten) == 1:
-        # Calculate table
-        table = calculate_difference(df)
-    elif len(gemeenten) == 2:
-        vergelijking = gemeenten[1] if gemeenten[0] == gemeente else gemeenten[0]
-        table_headers = [gemeente, vergelijking]
-        table_suffixes = [
-            "                                                            {}".format(gemeente),
-            "                                                            {}".format(vergelijking)
-        ]
-
-        tables = []
-        for g in table_headers:
-            dfg = df.loc[(df['Gemeenten'] == g)]
-            tables.append(calculate_difference(dfg))
-
-        table = pd.merge(tables[0],
-                         tables[1],
-                         on=['Taakveld'],
-                         suffixes=(table_suffixes))
+    return BegrotingRekeningQueries(get_data(handle), get_verschil(verschil_handle))
 
-        table = table.fillna(0)
-        table = table.astype(int)
 
-        # add in blank column for readability
-        column_position = len(jaren)
-        table.insert(column_position, ' ', "")
-    else:
-        st.warning("⚠️ Unexpected number of gemeenten in data.")
-        return {}, []
-
-    # Create grouped tables using constants
-    tables = {}
-    for group_name, taakvelden in TAVELD_GROUPS.items():
-        try:
-            group_table = table.loc[taakvelden]
-            tables[group_name] = group_table
-        except KeyError as e:
-            # Some taakvelden might not exist in the data
-            missing = [tv for tv in taakvelden if tv not in table.index]
-            if missing:
-                st.warning(f"⚠️ Some taakvelden not found for {group_name}: {', '.join(missing)}")
-            # Try to get available taakvelden
-            available = [tv for tv in taakvelden if tv in table.index]
-            if available:
-                tables[group_name] = table.loc[available]
-
-    return tables, table.columns
-
-
-def calculate_difference(df):
+def show_result(result):
     """
-    Calculate the difference between jaarrekening and begroting values.
+    Show the messages of a query result as warnings and return its value.
     
     Args:
-        df: DataFrame containing jaarrekening and begroting data
+        result: QueryResult of a query
         
     Returns:
-        pd.DataFrame: Pivoted DataFrame with differences per taakveld and year
-        
-    Raises:
-        ValueError: If required columns are missing
+        The query result, or its default if the selection was rejected
     """
-    if df.empty:
-        return pd.DataFrame()
-    
-    required_cols = ['Gemeenten', 'Categorie', 'Document', 'Jaar', 'Taakveld', 'Waarde']
-    missing_cols = [col for col in required_cols if col not in df.columns]
-    if missing_cols:
-        raise ValueError(f"Missing required columns: {missing_cols}")
-    
-    # Remove unused columns
-    df = df.drop(columns=['Gemeenten', 'Categorie']).copy()
-
-    # Separate into jaarrekening and begroting
-    jaarrekening = df.loc[df['Document'] == 'Jaarrekening']
-    begroting = df.loc[df['Document'] == 'Begroting']
-    
-    if jaarrekening.empty or begroting.empty:
-        return pd.DataFrame()
-
-    # Merge and calculate difference
-    merged_df = pd.merge(jaarrekening,
-                         begroting,
-                         on=['Jaar', 'Taakveld'],
-                         suffixes=('_jr', '_bg'),
-                         how='outer')
-    
-    # Fill NaN values with 0 for calculation
-    merged_df['Waarde_jr'] = merged_df['Waarde_jr'].fillna(0)
-    merged_df['Waarde_bg'] = merged_df['Waarde_bg'].fillna(0)
-    
-    merged_df['Verschil'] = merged_df['Waarde_jr'] - merged_df['Waarde_bg']
-    merged_df['Verschil'] = merged_df['Verschil'].astype(int)
-
-    # Remove Jaren with empty values
-    merged_df = merged_df[((merged_df['Verschil'] != merged_df['Waarde_bg']) &
-                           (merged_df['Waarde_bg'] != 0)) | 
-                          ((merged_df['Verschil'] != -merged_df['Waarde_jr']) &
-                           (merged_df['Waarde_jr'] != 0)) |
-                          ((merged_df['Waarde_jr'] == 0) &
-                           (merged_df['Waarde_bg'] == 0))]
-
-    if merged_df.empty:
-        return pd.DataFrame()
-
-    # Pivot table and change column headers
-    pv = merged_df.pivot(index='Taakveld', columns='Jaar', values='Verschil')
-    
-    if isinstance(pv.columns, pd.MultiIndex):
-        pv.columns = pv.columns.droplevel(0)
-
-    return pv
+    for message in result.warnings:
+        st.warning(f"⚠️ {message}")
+    if result.error:
+        st.warning(f"⚠️ {result.error}")
+    return result.value
 
 
 def style_table(table, categorie):
@@ -546,44 +226,24 @@ def calculate_gradient_map(x, categorie):
         categorie: Category name ("Baten", "Lasten", or "Saldo")
         
     Returns:
-        DataFrame with gradient map values
+        DataFrame with gradient map values (see gradient.py)
     """
     if x.empty:
         return x
     
-    x1 = x.map(lambda i: 0 if i == "" else i)
-
-    x_min = abs(x1.values.min())
-    x_max = abs(x1.values.max())
-    
-    if x_min == 0 and x_max == 0:
-        return x1
-
-    if abs(x_min) > x_max:
-        # If minimum is higher than maximum, multiply by fraction max/min
-        x2 = x1.map(lambda i: i * (x_min / x_max) / x_min
-                    if i > 0 else i / x_min)
-    else:
-        # If maximum is higher: multiply by fraction min/max
-        x2 = x1.map(lambda i: i * (x_max / x_min) / x_max
-                    if i < 0 else i / x_max)
-
-    # Take root to raise lower values
-    x3 = x2.map(lambda i: i**ROOT_FACTOR if i >= 0 else -(abs(i)**ROOT_FACTOR))
-
-    if categorie == "Lasten":
-        x3 = x3.map(lambda i: -i)  # Reverse gradient map for lasten
-
-    return x3
+    return pd.DataFrame(gradient_map(x.to_numpy(), categorie), index=x.index, columns=x.columns)
 
 
 # ============================================================================
 # EXPORT FUNCTIONS
 # ============================================================================
 
-def export_table_to_excel(tables: dict, categorie: str, gemeente: str) -> BytesIO:
+def export_table_to_excel(tables: dict, categorie: str, gemeente: str) -> bytes:
     """
-    Export tables to Excel format.
+    Export tables to Excel format, one sheet per table (see excel_export.py).
+    
+    Runs on an export worker (see export_button), so errors are raised
+    rather than shown.
     
     Args:
         tables: Dictionary of table names and DataFrames
@@ -591,38 +251,9 @@ def export_table_to_excel(tables: dict, categorie: str, gemeente: str) -> BytesI
         gemeente: Gemeente name for filename
         
     Returns:
-        BytesIO: Excel file in memory
+        bytes: Excel file
     """
-    output = BytesIO()
-    try:
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            for table_name, table in tables.items():
-                # Excel sheet name limit is 31 characters
-                sheet_name = table_name[:31]
-                table.to_excel(writer, sheet_name=sheet_name)
-                
-                # Get the workbook and worksheet objects
-                workbook = writer.book
-                worksheet = writer.sheets[sheet_name]
-                
-                # Set column widths
-                worksheet.set_column('A:A', 30)  # Taakveld column
-                for col_num in range(1, len(table.columns) + 1):
-                    worksheet.set_column(col_num, col_num, 15)
-                
-                # Create number format
-                num_format = workbook.add_format({'num_format': '#,##0'})
-                
-                # Apply format to data cells
-                for row in range(1, len(table) + 1):
-                    for col in range(1, len(table.columns) + 1):
-                        worksheet.write(row, col, table.iloc[row-1, col-1], num_format)
-        
-        output.seek(0)
-        return output
-    except Exception as e:
-        st.error(f"Error creating Excel file: {str(e)}")
-        return BytesIO()
+    return export_tables(tables)
 
 
 def export_chart_data(chart_data: pd.DataFrame, filename: str) -> str:
@@ -641,27 +272,58 @@ def export_chart_data(chart_data: pd.DataFrame, filename: str) -> str:
     return chart_data.to_csv(index=False)
 
 
-def validate_data_quality(data: pd.DataFrame) -> dict:
+@st.cache_resource
+def get_export_jobs():
     """
-    Check data quality and return report.
+    Background export builds, shared by all sessions (see export_jobs.py).
     
-    Args:
-        data: DataFrame to validate
-        
     Returns:
-        dict: Quality report with statistics
+        ExportJobs: Export worker pool with its result cache.
+    """
+    return ExportJobs()
+
+
+@st.fragment
+def export_button(key, build, args, prepare_label, label, file_name, mime):
     """
-    if data.empty:
-        return {'status': 'empty', 'message': 'Data is empty'}
+    Download button for a file that is only built when requested.
+    
+    Shows a button that starts `build(*args)` on an export worker; once the
+    file is ready, shows the download button instead. Results are cached by
+    `key`, so a selection that was exported before is offered right away.
+    Runs as a fragment: the clicks only rerun this button.
     
-    report = {
-        'total_rows': len(data),
-        'missing_values': data.isnull().sum().to_dict(),
-        'duplicate_rows': data.duplicated().sum(),
-        'year_range': (data['Jaar'].min(), data['Jaar'].max()) if 'Jaar' in data.columns else None,
-        'gemeenten_count': data['Gemeenten'].nunique() if 'Gemeenten' in data.columns else 0
-    }
-    return report
+    Args:
+        key: Hashable selection key (dataset version and all selections the file depends on)
+        build: Function that returns the file contents (bytes or str)
+        args: Arguments for build
+        prepare_label: Label of the button that starts the build
+        label: Label of the download button
+        file_name: File name of the download
+        mime: MIME type of the download
+    """
+    jobs = get_export_jobs()
+    future = jobs.get(key)
+
+    if future is None or (future.done() and future.exception() is not None):
+        if future is not None:
+            st.error(f"❌ Error creating file: {future.exception()}")
+        if not st.button(prepare_label, key=f"prepare_{file_name}"):
+            return
+        future = jobs.submit(key, build, *args)
+
+    if not future.done():
+        with st.spinner("Bestand wordt gemaakt..."):
+            wait([future])
+
+    if future.exception() is not None:
+        st.error(f"❌ Error creating file: {future.exception()}")
+        return
+
+    data = future.result()
+    if data:
+        st.download_button(label=label, data=data, file_name=file_name, mime=mime,
+                           key=f"download_{file_name}")
 
 
 # ============================================================================
@@ -672,16 +334,21 @@ def validate_data_quality(data: pd.DataFrame) -> dict:
 st.set_page_config(layout="wide", page_title="Begroting en Jaarrekening Vergelijken")
 
 # Load data once at the start
+handle = get_handle()
+verschil_handle = get_verschil_handle()
 with st.spinner("📊 Data laden..."):
-    data = get_data()
+    dataset = get_data(handle)
 
 # Stop execution if no data
-if data.empty:
+if dataset is None:
     st.error("❌ Geen data beschikbaar. Controleer de data bestanden.")
     st.stop()
 
+br_queries = get_queries(handle, verschil_handle)
+index = br_queries.index
+
 # Validate data quality (optional, can be shown in expander)
-data_quality = validate_data_quality(data)
+data_quality = br_queries.data_quality().value
 
 # Sidebar
 with st.sidebar:
@@ -707,7 +374,7 @@ with st.sidebar:
     # Toggle for comparing yes/no
     vergelijken = st.toggle("Vergelijken", help="Vergelijk met provincie, grootteklasse of andere gemeente")
 
-    gemeente_options = sorted(data.Gemeenten.unique())
+    gemeente_options = index.values('Gemeenten')
     selected_gemeente = st.selectbox(
         "Selecteer een gemeente",
         gemeente_options,
@@ -717,7 +384,7 @@ with st.sidebar:
 
     # If vergelijken: no options for stand, must be Per inwoner
     if not vergelijken and selected_gemeente not in ALLEEN_PER_INWONER:
-        stand_options = sorted(data.Stand.unique())
+        stand_options = index.values('Stand')
         selected_stand = st.selectbox(
             "Selecteer totaal of per inwoner",
             stand_options,
@@ -813,8 +480,7 @@ with saldo_container:
             st.header("Begroot en gerealiseerd exploitatiesaldo per jaar")
             
             with st.spinner("Berekenen saldo..."):
-                filtered_data = filter_data(data, selected_gemeente, selected_stand)
-                chart_data = calculate_saldo(filtered_data)
+                chart_data = show_result(br_queries.calculate_saldo(selected_gemeente, selected_stand))
             
             if not chart_data.empty:
                 chart = show_saldo(chart_data, selected_stand)
@@ -823,14 +489,15 @@ with saldo_container:
                     st.altair_chart(chart, theme="streamlit", use_container_width=True)
                     
                     # Export button for chart data
-                    csv_data = export_chart_data(chart_data, f"saldo_{selected_gemeente}.csv")
-                    if csv_data:
-                        st.download_button(
-                            label="📥 Download saldo data (CSV)",
-                            data=csv_data,
-                            file_name=f"saldo_{selected_gemeente}_{selected_stand}.csv",
-                            mime="text/csv"
-                        )
+                    export_button(
+                        key=(handle.version, "saldo", selected_gemeente, selected_stand),
+                        build=export_chart_data,
+                        args=(chart_data, f"saldo_{selected_gemeente}.csv"),
+                        prepare_label="📄 Maak saldo data (CSV)",
+                        label="📥 Download saldo data (CSV)",
+                        file_name=f"saldo_{selected_gemeente}_{selected_stand}.csv",
+                        mime="text/csv"
+                    )
                 else:
                     st.warning("⚠️ Kon grafiek niet genereren.")
             else:
@@ -849,8 +516,7 @@ with saldo_container:
 
             with cs2:
                 with st.spinner(f"Berekenen saldo voor {selected_gemeente}..."):
-                    filtered_data_1 = filter_data(data, selected_gemeente, selected_stand)
-                    chart_data_1 = calculate_saldo(filtered_data_1)
+                    chart_data_1 = show_result(br_queries.calculate_saldo(selected_gemeente, selected_stand))
                 
                 if not chart_data_1.empty:
                     chart = show_saldo(chart_data_1, selected_stand, legend=False)
@@ -864,8 +530,7 @@ with saldo_container:
                     
             with cs3:
                 with st.spinner(f"Berekenen saldo voor {vergelijking}..."):
-                    filtered_data_2 = filter_data(data, vergelijking, selected_stand)
-                    chart_data_2 = calculate_saldo(filtered_data_2)
+                    chart_data_2 = show_result(br_queries.calculate_saldo(vergelijking, selected_stand))
                 
                 if not chart_data_2.empty:
                     chart = show_saldo(chart_data_2, selected_stand, legend=False)
@@ -892,7 +557,7 @@ if not vergelijken:
 
             # Dropdown menus for selecting Categorie and Jaar
             baten_lasten_options = ["Baten", "Lasten"]
-            filtered_data = filter_data(data, selected_gemeente, selected_stand)
+            filtered_data = show_result(br_queries.filter_data(selected_gemeente, selected_stand))
             
             if not filtered_data.empty:
                 jaar_options = sorted(filtered_data.Jaar.unique())
@@ -914,11 +579,12 @@ if not vergelijken:
                 with cv2:
                     with st.spinner("Berekenen begroting vs jaarrekening..."):
                         # Pull data based on selected options
-                        br_data = calculate_begroting_rekening(
-                            filtered_data,
+                        br_data = show_result(br_queries.calculate_begroting_rekening(
+                            selected_gemeente,
+                            selected_stand,
                             selected_baten_lasten,
                             selected_jaar,
-                        )
+                        ))
 
                     if not br_data.empty:
                         # Define and create chart
@@ -928,14 +594,16 @@ if not vergelijken:
                             st.altair_chart(chart, theme="streamlit", use_container_width=True)
                             
                             # Export button
-                            csv_data = export_chart_data(br_data, f"taakveld_{selected_gemeente}_{selected_jaar}.csv")
-                            if csv_data:
-                                st.download_button(
-                                    label="📥 Download taakveld data (CSV)",
-                                    data=csv_data,
-                                    file_name=f"taakveld_{selected_gemeente}_{selected_baten_lasten}_{selected_jaar}.csv",
-                                    mime="text/csv"
-                                )
+                            export_button(
+                                key=(handle.version, "taakveld", selected_gemeente, selected_stand,
+                                     selected_baten_lasten, selected_jaar),
+                                build=export_chart_data,
+                                args=(br_data, f"taakveld_{selected_gemeente}_{selected_jaar}.csv"),
+                                prepare_label="📄 Maak taakveld data (CSV)",
+                                label="📥 Download taakveld data (CSV)",
+                                file_name=f"taakveld_{selected_gemeente}_{selected_baten_lasten}_{selected_jaar}.csv",
+                                mime="text/csv"
+                            )
                         else:
                             st.warning("⚠️ Kon grafiek niet genereren.")
                     else:
@@ -975,7 +643,7 @@ with taakveld_table_container:
         )
 
         # Select range of years
-        jaar_min_range, jaar_max_range = get_year_range()
+        jaar_min_range, jaar_max_range = br_queries.year_range
         if jaar_min_range is None or jaar_max_range is None:
             st.error("⚠️ Kon jaarbereik niet bepalen. Controleer de data.")
             st.stop()
@@ -996,10 +664,9 @@ with taakveld_table_container:
         with ct2:
             with st.spinner("Berekenen tabellen..."):
                 # Pull data based on selected options and style
-                filtered_data = filter_data(data, selected_gemeente, selected_stand,
-                                            jaar_min, jaar_max)
-                tables, table_columns = create_tables(
-                    filtered_data, selected_table_option, selected_gemeente)
+                tables, table_columns = show_result(br_queries.create_tables(
+                    selected_table_option, selected_gemeente, selected_stand,
+                    jaar_min, jaar_max))
 
             if tables:
                 # Create table
@@ -1029,14 +696,16 @@ with taakveld_table_container:
                 # Export button
                 col1, col2 = st.columns([3, 1])
                 with col2:
-                    excel_data = export_table_to_excel(tables, selected_table_option, selected_gemeente)
-                    if excel_data.getvalue():
-                        st.download_button(
-                            label="📥 Download Excel",
-                            data=excel_data,
-                            file_name=f"begroting_rekening_{selected_gemeente}_{selected_table_option}_{jaar_min}_{jaar_max}.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
+                    export_button(
+                        key=(handle.version, verschil_handle.version, "tabellen", selected_gemeente, None,
+                             selected_stand, selected_table_option, jaar_min, jaar_max),
+                        build=export_table_to_excel,
+                        args=(tables, selected_table_option, selected_gemeente),
+                        prepare_label="📄 Maak Excel",
+                        label="📥 Download Excel",
+                        file_name=f"begroting_rekening_{selected_gemeente}_{selected_table_option}_{jaar_min}_{jaar_max}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
             else:
                 st.warning(f"⚠️ Geen tabellen beschikbaar voor {selected_table_option}")
     else:
@@ -1047,14 +716,9 @@ with taakveld_table_container:
 
             with ct2:
                 with st.spinner("Berekenen vergelijkingstabellen..."):
-                    filtered_data = filter_data(data,
-                                                selected_gemeente,
-                                                selected_stand,
-                                                jaarmin=jaar_min,
-                                                jaarmax=jaar_max,
-                                                vergelijking=vergelijking)
-                    tables, table_columns = create_tables(
-                        filtered_data, selected_table_option, selected_gemeente)
+                    tables, table_columns = show_result(br_queries.create_tables(
+                        selected_table_option, selected_gemeente, selected_stand,
+                        jaar_min, jaar_max, vergelijking=vergelijking))
 
                 if tables:
                     # Create table
@@ -1088,15 +752,16 @@ with taakveld_table_container:
                     # Export button
                     col1, col2 = st.columns([3, 1])
                     with col2:
-                        excel_data = export_table_to_excel(tables, selected_table_option, 
-                                                          f"{selected_gemeente}_vs_{vergelijking}")
-                        if excel_data.getvalue():
-                            st.download_button(
-                                label="📥 Download Excel",
-                                data=excel_data,
-                                file_name=f"begroting_rekening_{selected_gemeente}_vs_{vergelijking}_{selected_table_option}_{jaar_min}_{jaar_max}.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                            )
+                        export_button(
+                            key=(handle.version, verschil_handle.version, "tabellen", selected_gemeente, vergelijking,
+                                 selected_stand, selected_table_option, jaar_min, jaar_max),
+                            build=export_table_to_excel,
+                            args=(tables, selected_table_option, f"{selected_gemeente}_vs_{vergelijking}"),
+                            prepare_label="📄 Maak Excel",
+                            label="📥 Download Excel",
+                            file_name=f"begroting_rekening_{selected_gemeente}_vs_{vergelijking}_{selected_table_option}_{jaar_min}_{jaar_max}.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
                 else:
                     st.warning(f"⚠️ Geen tabellen beschikbaar voor vergelijking")
 